@@ -0,0 +1,68 @@
+"""
+Per-refresh cost of the hourly analytics snapshot.
+
+Run from the project folder:
+    python benchmarks/bench_hourly_analytics.py
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.hourly_analytics import HourlyAnalytics
+
+
+def make_hourly_data(hours=156):
+    start = datetime.now().astimezone().replace(minute=0, second=0, microsecond=0)
+    periods = []
+    for i in range(hours):
+        periods.append({
+            'startTime': (start + timedelta(hours=i)).isoformat(),
+            'temperature': 25 + (i * 7) % 30,
+            'probabilityOfPrecipitation': {'value': (i * 13) % 100},
+            'windSpeed': f"{(i * 3) % 25} mph",
+            'windDirection': 'NW',
+            'shortForecast': 'Partly Cloudy',
+        })
+    return {'properties': {'periods': periods}}
+
+
+class StaticManager:
+    def __init__(self):
+        self.data = make_hourly_data()
+
+    def get_hourly_data(self):
+        return self.data
+
+    def refresh(self):
+        self.data = make_hourly_data()
+
+
+def main(runs=200):
+    manager = StaticManager()
+    analytics = HourlyAnalytics(manager)
+    timings = []
+    for _ in range(runs):
+        manager.refresh()
+        started = time.perf_counter()
+        analytics.get_rain_timing()
+        timings.append((time.perf_counter() - started) * 1000)
+        # Cached answers for the rest of the refresh
+        analytics.get_peak_wind()
+        analytics.get_freezing_hours()
+        analytics.get_dry_window()
+
+    timings.sort()
+    print(f"refreshes: {runs}")
+    print(f"per-refresh compute: median {timings[len(timings) // 2]:.3f}ms, "
+          f"p95 {timings[int(len(timings) * 0.95)]:.3f}ms, max {timings[-1]:.3f}ms")
+    started = time.perf_counter()
+    for _ in range(runs):
+        analytics.get_dry_window()
+    print(f"cached lookup: {(time.perf_counter() - started) * 1000 / runs:.4f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Peak memory and parse time of the streaming forecast parser against the
+full response.json() parse, on a /forecast/hourly sized payload.
+
+Run from the project folder:
+    python benchmarks/bench_stream_parser.py [saved_hourly_response.json]
+"""
+import os
+import sys
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.nws_stream_parser import parse_forecast_stream, HOURLY_FIELDS
+
+
+def make_hourly_payload(hours=156):
+    """Build a body shaped like api.weather.gov /forecast/hourly."""
+    start = datetime.now().astimezone().replace(minute=0, second=0, microsecond=0)
+    periods = []
+    for i in range(hours):
+        dt = start + timedelta(hours=i)
+        periods.append({
+            "number": i + 1, "name": "", "startTime": dt.isoformat(),
+            "endTime": (dt + timedelta(hours=1)).isoformat(), "isDaytime": 6 <= dt.hour < 18,
+            "temperature": 60 + i % 20, "temperatureUnit": "F", "temperatureTrend": "",
+            "probabilityOfPrecipitation": {"unitCode": "wmoUnit:percent", "value": i % 100},
+            "dewpoint": {"unitCode": "wmoUnit:degC", "value": 8.333333333333334},
+            "relativeHumidity": {"unitCode": "wmoUnit:percent", "value": 63},
+            "windSpeed": f"{i % 20} mph", "windDirection": "NW",
+            "icon": "https://api.weather.gov/icons/land/day/few?size=small",
+            "shortForecast": "Sunny", "detailedForecast": "",
+        })
+    body = {
+        "@context": ["https://geojson.org/geojson-ld/geojson-context.jsonld", {"@version": "1.1"}],
+        "type": "Feature",
+        "geometry": {"type": "Polygon", "coordinates": [[[-119.27, 36.37], [-119.26, 36.39],
+                                                          [-119.29, 36.40], [-119.30, 36.38]]]},
+        "properties": {
+            "units": "us", "forecastGenerator": "HourlyForecastGenerator",
+            "generatedAt": start.isoformat(), "updateTime": start.isoformat(),
+            "validTimes": f"{start.isoformat()}/P7DT13H",
+            "elevation": {"unitCode": "wmoUnit:m", "value": 97.8936},
+            "periods": periods,
+        },
+    }
+    return json.dumps(body, indent=4).encode('utf-8')
+
+
+def chunked(payload, size=8192):
+    for i in range(0, len(payload), size):
+        yield payload[i:i + size]
+
+
+def measure(label, parse, runs=50):
+    tracemalloc.start()
+    result = parse()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for _ in range(runs):
+        parse()
+    elapsed = (time.perf_counter() - started) * 1000 / runs
+    periods = len(result['properties']['periods'])
+    print(f"{label:<28} {elapsed:8.2f}ms {peak / 1024:9.1f}KiB peak  {periods} periods kept")
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'rb') as file:
+            payload = file.read()
+    else:
+        payload = make_hourly_payload()
+    print(f"payload: {len(payload) / 1024:.1f}KiB")
+
+    measure("response.json()", lambda: json.loads(payload.decode('utf-8')))
+    measure("stream, all periods", lambda: parse_forecast_stream(chunked(payload), HOURLY_FIELDS))
+    measure("stream, horizon 48", lambda: parse_forecast_stream(chunked(payload), HOURLY_FIELDS, 48))
+    measure("stream, horizon 24", lambda: parse_forecast_stream(chunked(payload), HOURLY_FIELDS, 24))
+
+
+if __name__ == "__main__":
+    main()
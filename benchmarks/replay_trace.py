@@ -0,0 +1,184 @@
+"""
+Replay recorded mesh traffic, or a generated burst of requests, through the
+bot's message listener on simulated radios, and report how the replies kept up.
+
+Record a trace by setting PACKET_TRACE_FILE in settings.yaml, then run from the
+project folder:
+    python benchmarks/replay_trace.py packets.jsonl --speed 10
+    python benchmarks/replay_trace.py --generate 60 --nodes 15 --duration 600 --speed 10
+
+Replies use the FIRST_MESSAGE_DELAY and MESSAGE_DELAY from settings.yaml divided
+by --speed. Forecasts are fetched from the NWS api as usual and every call is counted.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import requests
+from pubsub import pub
+
+nws_calls = Counter()
+_session_request = requests.sessions.Session.request
+
+
+def _nws_product(url):
+    path = url.split("api.weather.gov", 1)[-1].split("?", 1)[0]
+    if path.startswith("/points"):
+        return "points"
+    if path.startswith("/alerts"):
+        return "alerts"
+    if path.endswith("/forecast/hourly"):
+        return "hourly"
+    if path.endswith("/forecast"):
+        return "forecast"
+    return path.strip("/").split("/")[0] or "other"
+
+
+def _counting_request(self, method, url, *args, **kwargs):
+    if "api.weather.gov" in url:
+        nws_calls[_nws_product(url)] += 1
+    return _session_request(self, method, url, *args, **kwargs)
+
+
+requests.sessions.Session.request = _counting_request
+
+import meshbot
+from modules.packet_trace import SimulatedRadio, TraceReplayer, load_trace
+
+COMMAND_MIX = (
+    ("menu", 8), ("temp", 10), ("rain", 10), ("2day", 8), ("4day", 10), ("hourly", 6), ("5day", 4),
+    ("7day", 4), ("wind", 4), ("rainwhen", 4), ("gusts", 2), ("dry", 2), ("alert", 3), ("hello", 2),
+)
+
+
+def generate_trace(count, nodes, duration, seed=None, node_id="99"):
+    """A burst of `count` DM requests from `nodes` senders spread over `duration` seconds."""
+    rng = random.Random(seed)
+    senders = [rng.randint(100000000, 4000000000) for _ in range(nodes)]
+    commands, weights = zip(*COMMAND_MIX)
+    start = time.time()
+    entries = []
+    for i, offset in enumerate(sorted(rng.uniform(0, duration) for _ in range(count))):
+        entries.append({
+            "t": start + offset,
+            "radio": "sim1",
+            "node": node_id,
+            "packet": {
+                "from": rng.choice(senders),
+                "to": int(node_id),
+                "id": i + 1,
+                "decoded": {"portnum": "TEXT_MESSAGE_APP", "text": rng.choices(commands, weights)[0]},
+            },
+        })
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay mesh traffic through the bot on simulated radios")
+    parser.add_argument("trace", nargs="?", help="Trace file recorded with PACKET_TRACE_FILE")
+    parser.add_argument("--generate", type=int, default=0, help="Generate this many requests instead of a trace")
+    parser.add_argument("--nodes", type=int, default=10, help="Senders in a generated load")
+    parser.add_argument("--duration", type=float, default=600, help="Seconds a generated load is spread over")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed-up factor")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds each simulated send takes")
+    parser.add_argument("--ack-loss", type=float, default=0.0, help="Fraction of acknowledgements lost")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.trace:
+        entries = load_trace(args.trace)
+    elif args.generate:
+        entries = generate_trace(args.generate, args.nodes, args.duration, args.seed)
+    else:
+        parser.error("give a trace file or --generate")
+
+    interfaces = {}
+    for entry in entries:
+        name = entry["radio"]
+        if name not in interfaces:
+            radio = SimulatedRadio(name, entry["node"], args.latency, args.ack_loss, args.seed)
+            link = meshbot.radios.add(radio, name)
+            link.my_node = entry["node"]
+            interfaces[name] = radio
+
+    cfg = meshbot.config.current
+    meshbot.config.set_overrides({
+        "FIRST_MESSAGE_DELAY": cfg.first_message_delay / args.speed,
+        "MESSAGE_DELAY": cfg.message_delay / args.speed,
+    })
+    # Acks and resends run on the replay clock too
+    delivery = meshbot.delivery_tracker
+    delivery.ack_timeout /= args.speed
+    delivery.retry_backoff /= args.speed
+    pub.subscribe(delivery.on_routing, "meshtastic.receive.routing")
+    delivery.start(interval=max(0.2, 5 / args.speed))
+
+    calls_at_start = sum(nws_calls.values())
+    nws_calls.clear()
+
+    done = threading.Event()
+    depth_samples = []
+
+    def sample_queues():
+        while not done.is_set():
+            depth_samples.append(sum(link.queue_depth() for link in meshbot.radios))
+            time.sleep(0.25)
+
+    def duty_cycle_decay():
+        # Same as reset_transmission_count, on the replay clock
+        while not done.wait(180.0 / args.speed):
+            for link in meshbot.radios:
+                link.transmission_count = max(0, link.transmission_count - 1)
+
+    threading.Thread(target=sample_queues, daemon=True).start()
+    if cfg.duty_cycle:
+        threading.Thread(target=duty_cycle_decay, daemon=True).start()
+
+    replayer = TraceReplayer(entries, meshbot.message_listener, interfaces, speed=args.speed)
+    started = time.time()
+    replayer.run()
+    for link in meshbot.radios:
+        link.send_queue.join()
+    # Let lost pages be resent or given up on
+    settle_by = time.time() + (delivery.ack_timeout + delivery.retry_backoff * 2 ** delivery.max_retries) * 2
+    while (delivery.pending or delivery.retries) and time.time() < settle_by:
+        time.sleep(0.2)
+    for link in meshbot.radios:
+        link.send_queue.join()
+    elapsed = time.time() - started
+    done.set()
+
+    latency = replayer.latency_summary()
+    unanswered = sum(len(waiting) for waiting in replayer.pending.values())
+    sent = sum(len(radio.sent) for radio in interfaces.values())
+    acks_lost = sum(radio.acks_lost for radio in interfaces.values())
+    rejections = sum(link.duty_cycle_rejections for link in meshbot.radios)
+    preempted = sum(link.preempted_pages for link in meshbot.radios)
+    peak_depth = max((link.max_queue_depth for link in meshbot.radios), default=0)
+    mean_depth = sum(depth_samples) / len(depth_samples) if depth_samples else 0
+
+    print(f"Replayed {len(entries)} packets ({replayer.requests} DM requests) at {args.speed:g}x in {elapsed:.1f}s")
+    print(f"Reply latency, first message: p50 {latency['p50']:.2f}s  p90 {latency['p90']:.2f}s  "
+          f"p99 {latency['p99']:.2f}s  max {latency['max']:.2f}s")
+    print(f"Unanswered requests: {unanswered}")
+    print(f"Send queue depth: peak {peak_depth}, mean {mean_depth:.1f}")
+    print(f"Duty-cycle rejections: {rejections}")
+    print(f"Messages sent: {sent}, acks lost: {acks_lost}")
+    # Replies cut short by a newer command from the same node; fully dropped ones count as unanswered
+    print(f"Pages dropped by newer commands: {preempted}")
+    print(delivery.get_status())
+    breakdown = ", ".join(f"{product} {count}" for product, count in nws_calls.most_common())
+    print(f"NWS calls during replay: {sum(nws_calls.values())}" + (f" ({breakdown})" if breakdown else "")
+          + f", {calls_at_start} at startup")
+
+
+if __name__ == "__main__":
+    main()
@@ -65,10 +65,12 @@ import requests
 
 
 
-def infer_nws_grid_from_coords(settings, logger=None):
+def infer_nws_grid_from_coords(settings, logger=None, saved_grid=None, projection=None, governor=None):
     """
     Fill in NWS_OFFICE, NWS_GRID_X, NWS_GRID_Y using ALERT_LAT and ALERT_LON.
     Only runs if any NWS_* value is missing or empty. Updates settings in-place.
+    A grid saved before a restart for the same coordinates is reused without an API call,
+    as is one the grid projection can work out locally.
     Returns True if values were inferred and updated; otherwise False.
     """
     # If already complete, nothing to do
@@ -108,6 +110,24 @@ def infer_nws_grid_from_coords(settings, logger=None):
 
     lat_s = f"{lat:.4f}"
     lon_s = f"{lon:.4f}"
+
+    if saved_grid and saved_grid.get("lat") == lat_s and saved_grid.get("lon") == lon_s:
+        settings["NWS_OFFICE"] = saved_grid["office"]
+        settings["NWS_GRID_X"] = saved_grid["grid_x"]
+        settings["NWS_GRID_Y"] = saved_grid["grid_y"]
+        if logger:
+            logger.info(f"NWS grid restored from saved state: office={saved_grid['office']}, "
+                        f"x={saved_grid['grid_x']}, y={saved_grid['grid_y']}")
+        return True
+
+    local_grid = projection.locate(lat_s, lon_s) if projection is not None else None
+    if local_grid:
+        settings["NWS_OFFICE"], settings["NWS_GRID_X"], settings["NWS_GRID_Y"] = local_grid
+        if logger:
+            logger.info(f"NWS grid from local projection: office={local_grid[0]}, "
+                        f"x={local_grid[1]}, y={local_grid[2]}")
+        return True
+
     url = f"https://api.weather.gov/points/{lat_s},{lon_s}"
 
     user_agent_app = str(settings.get("USER_AGENT_APP", "meshbot-weather"))
@@ -118,7 +138,7 @@ def infer_nws_grid_from_coords(settings, logger=None):
     }
 
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
+        resp = nws_get(governor, "startup", url, headers=headers, timeout=10)
         resp.raise_for_status()
         data = resp.json()
         props = data.get("properties", {}) or {}
@@ -135,6 +155,8 @@ def infer_nws_grid_from_coords(settings, logger=None):
         settings["NWS_OFFICE"] = str(office)
         settings["NWS_GRID_X"] = str(grid_x)
         settings["NWS_GRID_Y"] = str(grid_y)
+        if projection is not None:
+            projection.learn(lat_s, lon_s, str(props.get("cwa") or office), grid_x, grid_y)
 
         if logger:
             logger.info(f"NWS grid auto-config: office={office}, x={grid_x}, y={grid_y}")
@@ -151,11 +173,34 @@ from modules.forecast_2day import Forecast2DayFetcher
 from modules.hourly_weather import EmojiWeatherFetcher
 from modules.rain_24hour import RainChanceFetcher
 from modules.forecast_5day import NWSWeatherFetcher5Day
-from modules.weather_data_manager import WeatherDataManager
+from modules.weather_data_manager import WeatherDataManager, track_data_age, served_fetch_times
+from modules.snapshot_store import SnapshotStore
+from modules.shared_cache import SharedCache
+from modules.forecast_history import ForecastHistory
 from modules.weather_alert_monitor import WeatherAlerts
 from modules.forecast_4day import Forecast4DayFetcher
 from modules.forecast_7day import Forecast7DayFetcher
 from modules.wind_24hour import Wind24HourFetcher
+from modules.broadcast_scheduler import BroadcastScheduler
+from modules.state_checkpoint import StateCheckpoint
+from modules.message_utils import split_message, match_command, has_keyword
+from modules.config import ConfigStore
+from modules.access_control import AccessControl
+from modules.radio_link import RadioGroup
+from modules.hourly_analytics import HourlyAnalytics
+from modules.weather_glyphs import WeatherGlyphs
+from modules.packet_trace import PacketTraceRecorder
+from modules.delivery_tracker import DeliveryTracker
+from modules.page_buffer import PageBuffer
+from modules.grid_resolver import GridResolver
+from modules.grid_projection import GridProjection
+from modules.watchdog import Watchdog
+from modules.api_governor import ApiGovernor, BudgetExceeded, nws_get
+from modules.connectivity import Connectivity
+from modules.current_conditions import StationIndex, CurrentConditions
+from modules.log_pipeline import start_logging, request_context
+from modules.sender_position import SenderLocator
+from modules.location_subscriptions import LocationSubscriptions
 
 UNRECOGNIZED_MESSAGES = [
     "Oops! I didn't recognize that command. Type 'menu' to see a list of options.",
@@ -168,7 +213,8 @@ UNRECOGNIZED_MESSAGES = [
 ]
 
 
-interface = None
+# Every attached radio; the weather cache, alerts and broadcasts are shared between them
+radios = RadioGroup()
 
 def find_serial_ports():
     ports = [port.device for port in serial.tools.list_ports.comports()]
@@ -178,21 +224,28 @@ def find_serial_ports():
     return filtered_ports
 
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
 logger = logging.getLogger()
 
 # GLOBALS
-MYNODE = ""
-MYNODES = ""
-DM_MODE = ""
-FIREWALL = ""
-DUTYCYCLE = ""
 alerts = None
-
-with open("settings.yaml", "r") as file:
-    settings = yaml.safe_load(file)
+broadcasts = None
+
+# Validated settings, reloaded automatically when settings.yaml changes
+config = ConfigStore("settings.yaml")
+settings = dict(config.current.raw)
+
+# Log records are written by a background thread so logging never holds up a reply
+log_pipeline = start_logging(settings)
+
+# Every api.weather.gov request takes a token from here, alert polls first and loc lookups last
+api_governor = ApiGovernor(settings.get("NWS_REQUESTS_PER_MINUTE", 30), settings.get("NWS_REQUEST_BURST", 10))
+# When the uplink drops, requests fail fast and forecasts come from the cache until a probe gets through
+connectivity = Connectivity(
+    api_governor,
+    f"({settings.get('USER_AGENT_APP')}, {settings.get('USER_AGENT_EMAIL')})",
+    probe_interval=settings.get("OFFLINE_PROBE_INTERVAL", 20)
+)
+api_governor.connectivity = connectivity
 
 ALERT_LAT = settings.get("ALERT_LAT")
 ALERT_LON = settings.get("ALERT_LON")
@@ -200,57 +253,161 @@ ALERT_LON = settings.get("ALERT_LON")
 
 logger.info(f"ALERT_LAT:{ALERT_LAT} ALERT_LON:{ALERT_LON}")
 
+# State saved before the last restart; each part of the bot restores its own section
+state_checkpoint = StateCheckpoint(
+    settings.get("STATE_FILE", "meshbot_state.json"),
+    settings.get("STATE_CHECKPOINT_INTERVAL", 60)
+)
+state_checkpoint.load()
+
+# Grid cells worked out locally from what earlier /points answers taught it
+grid_projection = None
+if settings.get("GRID_PROJECTION", True):
+    grid_projection = GridProjection(settings.get("GRID_PROJECTION_VALIDATION", 3))
+    state_checkpoint.register("grid_projection", grid_projection.get_state, grid_projection.restore_state)
+
+infer_nws_grid_from_coords(settings, logger=logger if 'logger' in globals() else None,
+                           saved_grid=state_checkpoint.restored.get("grid"), projection=grid_projection,
+                           governor=api_governor)
+
+# Keep the inferred grid across reloads, then read everything through the live config
+config.set_overrides({key: settings.get(key) for key in ("NWS_OFFICE", "NWS_GRID_X", "NWS_GRID_Y")})
+settings = config
+
+# Node access rules, rebuilt whenever settings.yaml is reloaded
+access = AccessControl(config.current)
+config.on_reload(access.configure)
+
+# Direct messages that aren't acknowledged are resent page by page
+delivery_tracker = DeliveryTracker(
+    max_retries=settings.get("DELIVERY_MAX_RETRIES", 2),
+    ack_timeout=settings.get("DELIVERY_ACK_TIMEOUT", 90),
+    retry_backoff=settings.get("DELIVERY_RETRY_BACKOFF", 30),
+    can_retry=lambda link: link.transmission_count < 16 or not config.current.duty_cycle
+)
+radios.delivery = delivery_tracker
 
-infer_nws_grid_from_coords(settings, logger=logger if 'logger' in globals() else None)
-
-MYNODES = settings.get("MYNODES")
-DM_MODE = settings.get("DM_MODE")
-FIREWALL = settings.get("FIREWALL")
-DUTYCYCLE = settings.get("DUTYCYCLE")
+# Heartbeats from the alert pollers, forecast downloads, send queues and listener
+watchdog = Watchdog(stall_after=settings.get("WATCHDOG_STALL_SECONDS", 300))
+radios.watchdog = watchdog
 
+# Pages held back for the "more" command when PAGE_ON_DEMAND is on
+page_buffer = PageBuffer()
 
+# Received packets are written here for replay with benchmarks/replay_trace.py
+packet_trace = None
+if settings.get("PACKET_TRACE_FILE"):
+    packet_trace = PacketTraceRecorder(settings.get("PACKET_TRACE_FILE"), radios)
 
 NWS_OFFICE = settings.get("NWS_OFFICE", "HNX")
 NWS_GRID_X = settings.get("NWS_GRID_X", "67")
 NWS_GRID_Y = settings.get("NWS_GRID_Y", "80")
 
-USER_AGENT_APP = settings.get("USER_AGENT_APP", "myweatherapp")
-USER_AGENT_EMAIL = settings.get("USER_AGENT_EMAIL", "contact@example.com")
-USER_AGENT = f"({USER_AGENT_APP}, {USER_AGENT_EMAIL})"
+USER_AGENT = config.current.user_agent
 
 
+def get_grid_state():
+    try:
+        lat, lon = f"{float(ALERT_LAT):.4f}", f"{float(ALERT_LON):.4f}"
+    except (TypeError, ValueError):
+        return None
+    return {"lat": lat, "lon": lon, "office": str(NWS_OFFICE),
+            "grid_x": str(NWS_GRID_X), "grid_y": str(NWS_GRID_Y)}
 
-#logger.info(f"DUTYCYCLE: {DUTYCYCLE}")
-#logger.info(f"DM_MODE: {DM_MODE}")
-#logger.info(f"FIREWALL: {FIREWALL}")
-#logger.info(f"MYNODES: {MYNODES}")
 
+state_checkpoint.register("grid", get_grid_state)
 
+NWS_DATA_MODE = settings.get("NWS_DATA_MODE", "forecast")
+NWS_STREAM_PARSE = settings.get("NWS_STREAM_PARSE", False)
+NWS_STREAM_HORIZON = settings.get("NWS_STREAM_HORIZON", 48)
 
-transmission_count = 0
-cooldown = False
+
+
+def get_duty_cycle_state():
+    return {
+        "radios": {
+            link.name: {"transmission_count": link.transmission_count, "cooldown": link.cooldown}
+            for link in radios
+        },
+        "saved_at": time.time(),
+    }
+
+
+def restore_duty_cycle_state(state):
+    # Apply the decay that would have happened while the bot was down
+    elapsed_steps = int((time.time() - state.get("saved_at", time.time())) // 180)
+    saved_radios = state.get("radios", {})
+    for link in radios:
+        saved = saved_radios.get(link.name)
+        if saved:
+            link.transmission_count = max(0, saved.get("transmission_count", 0) - elapsed_steps)
+            link.cooldown = saved.get("cooldown", False)
 
 temperature_24hour_info = None
 forecast_2day_info = None
 emoji_weather_info = None
 rain_chance_info = None
 
+# Shared, memory-budgeted store for every location's forecast snapshots
+snapshot_store = SnapshotStore(
+    budget_bytes=int(settings.get("SNAPSHOT_MEMORY_BUDGET_KB", 1024)) * 1024,
+    max_age=datetime.timedelta(hours=settings.get("SNAPSHOT_MAX_AGE_HOURS", 6))
+)
+state_checkpoint.register("snapshots", snapshot_store.get_state, snapshot_store.restore_state,
+                          version=lambda: snapshot_store.version, own_file=True)
+
+# Forecasts and alerts shared with other bot instances on this host
+shared_cache = None
+if settings.get("SHARED_CACHE_PATH"):
+    shared_cache = SharedCache(settings.get("SHARED_CACHE_PATH"), settings.get("SHARED_CACHE_LEASE_SECONDS", 60))
+    logger.info(f"Sharing forecast data through {settings.get('SHARED_CACHE_PATH')}")
+
+# Every downloaded forecast, kept for the trend command
+forecast_history = None
+if settings.get("FORECAST_HISTORY_PATH"):
+    forecast_history = ForecastHistory(settings.get("FORECAST_HISTORY_PATH"), settings.get("FORECAST_HISTORY_DAYS", 14))
+
 weather_manager = WeatherDataManager(
     NWS_OFFICE,
     NWS_GRID_X,
     NWS_GRID_Y,
-    USER_AGENT
+    USER_AGENT,
+    data_mode=NWS_DATA_MODE,
+    stream_parse=NWS_STREAM_PARSE,
+    stream_horizon=NWS_STREAM_HORIZON,
+    store=snapshot_store,
+    shared_cache=shared_cache,
+    history=forecast_history,
+    watchdog=watchdog,
+    governor=api_governor
 )
 
+# Cached /points lookups for loc, home and here locations
+grid_resolver = GridResolver(USER_AGENT, projection=grid_projection, governor=api_governor)
+state_checkpoint.register("grid_resolver", grid_resolver.get_state, grid_resolver.restore_state)
+# Grid cells of senders from the positions in the node database
+sender_locator = SenderLocator(grid_resolver)
+
+# Latest observations from each grid's nearest station, for the now command
+station_index = StationIndex(settings.get("STATION_CACHE_FILE", "stations.json"), USER_AGENT, governor=api_governor)
+current_conditions = CurrentConditions(station_index, USER_AGENT, governor=api_governor,
+                                       ttl=settings.get("OBSERVATION_TTL_SECONDS", 300))
+
+# Condition glyphs shared by every fetcher
+weather_glyphs = WeatherGlyphs(settings.get("GLYPH_SET", "emoji"), config.current.glyph_overrides)
+config.on_reload(lambda new_config: weather_glyphs.configure(
+    new_config.get("GLYPH_SET", "emoji"), new_config.glyph_overrides))
+
 # Initialize weather classes with weather manager
 temperature_24hour = Temperature24HourFetcher(weather_manager)
 forecast_2day = Forecast2DayFetcher(weather_manager)
-emoji_weather_fetcher = EmojiWeatherFetcher(weather_manager)
+emoji_weather_fetcher = EmojiWeatherFetcher(weather_manager, weather_glyphs)
 rain_chance_fetcher = RainChanceFetcher(weather_manager)
 nws_weather_fetcher_5day = NWSWeatherFetcher5Day(weather_manager)
-forecast_4day = Forecast4DayFetcher(weather_manager)
-forecast_7day = Forecast7DayFetcher(weather_manager)
+forecast_4day = Forecast4DayFetcher(weather_manager, weather_glyphs)
+forecast_7day = Forecast7DayFetcher(weather_manager, weather_glyphs)
 wind_24hour = Wind24HourFetcher(weather_manager)
+hourly_analytics = HourlyAnalytics(weather_manager)
 
 
 def get_temperature_24hour():
@@ -278,43 +435,42 @@ def get_rain_chance():
 
 
 def reset_transmission_count():
-    global transmission_count
-    if settings.get('DUTYCYCLE', False):
-        transmission_count -= 1
-        if transmission_count < 0:
-            transmission_count = 0
-        logger.info(f"Reducing transmission count {transmission_count}")
-        threading.Timer(180.0, reset_transmission_count).start()
+    # Rescheduled even while DUTYCYCLE is off, so it is already running if a reload turns it on
+    if config.current.duty_cycle:
+        for link in radios:
+            link.transmission_count -= 1
+            if link.transmission_count < 0:
+                link.transmission_count = 0
+            logger.info(f"Reducing transmission count on {link.name} {link.transmission_count}")
+    threading.Timer(180.0, reset_transmission_count).start()
 
 
 def reset_cooldown():
-    global cooldown
-    cooldown = False
-    logger.info("Cooldown Disabled.")
+    if config.current.duty_cycle:
+        for link in radios:
+            link.cooldown = False
+        logger.info("Cooldown Disabled.")
     threading.Timer(240.0, reset_cooldown).start()
 
 
-def split_message(message, max_length=200, message_type="Hourly", start_index=1, total_count=None):
-    lines = message.split('\n')
-    messages = []
-    current_message = []
-    current_length = 0
-    for line in lines:
-        line_length = len(line.encode('utf-8')) + (1 if current_message else 0)
-        if current_length + line_length > max_length:
-            messages.append('\n'.join(current_message))
-            current_message = []
-            current_length = 0
-        current_message.append(line)
-        current_length += line_length
-    if current_message:
-        messages.append('\n'.join(current_message))
-    # If total_count is provided, use it for page count
-    if total_count is None:
-        total_count = len(messages)
-    for i in range(len(messages)):
-        messages[i] = f"--({start_index + i}/{total_count}) {message_type}\n" + messages[i]
-    return messages
+duty_cycle_on = config.current.duty_cycle
+
+
+def apply_duty_cycle_reload(new_config):
+    """
+    Commands are counted but not limited while DUTYCYCLE is off, so when a reload
+    turns it on the count starts again from zero instead of locking the bot out.
+    """
+    global duty_cycle_on
+    if new_config.duty_cycle and not duty_cycle_on:
+        for link in radios:
+            link.transmission_count = 0
+            link.cooldown = False
+        logger.info("Duty cycle limit turned on, transmission counts reset")
+    duty_cycle_on = new_config.duty_cycle
+
+
+config.on_reload(apply_duty_cycle_reload)
 
 
 def get_forecast_4day():
@@ -329,59 +485,242 @@ def get_wind_24hour():
     return wind_24hour_info
 
 
+def broadcast_pages(text, message_type):
+    """Paginate a product for a channel broadcast, skipping fetch errors."""
+    if isinstance(text, list):
+        text = '\n'.join(text)
+    if not text or text.startswith(("Error", "Unexpected error")):
+        return []
+    return split_message(text, message_type=message_type)
+
+
+# Products that can be posted by the broadcast scheduler
+BROADCAST_PRODUCTS = {
+    '2day': lambda: broadcast_pages(get_forecast_2day(), "2day"),
+    '4day': lambda: broadcast_pages(get_forecast_4day(), "4day"),
+    '5day': lambda: [msg for msg in nws_weather_fetcher_5day.get_daily_weather() if not msg.startswith("Error")],
+    '7day': lambda: broadcast_pages(forecast_7day.get_weekly_emoji_weather(), "7day"),
+    'hourly': lambda: broadcast_pages(get_emoji_weather(), "Hourly"),
+    'temp': lambda: broadcast_pages(get_temperature_24hour(), "Temp"),
+    'rain': lambda: broadcast_pages(get_rain_chance(), "Rain"),
+    'wind': lambda: broadcast_pages(get_wind_24hour(), "Wind"),
+}
+
+
+def get_forecast_trend():
+    if forecast_history is None:
+        return "Forecast history is disabled in settings."
+    try:
+        # Make sure the latest issue has been recorded before comparing
+        weather_manager.get_daily_data()
+        return forecast_history.get_trend(weather_manager.grid)
+    except Exception as e:
+        logger.error(f"Error building forecast trend: {e}")
+        return "Error reading forecast history."
+
+
+def make_weather_manager(office, grid_x, grid_y, api_caller="location"):
+    """
+    Forecast manager for a grid cell, sharing the cache and settings of the main one.
+    api_caller sets the priority of its downloads with the NWS budget governor.
+    """
+    if (office, str(grid_x), str(grid_y)) == (NWS_OFFICE, str(NWS_GRID_X), str(NWS_GRID_Y)):
+        return weather_manager
+    return WeatherDataManager(office, grid_x, grid_y, USER_AGENT, data_mode=NWS_DATA_MODE,
+                              stream_parse=NWS_STREAM_PARSE, stream_horizon=NWS_STREAM_HORIZON,
+                              store=snapshot_store, shared_cache=shared_cache,
+                              history=forecast_history, watchdog=watchdog,
+                              governor=api_governor, api_caller=api_caller)
+
+
+# Products that can be answered for any location
+LOCATION_FETCHERS = {
+    '2day': lambda manager: Forecast2DayFetcher(manager).get_daily_weather(),
+    '4day': lambda manager: Forecast4DayFetcher(manager, weather_glyphs).get_weekly_emoji_weather(),
+    '5day': lambda manager: NWSWeatherFetcher5Day(manager).get_daily_weather(),
+    '7day': lambda manager: Forecast7DayFetcher(manager, weather_glyphs).get_weekly_emoji_weather(),
+    'hourly': lambda manager: EmojiWeatherFetcher(manager, weather_glyphs).get_emoji_weather(),
+    'temp': lambda manager: Temperature24HourFetcher(manager).get_temperature_24hour(),
+    'rain': lambda manager: RainChanceFetcher(manager).get_rain_chance(),
+    'wind': lambda manager: Wind24HourFetcher(manager).get_wind_24hour(),
+    'now': lambda manager: current_conditions.report(manager.grid),
+}
+
+
+# Products sent as one message without page numbering
+SINGLE_MESSAGE_PRODUCTS = ('2day', '4day', 'temp', 'rain', 'now')
+
+
+# Products whose module can be switched off in settings, with the flag that enables each
+OPTIONAL_PRODUCTS = {
+    'hourly': 'enable_hourly_weather',
+    '5day': 'enable_5day_forecast',
+    '7day': 'enable_7day_forecast',
+}
+
+
+def location_product_enabled(command):
+    flag = OPTIONAL_PRODUCTS.get(command)
+    return flag is None or getattr(config.current, flag)
+
+
+def get_location_product(manager, command):
+    result = LOCATION_FETCHERS[command](manager)
+    if isinstance(result, list):
+        return '\n'.join(result)
+    return str(result)
+
+
 def get_custom_lookup(message):
     """
     Parse message like 'loc lat/lon command' and return the weather info for that location.
+    Several commands can be asked for at once, separated by commas ('loc lat/lon temp,rain,4day');
+    the grid is resolved once and one forecast manager answers all of them, so products
+    built from the same forecast share a single download.
     Uses api.weather.gov /points/{lat},{lon} to get grid/office.
-    Supported commands: 2day, 4day, 5day, 7day, hourly, temp, rain, wind
+    Supported commands: 2day, 4day, 5day, 7day, hourly, temp, rain, wind, now
     """
     import re
-    import requests
-    match = re.match(r"loc\s+([+-]?\d+\.\d+)/([+-]?\d+\.\d+)\s*(\w+)?", message)
+    match = re.match(r"loc\s+([+-]?\d+\.\d+)/([+-]?\d+\.\d+)\s*([\w,\s]*)", message)
     if not match:
         return "Invalid location format. Use 'loc lat/lon [command]'."
-    lat, lon, command = match.groups()
+    lat, lon, command_list = match.groups()
+    commands = []
+    for command in re.split(r"[,\s]+", command_list.strip()):
+        if command and command not in commands:
+            commands.append(command)
+    supported = [command for command in LOCATION_FETCHERS if location_product_enabled(command)]
+    unknown = [command for command in commands if command not in supported]
+    if unknown:
+        return f"Unknown loc command: {', '.join(unknown)}\nSupported commands: {', '.join(supported)}"
     # Get NWS grid info
     try:
-        url = f"https://api.weather.gov/points/{lat},{lon}"
-        resp = requests.get(url, headers={"User-Agent": USER_AGENT})
-        resp.raise_for_status()
-        data = resp.json()
-        office = data['properties']['cwa']
-        grid_x = str(data['properties']['gridX'])
-        grid_y = str(data['properties']['gridY'])
+        office, grid_x, grid_y = grid_resolver.resolve(lat, lon)
+    except BudgetExceeded:
+        return "The bot is busy with weather service requests right now. Please try again in a minute."
     except Exception as e:
         return f"Entered grid is invalid or not found for {lat},{lon}: Not part of NWS coverage area."
-    # Create a temporary weather manager for this location
-    temp_manager = WeatherDataManager(office, grid_x, grid_y, USER_AGENT)
-    # Map commands to fetchers
-    fetchers = {
-        '2day': lambda: Forecast2DayFetcher(temp_manager).get_daily_weather(),
-        '4day': lambda: Forecast4DayFetcher(temp_manager).get_weekly_emoji_weather(),
-        '5day': lambda: NWSWeatherFetcher5Day(temp_manager).get_daily_weather(),
-        '7day': lambda: Forecast7DayFetcher(temp_manager).get_weekly_emoji_weather(),
-        'hourly': lambda: EmojiWeatherFetcher(temp_manager).get_emoji_weather(),
-        'temp': lambda: Temperature24HourFetcher(temp_manager).get_temperature_24hour(),
-        'rain': lambda: RainChanceFetcher(temp_manager).get_rain_chance(),
-        'wind': lambda: Wind24HourFetcher(temp_manager).get_wind_24hour(),
-    }
-    if command and command in fetchers:
-        result = fetchers[command]()
-        if isinstance(result, list):
-            return '\n'.join(result)
-        return str(result)
+    if commands:
+        manager = make_weather_manager(office, grid_x, grid_y, api_caller="loc")
+        # Joined line by line, so split_message packs the products into as few messages as fit
+        return '\n'.join(get_location_product(manager, command) for command in commands)
     else:
-        return f"Custom location lookup: lat={lat}, lon={lon}, office={office}, grid=({grid_x},{grid_y})\nSupported commands: {', '.join(fetchers.keys())}"
+        return f"Custom location lookup: lat={lat}, lon={lon}, office={office}, grid=({grid_x},{grid_y})\nSupported commands: {', '.join(supported)}"
+
+
+def make_home_alerts(lat, lon, notifier):
+    return WeatherAlerts(
+        lat,
+        lon,
+        notifier,
+        settings.get("USER_AGENT_APP"),
+        settings.get("USER_AGENT_EMAIL"),
+        settings.get("ALERT_CHECK_INTERVAL", 300),
+        message_delay=settings.get('MESSAGE_DELAY', 10),
+        settings=settings,
+        shared_cache=shared_cache,
+        governor=api_governor
+    )
+
+
+# Home locations set with the home command, grouped by grid cell
+subscriptions = LocationSubscriptions(
+    grid_resolver,
+    radios,
+    make_weather_manager,
+    make_home_alerts if settings.get("HOME_ALERTS", True) else None,
+    watchdog=watchdog
+)
+state_checkpoint.register("subscriptions", subscriptions.get_state, subscriptions.restore_state)
+
+
+def get_sender_manager(link, sender_id):
+    """
+    Forecast manager for the grid cell of the sender's last reported position.
+    Returns (manager, None), or (None, reason) when the position can't be used.
+    """
+    try:
+        grid, position = sender_locator.grid_for(link, sender_id)
+    except Exception as e:
+        logger.info(f"No grid for the position of {sender_id}: {e}")
+        return None, "Your position is not part of the NWS coverage area."
+    if grid is None:
+        return None, "No position known for your node. Share your position on the mesh, or use 'loc lat/lon'."
+    return make_weather_manager(*grid), None
+
+
+def handle_here_command(sender_id, link):
+    """Show the sender's position and grid cell."""
+    try:
+        grid, position = sender_locator.grid_for(link, sender_id)
+    except Exception:
+        return "Your position is not part of the NWS coverage area."
+    if grid is None:
+        return "No position known for your node. Share your position on the mesh, or use 'loc lat/lon'."
+    office, grid_x, grid_y = grid
+    return (f"Your position {position[0]}/{position[1]} is in grid {office} {grid_x},{grid_y}. "
+            f"Add 'here' to a forecast command for this location, such as 'here temp'.")
+
+
+def handle_home_command(message, sender_id, link):
+    """Set, show or remove the sender's home location."""
+    import re
+    if not settings.get("ENABLE_HOME_COMMAND", True):
+        return "The home command is disabled in settings."
+    if re.search(r"\boff\b", message):
+        if subscriptions.unsubscribe(sender_id):
+            return "Home location removed. Forecasts are for the bot's own area again."
+        return "No home location set."
+    match = re.search(r"([+-]?\d+\.\d+)/([+-]?\d+\.\d+)", message)
+    if not match:
+        cell = subscriptions.cell_for(sender_id)
+        if cell is None:
+            return "No home location set. Use 'home lat/lon' to set one."
+        return f"Home location: grid {cell.label}. Send 'home off' to remove it."
+    lat, lon = match.groups()
+    try:
+        cell = subscriptions.subscribe(sender_id, lat, lon, link.name)
+    except Exception as e:
+        logger.info(f"Home location {lat},{lon} not set for {sender_id}: {e}")
+        return f"Entered grid is invalid or not found for {lat},{lon}: Not part of NWS coverage area."
+    alerts_note = " and alerts are sent to you" if cell.alerts else ""
+    return (f"Home set to grid {cell.label}. Forecast commands now use this location{alerts_note}. "
+            f"Send 'home off' to remove it.")
 
 
 def message_listener(packet, interface):
-    global transmission_count
-    global cooldown
-    global DM_MODE
-    global FIREWALL
-    global DUTYCYCLE
-    global MYNODE
+    """
+    Radio callback. The watchdog flags packets that take far too long to handle,
+    and everything logged while handling one carries its packet id.
+    """
+    packet_id = packet.get("id") if isinstance(packet, dict) else None
+    with watchdog.busy("listener"), request_context(f"{packet_id:08x}" if isinstance(packet_id, int) else None), \
+            track_data_age():
+        handle_packet(packet, interface)
+
+
+def age_tag():
+    """
+    A short note of how old the forecast behind the current reply is, once it is
+    older than the hourly refresh (the NWS was unreachable or the budget was tight).
+    """
+    fetch_times = served_fetch_times()
+    if not fetch_times:
+        return ""
+    age = datetime.datetime.now() - min(fetch_times)
+    if age <= datetime.timedelta(hours=1, minutes=5):
+        return ""
+    return f"\n[data {int(age.total_seconds() // 3600)}h old]"
+
+
+def handle_packet(packet, interface):
     global alerts
+    global broadcasts
+
+    # One config snapshot per packet, so a reload never mixes old and new values
+    cfg = config.current
+    # Replies go out through the radio that heard the request, with its own duty cycle and queue
+    link = radios.link_for(interface)
 
     try:
         if packet is not None and packet["decoded"].get("portnum") == "TEXT_MESSAGE_APP":
@@ -391,139 +730,204 @@ def message_listener(packet, interface):
             # Check if it's a DM
             is_direct_message = False
             if "to" in packet:
-                is_direct_message = str(packet["to"]) == str(MYNODE)
+                is_direct_message = str(packet["to"]) == str(link.my_node)
 
             # Only log if it's a DM
             if is_direct_message:
-                logger.info(f"Message {packet['decoded']['text']} from {packet['from']}")
-                logger.info(f"transmission count {transmission_count}")
+                logger.info(f"Message {packet['decoded']['text']} from {packet['from']}, "
+                            f"transmission count {link.transmission_count} on {link.name}")
 
             # Enforce DM_MODE
-            if DM_MODE and not is_direct_message:
+            if cfg.dm_mode and not is_direct_message:
+                return
+
+            command = match_command(message)
+            # Channel chatter that isn't a command needs no further work
+            if command is None and not is_direct_message:
                 return
 
-            # firewall logging
-            if FIREWALL and not any(node in str(packet["from"]) for node in MYNODES):
+            # Firewall, per-command permissions and per-node rate limit
+            denied = access.check(sender_id, command)
+            if denied == AccessControl.FIREWALL:
                 logger.warning(f"Firewall blocked message from {packet['from']}: {message}")
                 return
+            if denied == AccessControl.RATE:
+                logger.warning(f"Rate limit reached for {packet['from']}, ignoring: {message}")
+                return
+            if denied == AccessControl.PERMISSION:
+                logger.warning(f"{packet['from']} is not allowed to use {command}")
+                if is_direct_message and (link.transmission_count < 16 or not cfg.duty_cycle):
+                    link.transmission_count += 1
+                    link.sendText("You don't have permission to use that command.", wantAck=True,
+                                  destinationId=sender_id)
+                return
 
-            if (transmission_count < 16 or DUTYCYCLE == False):
-                first_message_delay = settings.get('FIRST_MESSAGE_DELAY', 3)
-                subsequent_message_delay = settings.get('MESSAGE_DELAY', 10)
+            # Track DM demand for scheduled products to measure broadcast savings
+            if broadcasts and is_direct_message:
+                broadcasts.record_request(message)
 
-                # Helper function to handle message sequences
-                def send_message_sequence(messages, message_type=""):
-                    for i, msg in enumerate(messages):
-                        if i == 0:  # First message
-                            time.sleep(first_message_delay)
-                        interface.sendText(msg, wantAck=True, destinationId=sender_id)
-                        if i < len(messages) - 1:  # Don't delay after last message
-                            time.sleep(subsequent_message_delay)
+            def drop_last_reply():
+                # Pages still queued are dropped (and their duty-cycle count given back)
+                # along with any held for "more"
+                dropped = link.cancel_reply(sender_id)
+                if cfg.page_on_demand:
+                    dropped += page_buffer.drop(sender_id)
+                return dropped
+
+            # "stop" works even while the duty cycle limit keeps the bot from answering
+            stopped_pages = drop_last_reply() if command == "stop" else 0
 
-                if "test" in message:
-                    transmission_count += 1
+            if (link.transmission_count < 16 or cfg.duty_cycle == False):
+                first_message_delay = cfg.first_message_delay
+                subsequent_message_delay = cfg.message_delay
+
+                # A new command that will be answered replaces the last reply to this node
+                if command not in (None, "more", "stop"):
+                    drop_last_reply()
+
+                # Helper function to handle message sequences
+                def send_message_sequence(messages, message_type="", hold=True):
+                    if cfg.page_on_demand and hold and len(messages) > 1:
+                        # Send the first page now and keep the rest until asked for
+                        page_buffer.hold(sender_id, messages[1:], cfg.page_hold_minutes * 60)
+                        messages = messages[:1]
+                    # Paced out by the send worker, so the listener is free to take a newer command
+                    link.send_reply(messages, sender_id, first_delay=first_message_delay,
+                                    delay=subsequent_message_delay)
+
+                # "here" asks for the sender's reported position, otherwise nodes with a home
+                # location get forecasts for their own grid cell. Disabled modules are left to
+                # their own branch below, which says so.
+                location_manager, location_error = None, None
+                if command in LOCATION_FETCHERS and location_product_enabled(command):
+                    home = subscriptions.cell_for(sender_id)
+                    if has_keyword(message, "here"):
+                        location_manager, location_error = get_sender_manager(link, sender_id)
+                    elif home is not None:
+                        location_manager = home.manager
+                    elif cfg.sender_position_forecasts:
+                        # Without a usable position the bot's own area is used as before
+                        location_manager, _ = get_sender_manager(link, sender_id)
+
+                if location_error is not None:
+                    link.transmission_count += 1
+                    time.sleep(first_message_delay)
+                    link.sendText(location_error, wantAck=True, destinationId=sender_id)
+                elif location_manager is not None:
+                    link.transmission_count += 1
+                    time.sleep(first_message_delay)
+                    product = get_location_product(location_manager, command) + age_tag()
+                    if command in SINGLE_MESSAGE_PRODUCTS:
+                        link.sendText(product, wantAck=True, destinationId=sender_id)
+                    else:
+                        messages = split_message(product, message_type=command.capitalize())
+                        send_message_sequence(messages, message_type=command.capitalize())
+                elif command == "test":
+                    link.transmission_count += 1
                     time.sleep(first_message_delay)
                     # Send the temperature message directly without split_message
-                    interface.sendText(" ACK", wantAck=True, destinationId=sender_id)
-                elif "?" in message or "menu" in message:
-                    transmission_count += 1
+                    link.sendText(" ACK", wantAck=True, destinationId=sender_id)
+                elif command == "menu":
+                    link.transmission_count += 1
                     time.sleep(first_message_delay)
-                    menu_text_1 = "    --Multi-Message--\n" \
-                                  "hourly - 24h outlook\n" \
-                                  "7day - 7 day simple\n" \
-                                  "5day - 5 day detailed\n" \
-                                  "wind - 24h wind\n"
-                    menu_text_2 = "    --Single Message--\n" \
-                                  "2day - 2 day detailed\n" \
-                                  "4day - 4 day simple\n" \
-                                  "rain - 24h precipitation\n" \
-                                  "temp - 24h temperature\n"
-                    # Add alert command if enabled
-                    if settings.get("ENABLE_ALERT_COMMAND", True) and settings.get(
-                            "SHOW_ALERT_COMMAND_IN_MENU", True):
-                        menu_text_2 += "alert - show active alerts\n"
-                    if settings.get('SHOW_CUSTOM_LOOKUP_COMMAND_IN_MENU', True):
-                        menu_text_2 += "loc lat/lon - custom location lookup\n"
-                    #check if both show_alert and loc command are disabled
-                    if not settings.get('SHOW_ALERT_COMMAND_IN_MENU', True) and not settings.get(
-                                'SHOW_CUSTOM_LOOKUP_COMMAND_IN_MENU',
-                                                                                                False):
-                        combined_menu = f"{menu_text_1}\n{menu_text_2}".strip()
-                        # If both commands are disabled send menu without using split_message
-                        interface.sendText(combined_menu,wantAck=True, destinationId=sender_id)
+                    if not cfg.menu_paginated:
+                        # Menu fits in one message, send it without page numbering
+                        link.sendText(cfg.menu_messages[0], wantAck=True, destinationId=sender_id)
                         return
-
-                    if settings.get('FULL_MENU', True):
-                        combined_menu = menu_text_1 + "\n" + menu_text_2
-                        messages = split_message(combined_menu, message_type="Menu")
-                        send_message_sequence(messages, message_type="Menu")
-                    else:
-                        simple_menu = "  --Weather Commands--\n" \
-                            "2day - 2 day forecast\n" \
-                            "4day - 4 day forecast\n" \
-                            "temp - 24h temperature\n" \
-                            "rain - 24h precipitation"
-                        if settings.get('ENABLE_ALERT_COMMAND', True):
-                            simple_menu += "\nalert - show active alerts"
-                        if settings.get('ENABLE_CUSTOM_LOOKUP', False):
-                            simple_menu += "\nloc lat/lon - custom location lookup"
-                        messages = split_message(simple_menu, message_type="Menu")
-                        send_message_sequence(messages, message_type="Menu")
-                elif "loc" in message:
-                    transmission_count += 1
+                    send_message_sequence(list(cfg.menu_messages), message_type="Menu", hold=False)
+                elif command == "more":
+                    link.transmission_count += 1
+                    time.sleep(first_message_delay)
+                    page, _ = page_buffer.next_page(sender_id)
+                    link.sendText(page or "No more pages. Send a command for a new reply.",
+                                  wantAck=True, destinationId=sender_id)
+                elif command == "home":
+                    link.transmission_count += 1
+                    time.sleep(first_message_delay)
+                    link.sendText(handle_home_command(message, sender_id, link), wantAck=True, destinationId=sender_id)
+                elif command == "stop":
+                    link.transmission_count += 1
+                    link.sendText(f"Stopped, {stopped_pages} pages dropped." if stopped_pages else "Nothing to stop.",
+                                  wantAck=True, destinationId=sender_id)
+                elif command == "here":
+                    link.transmission_count += 1
+                    time.sleep(first_message_delay)
+                    link.sendText(handle_here_command(sender_id, link), wantAck=True, destinationId=sender_id)
+                elif command == "loc":
+                    link.transmission_count += 1
                     time.sleep(first_message_delay)
                     custom_lookup_result = get_custom_lookup(message)
-                    messages = split_message(str(custom_lookup_result), message_type="Custom")
+                    messages = split_message(str(custom_lookup_result) + age_tag(), message_type="Custom")
                     send_message_sequence(messages, message_type="Custom")
-                elif "temp" in message:
-                    transmission_count += 1
+                elif command == "rainwhen":
+                    link.transmission_count += 1
+                    time.sleep(first_message_delay)
+                    link.sendText(hourly_analytics.get_rain_timing() + age_tag(), wantAck=True, destinationId=sender_id)
+                elif command == "gusts":
+                    link.transmission_count += 1
+                    time.sleep(first_message_delay)
+                    link.sendText(hourly_analytics.get_peak_wind() + age_tag(), wantAck=True, destinationId=sender_id)
+                elif command == "freeze":
+                    link.transmission_count += 1
+                    time.sleep(first_message_delay)
+                    link.sendText(hourly_analytics.get_freezing_hours() + age_tag(), wantAck=True, destinationId=sender_id)
+                elif command == "dry":
+                    link.transmission_count += 1
+                    time.sleep(first_message_delay)
+                    link.sendText(hourly_analytics.get_dry_window() + age_tag(), wantAck=True, destinationId=sender_id)
+                elif command == "trend":
+                    link.transmission_count += 1
+                    time.sleep(first_message_delay)
+                    link.sendText(get_forecast_trend(), wantAck=True, destinationId=sender_id)
+                elif command == "temp":
+                    link.transmission_count += 1
                     time.sleep(first_message_delay)
                     # Send the temperature message directly without split_message
-                    interface.sendText(get_temperature_24hour(), wantAck=True, destinationId=sender_id)
+                    link.sendText(get_temperature_24hour() + age_tag(), wantAck=True, destinationId=sender_id)
 
-                elif "2day" in message:
-                    transmission_count += 1
+                elif command == "2day":
+                    link.transmission_count += 1
                     time.sleep(first_message_delay)
                     # Send the 2-day forecast directly without split_message
-                    interface.sendText(get_forecast_2day(), wantAck=True, destinationId=sender_id)
+                    link.sendText(get_forecast_2day() + age_tag(), wantAck=True, destinationId=sender_id)
 
-                elif "hourly" in message:
-                    if settings.get('ENABLE_HOURLY_WEATHER', True):
-                        transmission_count += 1
+                elif command == "hourly":
+                    if cfg.enable_hourly_weather:
+                        link.transmission_count += 1
                         weather_data = get_emoji_weather()
-                        messages = split_message(weather_data, message_type="Hourly")
+                        messages = split_message(weather_data + age_tag(), message_type="Hourly")
                         send_message_sequence(messages, message_type="Hourly")
                     else:
                         time.sleep(first_message_delay)
                         messages = split_message("Hourly weather module is disabled.", message_type="Hourly")
                         send_message_sequence(messages, message_type="Hourly")
-                elif "rain" in message:
-                    transmission_count += 1
+                elif command == "rain":
+                    link.transmission_count += 1
                     time.sleep(first_message_delay)
                     # Send the rain message directly without split_message
-                    interface.sendText(get_rain_chance(), wantAck=True, destinationId=sender_id)
+                    link.sendText(get_rain_chance() + age_tag(), wantAck=True, destinationId=sender_id)
 
-                elif "5day" in message:
-                    if settings.get('ENABLE_5DAY_FORECAST', True):
-                        transmission_count += 1
+                elif command == "5day":
+                    if cfg.enable_5day_forecast:
+                        link.transmission_count += 1
                         weather_messages = nws_weather_fetcher_5day.get_daily_weather()
-                        messages = split_message('\n'.join(weather_messages), message_type="5day")
+                        messages = split_message('\n'.join(weather_messages) + age_tag(), message_type="5day")
                         send_message_sequence(messages, message_type="5day")
                     else:
                         time.sleep(first_message_delay)
                         messages = split_message("5-day forecast module is disabled.", message_type="5day")
                         send_message_sequence(messages, message_type="5day")
-                elif "4day" in message:
-                    transmission_count += 1
+                elif command == "4day":
+                    link.transmission_count += 1
                     time.sleep(first_message_delay)
                     # Send the 4-day forecast directly without split_message
-                    interface.sendText(get_forecast_4day(), wantAck=True, destinationId=sender_id)
+                    link.sendText(get_forecast_4day() + age_tag(), wantAck=True, destinationId=sender_id)
 
-                elif "wind" in message:
-                    transmission_count += 1
+                elif command == "wind":
+                    link.transmission_count += 1
                     weather_data = wind_24hour.get_wind_24hour()
                     if isinstance(weather_data, list):
-                        weather_text = '\n'.join(weather_data)
+                        weather_text = '\n'.join(weather_data) + age_tag()
                         messages = split_message(weather_text, message_type="Wind")
                         send_message_sequence(messages, message_type="Wind")
                     else:
@@ -532,9 +936,9 @@ def message_listener(packet, interface):
                         time.sleep(first_message_delay)
                         messages = split_message(weather_data, message_type="Wind")
                         send_message_sequence(messages, message_type="Wind")
-                elif "advertise" in message:
-                    transmission_count += 1
-                    interface.sendText(
+                elif command == "advertise":
+                    link.transmission_count += 1
+                    link.sendText(
                         "Hello all! I am a weather bot that does weather alerts and forecasts. "
                         "You can DM me \"?\" for a list of my forecast commands.\n\n"
                         "For more information, check me out on Github. https://github.com/oasis6212/Meshbot_weather",
@@ -542,25 +946,53 @@ def message_listener(packet, interface):
                         destinationId="^all"
                     )
 
-                elif "7day" in message:
-                    if settings.get('ENABLE_7DAY_FORECAST', True):
-                        transmission_count += 1
+                elif command == "7day":
+                    if cfg.enable_7day_forecast:
+                        link.transmission_count += 1
                         weather_data = forecast_7day.get_weekly_emoji_weather()
-                        messages = split_message(weather_data, message_type="7day")
+                        messages = split_message(weather_data + age_tag(), message_type="7day")
                         send_message_sequence(messages, message_type="7day")
                     else:
                         time.sleep(first_message_delay)
                         messages = split_message("7-day forecast module is disabled.", message_type="7day")
                         send_message_sequence(messages, message_type="7day")
-                elif "alert-status" in message:
-                    transmission_count += 1
-                    interface.sendText(get_weather_alert_status(), wantAck=True, destinationId=sender_id)
-                elif "alert" in message:
-                    transmission_count += 1
-                    if alerts:
-                        if not alerts.broadcast_full_alert(sender_id):
+                elif command == "now":
+                    link.transmission_count += 1
+                    time.sleep(first_message_delay)
+                    link.sendText(current_conditions.report(weather_manager.grid), wantAck=True,
+                                  destinationId=sender_id)
+                elif command == "alert-status":
+                    link.transmission_count += 1
+                    link.sendText(get_weather_alert_status(), wantAck=True, destinationId=sender_id)
+                elif command == "cache-status":
+                    link.transmission_count += 1
+                    link.sendText(snapshot_store.get_status(), wantAck=True, destinationId=sender_id)
+                elif command == "delivery-status":
+                    link.transmission_count += 1
+                    link.sendText(delivery_tracker.get_status(), wantAck=True, destinationId=sender_id)
+                elif command == "api-status":
+                    link.transmission_count += 1
+                    messages = split_message(api_governor.get_status(), message_type="API")
+                    send_message_sequence(messages, message_type="API", hold=False)
+                elif command == "health-status":
+                    link.transmission_count += 1
+                    health = watchdog.get_status() + f"\nLog records dropped: {log_pipeline.dropped}"
+                    if packet_trace:
+                        health += f"\nTrace packets dropped: {packet_trace.dropped}"
+                    messages = split_message(health, message_type="Health")
+                    send_message_sequence(messages, message_type="Health", hold=False)
+                elif command == "alert":
+                    link.transmission_count += 1
+                    # Subscribers get the alert for their home grid cell
+                    home = subscriptions.cell_for(sender_id)
+                    monitor = home.alerts if home is not None and home.alerts else alerts
+                    if monitor:
+                        alert_pages = monitor.full_alert_messages()
+                        if alert_pages:
+                            send_message_sequence(alert_pages, message_type="Alert")
+                        else:
                             time.sleep(first_message_delay)
-                            if not settings.get('ENABLE_ALERT_COMMAND', True):
+                            if not cfg.enable_alert_command:
                                 messages = split_message(
                                     "The full-alert command is disabled in settings.", message_type="Alert"
                                 )
@@ -573,14 +1005,17 @@ def message_listener(packet, interface):
                 else:
                     # If it's a DM but doesn't match any command, send a random help message
                     if is_direct_message:
-                        transmission_count += 1
-                        interface.sendText(
+                        link.transmission_count += 1
+                        link.sendText(
                             random.choice(UNRECOGNIZED_MESSAGES),
                             wantAck=True,
                             destinationId=sender_id
                         )
+            else:
+                link.duty_cycle_rejections += 1
+                logger.info(f"Duty cycle limit reached on {link.name}, not replying to {packet['from']}")
     except KeyError as e:
-        node_name = interface.getMyNodeInfo().get('user', {}).get('longName', 'Unknown')
+        node_name = link.getMyNodeInfo().get('user', {}).get('longName', 'Unknown')
         logger.error(f'Attached node "{node_name}" was unable to decode incoming message, possible key mismatch in its node-database.')
         return
     except Exception as e:
@@ -589,10 +1024,10 @@ def message_listener(packet, interface):
 
 def signal_handler(sig, frame):
     """Perform a graceful shutdown when CTRL+C is pressed"""
-    global interface
     logger.info("\nClosing program. Please wait...")
+    state_checkpoint.save()
     try:
-        if interface is not None:
+        for interface in radios:
             if settings.get('SHUTDOWN_NODE_ON_EXIT', False):
                 logger.info("Sending shutdown command to node...")
                 try:
@@ -607,7 +1042,7 @@ def signal_handler(sig, frame):
             else:
                 logger.info("Node shutdown disabled in settings, skipping sending power off command.")
 
-            logger.info("Closing Meshtastic interface...")
+            logger.info(f"Closing Meshtastic interface {interface.name}...")
             interface.close()
         logger.info("Shutdown complete")
     except Exception as e:
@@ -615,27 +1050,26 @@ def signal_handler(sig, frame):
     sys.exit(0)
 
 def main():
-    global interface, alerts  # Add alerts to global declaration
+    global alerts, broadcasts  # Add alerts to global declaration
     signal.signal(signal.SIGINT, signal_handler)
 
     logger.info("Starting program.")
     reset_transmission_count()
-    if settings.get('DUTYCYCLE', False):
-        reset_cooldown()
+    reset_cooldown()
 
     parser = argparse.ArgumentParser(description="Meshbot_Weather a bot for Meshtastic devices")
-    parser.add_argument("--port", type=str, help="Specify the serial port to probe")
-    parser.add_argument("--host", type=str, help="Specify meshtastic host (IP address) if using API")
+    parser.add_argument("--port", type=str, action="append", default=[],
+                        help="Specify the serial port to probe (repeat to attach several radios)")
+    parser.add_argument("--host", type=str, action="append", default=[],
+                        help="Specify meshtastic host (IP address) if using API (repeat to attach several radios)")
 
     args = parser.parse_args()
 
-    if args.port:
-        serial_ports = [args.port]
-        logger.info(f"Serial port {serial_ports}\n")
-    elif args.host:
-        ip_host = args.host
-        print(ip_host)
-        logger.info(f"Meshtastic API host {ip_host}\n")
+    if args.port or args.host:
+        for port in args.port:
+            logger.info(f"Serial port {port}\n")
+        for ip_host in args.host:
+            logger.info(f"Meshtastic API host {ip_host}\n")
     else:
         serial_ports = find_serial_ports()
         if serial_ports:
@@ -651,51 +1085,95 @@ def main():
 
     logger.info(f"Press CTRL-C to close the program")
     logger.info(f"Connecting to Meshtastic node...")
-    # Create interface
-    if args.host:
-        interface = meshtastic.tcp_interface.TCPInterface(hostname=ip_host, noProto=False)
-    else:
-        interface = meshtastic.serial_interface.SerialInterface(serial_ports[0])
-
-    global MYNODE
-    MYNODE = get_my_node_id(interface)
-    #logger.info("Connected to Meshtastic Node:")
-    logger.info(f"Automatically detected MYNODE ID: {MYNODE}")
-
-    if DM_MODE and not MYNODE:
-        logger.error("DM_MODE is enabled but failed to get MYNODE ID. Please check connection to device.")
-        exit(1)
-
-    if settings.get('ENABLE_AUTO_REBOOT', True):
-        reboot_thread = threading.Thread(
-            target=schedule_daily_reboot,
-            args=(interface,),
-            daemon=True
-        )
-        reboot_thread.start()
-        logger.info("Daily reboot scheduler started")
+    # Create interfaces
+    for port in args.port:
+        radios.add(meshtastic.serial_interface.SerialInterface(port), port)
+    for ip_host in args.host:
+        radios.add(meshtastic.tcp_interface.TCPInterface(hostname=ip_host, noProto=False), ip_host)
+
+    for link in radios:
+        link.my_node = get_my_node_id(link)
+        #logger.info("Connected to Meshtastic Node:")
+        logger.info(f"Automatically detected MYNODE ID on {link.name}: {link.my_node}")
+
+        if config.current.dm_mode and not link.my_node:
+            logger.error(f"DM_MODE is enabled but failed to get MYNODE ID on {link.name}. Please check connection to device.")
+            exit(1)
+
+        if settings.get('ENABLE_AUTO_REBOOT', True):
+            reboot_thread = threading.Thread(
+                target=schedule_daily_reboot,
+                args=(link,),
+                daemon=True
+            )
+            reboot_thread.start()
+            logger.info(f"Daily reboot scheduler started for {link.name}")
 
-    try:
-        my_info = interface.getMyNodeInfo()
-    #   logger.info("Connected to Meshtastic Node:")
-        logger.info(f"Node Name: {my_info.get('user', {}).get('longName', 'Unknown')}")
-    except Exception as e:
-        logger.error(f"Failed to get node info: {e}")
+        try:
+            my_info = link.getMyNodeInfo()
+        #   logger.info("Connected to Meshtastic Node:")
+            logger.info(f"Node Name: {my_info.get('user', {}).get('longName', 'Unknown')}")
+        except Exception as e:
+            logger.error(f"Failed to get node info: {e}")
+
+    state_checkpoint.register("duty_cycle", get_duty_cycle_state, restore_duty_cycle_state,
+                              version=lambda: [(link.transmission_count, link.cooldown) for link in radios])
 
     message_delay = settings.get('MESSAGE_DELAY', 10)
 
     alerts = WeatherAlerts(
         settings.get("ALERT_LAT"),
         settings.get("ALERT_LON"),
-        interface,
+        radios,
         settings.get("USER_AGENT_APP"),
         settings.get("USER_AGENT_EMAIL"),
         settings.get("ALERT_CHECK_INTERVAL", 300),
         message_delay=message_delay,
-        settings=settings
+        settings=settings,
+        shared_cache=shared_cache,
+        watchdog=watchdog,
+        governor=api_governor
     )
+    state_checkpoint.register("alerts", alerts.get_state, alerts.restore_state)
     alerts.start_monitoring()
+    subscriptions.start_alerts(settings.get("ALERT_CHECK_INTERVAL", 300))
+
+    # A poller that hasn't finished a check for two intervals past the stall limit is restarted
+    alert_interval = settings.get("ALERT_CHECK_INTERVAL", 300)
+    watchdog.watch("alerts", restart=alerts.start_monitoring,
+                   max_silence=alert_interval * 2 + watchdog.stall_after)
+    if subscriptions.make_alerts:
+        watchdog.watch("home-alerts", restart=lambda: subscriptions.start_alerts(alert_interval),
+                       max_silence=alert_interval * 2 + watchdog.stall_after,
+                       stall_after=max(watchdog.stall_after, alert_interval))
+
+    broadcasts = BroadcastScheduler(
+        radios,
+        settings.get("BROADCAST_SCHEDULE", []),
+        BROADCAST_PRODUCTS,
+        channel_index=settings.get("BROADCAST_CHANNEL_INDEX", 0),
+        message_delay=message_delay,
+        savings_window_hours=settings.get("BROADCAST_SAVINGS_WINDOW_HOURS", 3)
+    )
+    state_checkpoint.register("broadcasts", broadcasts.get_state, broadcasts.restore_state)
+    broadcasts.start()
+    state_checkpoint.start()
+
+    def apply_reloaded_settings(new_config):
+        alerts.message_delay = new_config.message_delay
+        alerts.channel_index = new_config.get('ALERT_CHANNEL_INDEX', 0)
+        broadcasts.message_delay = new_config.message_delay
+
+    config.on_reload(apply_reloaded_settings)
+    config.start_watching(settings.get("CONFIG_RELOAD_INTERVAL", 5))
+    if packet_trace:
+        pub.subscribe(packet_trace.record, "meshtastic.receive")
+        logger.info(f"Recording received packets to {settings.get('PACKET_TRACE_FILE')}")
     pub.subscribe(message_listener, "meshtastic.receive")
+    pub.subscribe(delivery_tracker.on_routing, "meshtastic.receive.routing")
+    delivery_tracker.start()
+    connectivity.start()
+    watchdog.start(settings.get("WATCHDOG_CHECK_INTERVAL", 10))
 
     while True:
         time.sleep(1)
@@ -742,32 +1220,22 @@ def get_my_node_id(interface):
 
 def get_weather_alert_status():
     """
-    Check if the weather alert monitor is functioning properly.
+    Check if the weather alert monitor is functioning properly, from the age of
+    its last successful poll rather than a test request of our own.
     Returns a status message indicating if the system is working or not.
     """
-    try:
-        # Build the API URL and parameters similar to weather_alert_monitor.py
-        base_url = f"https://api.weather.gov/alerts/active"
-        params = {
-            "point": f"{settings.get('ALERT_LAT')},{settings.get('ALERT_LON')}"
-        }
-        headers = {
-            "User-Agent": f"({settings.get('USER_AGENT_APP')}, {settings.get('USER_AGENT_EMAIL')})"
-        }
-
-        # Test the API connection
-        response = requests.get(base_url, params=params, headers=headers)
-        response.raise_for_status()
-
-        # If we get here, the connection is working
-        return "🟢 Alert System: Active and monitoring for weather alerts"
-
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Weather Alert Monitor Status Check Failed: {str(e)}")
-        return "🔴 Alert System: Unable to connect to weather service"
-    except Exception as e:
-        logger.error(f"Weather Alert Monitor Status Check Failed: {str(e)}")
-        return "🔴 Alert System: Service interrupted - check logs"
+    if alerts is None:
+        return "🔴 Alert System: Not started"
+    if alerts.last_check is None:
+        return "🟡 Alert System: Started, waiting for the first successful check"
+
+    age = time.time() - alerts.last_check
+    minutes = int(age // 60)
+    if watchdog.is_stalled("alerts"):
+        return f"🔴 Alert System: Poller stalled, last successful check {minutes} min ago - check logs"
+    if age > alerts.check_interval * 2 + 60:
+        return f"🔴 Alert System: Unable to reach weather service, last successful check {minutes} min ago"
+    return f"🟢 Alert System: Active, last checked {minutes} min ago"
 
 
 if __name__ == "__main__":
@@ -0,0 +1,75 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Past this many tracked nodes, buckets that have refilled completely are dropped
+MAX_TRACKED_NODES = 1024
+
+
+class AccessControl:
+    """
+    Decides whether a node may run a command before any work is done for it.
+    Node ids are matched exactly against precomputed sets, so each check is a few
+    hash lookups regardless of how many nodes or groups are configured:
+
+    - firewall: when FIREWALL is on, only MYNODES and members of ACCESS_GROUPS are answered
+    - permissions: commands listed in COMMAND_PERMISSIONS are limited to the named groups
+    - rate limit: each node gets a token bucket of RATE_LIMIT_COMMANDS per RATE_LIMIT_WINDOW seconds
+    """
+    ALLOWED = None
+    FIREWALL = "firewall"
+    PERMISSION = "permission"
+    RATE = "rate"
+
+    def __init__(self, config):
+        self.lock = threading.Lock()
+        self.buckets = {}  # node id -> [tokens, last refill time]
+        self.configure(config)
+
+    def configure(self, config):
+        """Rebuild the lookup tables from a BotConfig. Rate-limit buckets carry over."""
+        node_groups = {}
+        for group, nodes in config.access_groups.items():
+            for node in nodes:
+                node_groups.setdefault(node, set()).add(group)
+        self.firewall = config.firewall
+        self.allowed_nodes = config.firewall_nodes
+        self.node_groups = {node: frozenset(groups) for node, groups in node_groups.items()}
+        self.permissions = {command: frozenset(groups) for command, groups in config.command_permissions.items()}
+        self.capacity = config.rate_limit_commands
+        self.refill_rate = config.rate_limit_commands / config.rate_limit_window if config.rate_limit_window else 0
+
+    def check(self, node_id, command):
+        """Return None if the node may run the command, otherwise the reason it may not."""
+        node = str(node_id)
+        if self.firewall and node not in self.allowed_nodes:
+            return self.FIREWALL
+        required = self.permissions.get(command)
+        if required and required.isdisjoint(self.node_groups.get(node, ())):
+            return self.PERMISSION
+        if self.capacity and not self._take_token(node):
+            return self.RATE
+        return self.ALLOWED
+
+    def _take_token(self, node):
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(node)
+            if bucket is None:
+                if len(self.buckets) >= MAX_TRACKED_NODES:
+                    self._prune(now)
+                bucket = self.buckets[node] = [self.capacity, now]
+            else:
+                bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.refill_rate)
+                bucket[1] = now
+            if bucket[0] < 1:
+                return False
+            bucket[0] -= 1
+            return True
+
+    def _prune(self, now):
+        for node, (tokens, last) in list(self.buckets.items()):
+            if tokens + (now - last) * self.refill_rate >= self.capacity:
+                del self.buckets[node]
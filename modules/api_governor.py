@@ -0,0 +1,120 @@
+import time
+import logging
+import threading
+from collections import defaultdict, deque
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Lower numbers go first. Alert polls are never held back for anything else, and
+# loc lookups are the first to wait or fall back to cached data.
+PRIORITIES = {
+    "alerts": 0,
+    "startup": 0,
+    "probe": 0,
+    "forecast": 1,
+    "observations": 1,
+    "location": 2,
+    "points": 3,
+    "loc": 3,
+}
+LOWEST_PRIORITY = max(PRIORITIES.values())
+# Fraction of the burst each priority must leave in the bucket for the ones above it
+RESERVES = {0: 0.0, 1: 0.25, 2: 0.4, 3: 0.5}
+# Seconds each priority may wait for a token before giving up
+MAX_WAIT = {0: 60, 1: 15, 2: 10, 3: 5}
+
+
+class BudgetExceeded(requests.RequestException):
+    """Raised instead of making a request when the NWS budget has no room for the caller."""
+
+
+class Offline(requests.ConnectionError):
+    """Raised instead of making a request while the NWS is known to be unreachable."""
+
+
+class ApiGovernor:
+    """
+    Process-wide token bucket in front of every api.weather.gov request. Tokens
+    refill at requests_per_minute up to burst. Each caller has a priority, and
+    lower priorities must leave part of the bucket untouched, so when traffic
+    builds up loc lookups are held back first and alert polls last.
+    """
+    def __init__(self, requests_per_minute=30, burst=10):
+        self.rate = requests_per_minute / 60.0
+        self.burst = max(1, burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.condition = threading.Condition()
+        self.recent = defaultdict(deque)  # caller -> times of requests in the last minute
+        self.totals = defaultdict(int)
+        self.denied = defaultdict(int)
+        # Optional Connectivity told about every request that fails to connect
+        self.connectivity = None
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, caller, wait=None):
+        """Take a token for a caller, waiting up to its priority's limit. Returns False if none was free."""
+        priority = PRIORITIES.get(caller, LOWEST_PRIORITY)
+        # Never more than the bucket holds; with a burst under 2 there is no room for reserves
+        needed = min(self.burst, 1 + self.burst * RESERVES[priority])
+        deadline = time.monotonic() + (MAX_WAIT[priority] if wait is None else wait)
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= needed:
+                    self.tokens -= 1
+                    self._record(caller, now)
+                    return True
+                if now >= deadline:
+                    self.denied[caller] += 1
+                    logger.info(f"NWS request budget is tight, holding back a {caller} request")
+                    return False
+                until_token = (needed - self.tokens) / self.rate if self.rate else deadline - now
+                self.condition.wait(min(until_token, deadline - now))
+
+    def _record(self, caller, now):
+        self.totals[caller] += 1
+        recent = self.recent[caller]
+        recent.append(now)
+        while recent and now - recent[0] > 60:
+            recent.popleft()
+
+    def get_status(self):
+        """Requests per minute by caller, for the api-status command."""
+        with self.condition:
+            now = time.monotonic()
+            self._refill(now)
+            lines = [f"NWS budget: {self.rate * 60:g}/min, {self.tokens:.1f} of {self.burst} free"]
+            if self.connectivity is not None and self.connectivity.offline:
+                lines.append(f"NWS unreachable for {int(time.time() - self.connectivity.offline_since)}s")
+            for caller in sorted(set(self.totals) | set(self.denied), key=lambda c: PRIORITIES.get(c, LOWEST_PRIORITY)):
+                per_minute = sum(1 for sent in self.recent[caller] if now - sent <= 60)
+                lines.append(f"{caller}: {per_minute}/min, {self.totals[caller]} total, {self.denied[caller]} held back")
+        return "\n".join(lines)
+
+
+def nws_get(governor, caller, url, **kwargs):
+    """
+    requests.get for an api.weather.gov url, through the governor when there is
+    one. While its Connectivity says the NWS is offline only probes are sent.
+    """
+    connectivity = getattr(governor, "connectivity", None)
+    if connectivity is not None and connectivity.offline and caller != "probe":
+        raise Offline("NWS is unreachable")
+    if governor is not None and not governor.acquire(caller):
+        raise BudgetExceeded(f"NWS request budget has no room for {caller}")
+    try:
+        response = requests.get(url, **kwargs)
+    except (requests.ConnectionError, requests.Timeout):
+        if connectivity is not None:
+            connectivity.report(False)
+        raise
+    if connectivity is not None:
+        connectivity.report(True)
+    return response
@@ -0,0 +1,218 @@
+import time
+import threading
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+
+from modules.message_utils import match_command
+
+logger = logging.getLogger(__name__)
+
+# Days of DM requests kept to estimate demand without broadcasts
+BASELINE_DAYS = 7
+
+
+class BroadcastScheduler:
+    """
+    Posts selected forecast products to a channel at fixed times of day, so one
+    transmission replaces the many DMs that would otherwise ask for the same thing.
+
+    Each schedule entry looks like {"time": "06:00", "command": "4day"}. The
+    products argument maps a command name to a callable returning a list of
+    ready-to-send pages.
+
+    Savings are measured against demand without broadcasts: the same hours on
+    earlier days when the product wasn't broadcast, or failing that the average
+    request rate outside every broadcast's measurement window.
+    """
+    def __init__(self, interface, schedule, products, channel_index=0, message_delay=10,
+                 savings_window_hours=3):
+        self.interface = interface
+        self.products = products
+        self.channel_index = channel_index
+        self.message_delay = message_delay
+        self.savings_window = timedelta(hours=savings_window_hours)
+        self.entries = self._parse_schedule(schedule or [])
+
+        self.lock = threading.Lock()
+        # Timestamps of DM requests per product, and the measurement windows of
+        # past broadcasts, kept for BASELINE_DAYS as the demand baseline
+        self.request_history = {command: deque() for command in self.products}
+        self.broadcast_windows = {command: deque() for command in self.products}
+        self.tracking_since = datetime.now()
+        self.pending_windows = []
+        self.total_saved = 0
+        self.total_broadcasts = 0
+
+    def _parse_schedule(self, schedule):
+        entries = []
+        for entry in schedule:
+            try:
+                hour, minute = (int(part) for part in str(entry['time']).split(':'))
+                command = str(entry['command']).strip().lower()
+            except (KeyError, TypeError, ValueError, AttributeError):
+                logger.warning(f"Ignoring invalid broadcast schedule entry: {entry}")
+                continue
+            if command not in self.products:
+                logger.warning(f"Ignoring broadcast of unsupported command '{command}'")
+                continue
+            entries.append({'hour': hour, 'minute': minute, 'command': command, 'last_sent': None})
+        return entries
+
+    def record_request(self, message):
+        """Note a DM request so broadcast savings can be measured against it."""
+        command = match_command(message)
+        if command not in self.request_history:
+            return
+        now = datetime.now()
+        with self.lock:
+            history = self.request_history[command]
+            history.append(now)
+            self._prune(command, now)
+
+    def _prune(self, command, now):
+        cutoff = now - timedelta(days=BASELINE_DAYS)
+        history = self.request_history[command]
+        while history and history[0] < cutoff:
+            history.popleft()
+        windows = self.broadcast_windows[command]
+        while windows and windows[0][1] < cutoff:
+            windows.popleft()
+
+    def _count_requests(self, command, start, end):
+        return sum(1 for ts in self.request_history[command] if start <= ts < end)
+
+    def _overlaps_broadcast(self, command, start, end):
+        return any(start < window_end and window_start < end
+                   for window_start, window_end in self.broadcast_windows[command])
+
+    def _baseline(self, command, start, end):
+        """Expected DM requests for a product between start and end had it not been broadcast, or None."""
+        earliest = max(self.tracking_since, start - timedelta(days=BASELINE_DAYS))
+        # The same hours on earlier days without a broadcast of this product
+        counts = []
+        for days_back in range(1, BASELINE_DAYS + 1):
+            day_start, day_end = start - timedelta(days=days_back), end - timedelta(days=days_back)
+            if day_start >= earliest and not self._overlaps_broadcast(command, day_start, day_end):
+                counts.append(self._count_requests(command, day_start, day_end))
+        if counts:
+            return sum(counts) / len(counts)
+
+        # Otherwise the request rate over the time outside every broadcast window
+        quiet = start - earliest
+        requests = self._count_requests(command, earliest, start)
+        for window_start, window_end in self.broadcast_windows[command]:
+            overlap_start, overlap_end = max(window_start, earliest), min(window_end, start)
+            if overlap_start < overlap_end:
+                quiet -= overlap_end - overlap_start
+                requests -= self._count_requests(command, overlap_start, overlap_end)
+        if quiet < end - start:
+            return None
+        return requests * ((end - start) / quiet)
+
+    def _close_windows(self, now):
+        """Settle savings for broadcasts whose measurement window has ended."""
+        with self.lock:
+            still_open = []
+            for window in self.pending_windows:
+                command, sent_at = window
+                end = sent_at + self.savings_window
+                if now < end:
+                    still_open.append(window)
+                    continue
+                self.broadcast_windows[command].append((sent_at, end))
+                self._prune(command, now)
+                baseline = self._baseline(command, sent_at, end)
+                after = self._count_requests(command, sent_at, end)
+                if baseline is None:
+                    logger.info(f"Broadcast {command} at {sent_at:%H:%M}: {after} DM requests after broadcast, "
+                                f"not enough history without broadcasts to measure savings yet")
+                    continue
+                saved = max(0, round(baseline - after))
+                self.total_saved += saved
+                logger.info(
+                    f"Broadcast {command} at {sent_at:%H:%M}: {baseline:.1f} DM requests expected without it, "
+                    f"{after} after broadcast, {saved} saved ({self.total_saved} total)"
+                )
+            self.pending_windows = still_open
+
+    def broadcast(self, command):
+        """Send every page of a product to the broadcast channel."""
+        messages = self.products[command]()
+        if not messages:
+            return False
+
+        for i, msg in enumerate(messages, 1):
+            self.interface.sendText(
+                msg,
+                wantAck=False,
+                channelIndex=self.channel_index,
+            )
+            if i < len(messages):  # Don't sleep after last message
+                time.sleep(self.message_delay)
+
+        with self.lock:
+            self.total_broadcasts += 1
+            self.pending_windows.append((command, datetime.now()))
+        logger.info(f"Broadcast {command} to channel {self.channel_index} ({len(messages)} messages)")
+        return True
+
+    def run_pending(self):
+        """Broadcast any entry whose time has come and that has not been sent today."""
+        now = datetime.now()
+        for entry in self.entries:
+            due = now.replace(hour=entry['hour'], minute=entry['minute'], second=0, microsecond=0)
+            if now < due or entry['last_sent'] == now.date():
+                continue
+            # Don't fire a morning broadcast hours late after a restart
+            if now - due > timedelta(minutes=10):
+                entry['last_sent'] = now.date()
+                continue
+            entry['last_sent'] = now.date()
+            try:
+                self.broadcast(entry['command'])
+            except Exception as e:
+                logger.error(f"Failed to broadcast {entry['command']}: {str(e)}")
+        self._close_windows(now)
+
+    def _entry_key(self, entry):
+        return f"{entry['hour']:02d}:{entry['minute']:02d} {entry['command']}"
+
+    def get_state(self):
+        """Send dates and savings totals to carry across a restart."""
+        return {
+            'last_sent': {
+                self._entry_key(entry): entry['last_sent'].isoformat()
+                for entry in self.entries if entry['last_sent']
+            },
+            'total_saved': self.total_saved,
+            'total_broadcasts': self.total_broadcasts,
+        }
+
+    def restore_state(self, state):
+        """Restore saved send dates so a restart doesn't repeat today's broadcasts."""
+        last_sent = state.get('last_sent', {})
+        for entry in self.entries:
+            sent = last_sent.get(self._entry_key(entry))
+            if sent:
+                entry['last_sent'] = datetime.fromisoformat(sent).date()
+        self.total_saved = state.get('total_saved', 0)
+        self.total_broadcasts = state.get('total_broadcasts', 0)
+
+    def start(self):
+        """Start the scheduler in a separate thread."""
+        if not self.entries:
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.run_pending()
+                except Exception as e:
+                    logger.error(f"Error in broadcast scheduler: {str(e)}")
+                finally:
+                    time.sleep(30)
+
+        scheduler_thread = threading.Thread(target=loop, daemon=True)
+        scheduler_thread.start()
+        logger.info(f"Broadcast scheduler started with {len(self.entries)} scheduled broadcasts")
@@ -0,0 +1,286 @@
+import os
+import time
+import yaml
+import logging
+import threading
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable, FrozenSet, Mapping, Tuple
+
+from modules.message_utils import split_message
+from modules.weather_glyphs import GLYPH_SETS
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigError(ValueError):
+    pass
+
+
+# settings.yaml key -> (attribute, type, default) for the values read on every packet,
+# or that must be valid before a reload is accepted
+SCHEMA = {
+    "MYNODES": ("mynodes", tuple, ()),
+    "FIREWALL": ("firewall", bool, False),
+    "DM_MODE": ("dm_mode", bool, False),
+    "DUTYCYCLE": ("duty_cycle", bool, False),
+    "FIRST_MESSAGE_DELAY": ("first_message_delay", float, 3),
+    "MESSAGE_DELAY": ("message_delay", float, 10),
+    "ENABLE_ALERT_COMMAND": ("enable_alert_command", bool, True),
+    "SHOW_ALERT_COMMAND_IN_MENU": ("show_alert_command_in_menu", bool, True),
+    "SHOW_CUSTOM_LOOKUP_COMMAND_IN_MENU": ("show_custom_lookup_command_in_menu", bool, True),
+    "ENABLE_CUSTOM_LOOKUP": ("enable_custom_lookup", bool, False),
+    "ENABLE_7DAY_FORECAST": ("enable_7day_forecast", bool, True),
+    "ENABLE_5DAY_FORECAST": ("enable_5day_forecast", bool, True),
+    "ENABLE_HOURLY_WEATHER": ("enable_hourly_weather", bool, True),
+    "FULL_MENU": ("full_menu", bool, True),
+    "PAGE_ON_DEMAND": ("page_on_demand", bool, False),
+    "PAGE_HOLD_MINUTES": ("page_hold_minutes", float, 10),
+    "SENDER_POSITION_FORECASTS": ("sender_position_forecasts", bool, False),
+    "SHOW_ANALYTICS_COMMANDS_IN_MENU": ("show_analytics_commands_in_menu", bool, True),
+    "ACCESS_GROUPS": ("access_groups", dict, MappingProxyType({})),
+    "COMMAND_PERMISSIONS": ("command_permissions", dict, MappingProxyType({})),
+    "RATE_LIMIT_COMMANDS": ("rate_limit_commands", float, 0),
+    "RATE_LIMIT_WINDOW": ("rate_limit_window", float, 60),
+    "USER_AGENT_APP": ("user_agent_app", str, "myweatherapp"),
+    "USER_AGENT_EMAIL": ("user_agent_email", str, "contact@example.com"),
+    "GLYPH_OVERRIDES": ("glyph_overrides", "glyphs", MappingProxyType({})),
+}
+
+
+@dataclass(frozen=True)
+class BotConfig:
+    """
+    Validated, read-only view of settings.yaml. Values used on every packet are
+    typed attributes, and the menu, firewall list and user agent are built once
+    per load rather than per message.
+    """
+    mynodes: Tuple[str, ...]
+    firewall: bool
+    dm_mode: bool
+    duty_cycle: bool
+    first_message_delay: float
+    message_delay: float
+    enable_alert_command: bool
+    show_alert_command_in_menu: bool
+    show_custom_lookup_command_in_menu: bool
+    enable_custom_lookup: bool
+    enable_7day_forecast: bool
+    enable_5day_forecast: bool
+    enable_hourly_weather: bool
+    full_menu: bool
+    page_on_demand: bool
+    page_hold_minutes: float
+    sender_position_forecasts: bool
+    show_analytics_commands_in_menu: bool
+    access_groups: Mapping[str, Tuple[str, ...]]
+    command_permissions: Mapping[str, Tuple[str, ...]]
+    rate_limit_commands: float
+    rate_limit_window: float
+    user_agent_app: str
+    user_agent_email: str
+    glyph_overrides: Mapping[str, Any]
+    # Derived values
+    user_agent: str = ""
+    firewall_nodes: FrozenSet[str] = frozenset()
+    menu_messages: Tuple[str, ...] = ()
+    menu_paginated: bool = True
+    raw: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+
+    def get(self, key, default=None):
+        """dict-style access for modules that read less frequently used settings."""
+        return self.raw.get(key, default)
+
+
+def _coerce(key, value, kind):
+    if kind is bool:
+        if not isinstance(value, bool):
+            raise ConfigError(f"{key} must be true or false, got {value!r}")
+        return value
+    if kind is float:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ConfigError(f"{key} must be a number, got {value!r}")
+        if value < 0:
+            raise ConfigError(f"{key} must not be negative, got {value!r}")
+        return value
+    if kind is tuple:
+        if value is None:
+            return ()
+        if not isinstance(value, list):
+            raise ConfigError(f"{key} must be a list, got {value!r}")
+        return tuple(str(item).strip() for item in value)
+    if kind is dict:
+        if not isinstance(value, dict):
+            raise ConfigError(f"{key} must be a mapping of names to lists, got {value!r}")
+        return MappingProxyType({
+            str(name).strip().lower(): _coerce(f"{key}.{name}", items, tuple)
+            for name, items in value.items()
+        })
+    if kind == "glyphs":
+        # Each weather category maps to one glyph, or a [day, night] pair
+        if not isinstance(value, dict):
+            raise ConfigError(f"{key} must be a mapping of weather names to symbols, got {value!r}")
+        overrides = {}
+        for name, glyph in value.items():
+            if name not in GLYPH_SETS["emoji"]:
+                raise ConfigError(f"{key} has unknown weather name {name!r}, use one of: {', '.join(GLYPH_SETS['emoji'])}")
+            if isinstance(glyph, list) and len(glyph) == 2:
+                overrides[name] = (str(glyph[0]), str(glyph[1]))
+            elif isinstance(glyph, (list, dict)) or glyph is None:
+                raise ConfigError(f"{key}.{name} must be one symbol or a [day, night] pair, got {glyph!r}")
+            else:
+                overrides[name] = str(glyph)
+        return MappingProxyType(overrides)
+    return str(value)
+
+
+def build_menu(values):
+    """Return (pages, paginated) for the menu command."""
+    menu_text_1 = "    --Multi-Message--\n" \
+                  "hourly - 24h outlook\n" \
+                  "7day - 7 day simple\n" \
+                  "5day - 5 day detailed\n" \
+                  "wind - 24h wind\n"
+    menu_text_2 = "    --Single Message--\n" \
+                  "2day - 2 day detailed\n" \
+                  "4day - 4 day simple\n" \
+                  "rain - 24h precipitation\n" \
+                  "temp - 24h temperature\n" \
+                  "now - current conditions\n"
+    # Add alert command if enabled
+    if values["enable_alert_command"] and values["show_alert_command_in_menu"]:
+        menu_text_2 += "alert - show active alerts\n"
+    if values["show_custom_lookup_command_in_menu"]:
+        menu_text_2 += "loc lat/lon - custom location lookup\n"
+    insights = "\n    --Insights--\n" \
+               "rainwhen - rain start/stop\n" \
+               "gusts - peak wind\n" \
+               "freeze - hours below 32°\n" \
+               "dry - best 3h dry window\n" \
+               "trend - forecast changes\n"
+    # If both show_alert and loc command are disabled the menu is sent without page numbering
+    # when it fits in one message
+    if not values["show_alert_command_in_menu"] and not values["show_custom_lookup_command_in_menu"]:
+        short_menu = f"{menu_text_1}\n{menu_text_2}"
+        if values["show_analytics_commands_in_menu"]:
+            short_menu += insights
+        short_menu = short_menu.strip()
+        pages = split_message(short_menu, message_type="Menu")
+        if len(pages) == 1:
+            return (short_menu,), False
+        return tuple(pages), True
+
+    if values["full_menu"]:
+        combined_menu = menu_text_1 + "\n" + menu_text_2
+        if values["show_analytics_commands_in_menu"]:
+            combined_menu += insights
+        return tuple(split_message(combined_menu, message_type="Menu")), True
+
+    simple_menu = "  --Weather Commands--\n" \
+        "2day - 2 day forecast\n" \
+        "4day - 4 day forecast\n" \
+        "temp - 24h temperature\n" \
+        "rain - 24h precipitation\n" \
+        "now - current conditions"
+    if values["enable_alert_command"]:
+        simple_menu += "\nalert - show active alerts"
+    if values["enable_custom_lookup"]:
+        simple_menu += "\nloc lat/lon - custom location lookup"
+    return tuple(split_message(simple_menu, message_type="Menu")), True
+
+
+def compile_config(raw):
+    """Validate a raw settings mapping and build a BotConfig from it."""
+    if not isinstance(raw, dict):
+        raise ConfigError("settings.yaml must contain a mapping of settings")
+    values = {}
+    for key, (attribute, kind, default) in SCHEMA.items():
+        value = raw.get(key)
+        values[attribute] = default if value is None else _coerce(key, value, kind)
+
+    for command, groups in values['command_permissions'].items():
+        unknown = [group for group in groups if group.lower() not in values['access_groups']]
+        if unknown:
+            raise ConfigError(f"COMMAND_PERMISSIONS.{command} names unknown groups: {', '.join(unknown)}")
+    values['command_permissions'] = MappingProxyType({
+        command: tuple(group.lower() for group in groups)
+        for command, groups in values['command_permissions'].items()
+    })
+    if values['rate_limit_commands'] and not values['rate_limit_window']:
+        raise ConfigError("RATE_LIMIT_WINDOW must be greater than 0 when RATE_LIMIT_COMMANDS is set")
+
+    menu_messages, menu_paginated = build_menu(values)
+    return BotConfig(
+        **values,
+        user_agent=f"({values['user_agent_app']}, {values['user_agent_email']})",
+        # Group members are trusted nodes too, so they get past the firewall
+        firewall_nodes=frozenset(values['mynodes']).union(*values['access_groups'].values()),
+        menu_messages=menu_messages,
+        menu_paginated=menu_paginated,
+        raw=MappingProxyType(dict(raw)),
+    )
+
+
+class ConfigStore:
+    """
+    Holds the current BotConfig and swaps in a new one when settings.yaml changes
+    on disk. Readers take `store.current` once and use that snapshot throughout,
+    so a reload never mixes old and new values within one message.
+    """
+    def __init__(self, path, overrides=None):
+        self.path = path
+        self.overrides = dict(overrides or {})
+        self.listeners = []
+        self.mtime = os.path.getmtime(path)
+        self.current = compile_config(self._read())
+
+    def _read(self):
+        with open(self.path, "r") as file:
+            raw = yaml.safe_load(file)
+        if isinstance(raw, dict):
+            raw.update(self.overrides)
+        return raw
+
+    def get(self, key, default=None):
+        return self.current.get(key, default)
+
+    def set_overrides(self, overrides):
+        """Apply values worked out at runtime (such as the NWS grid) over the file."""
+        self.overrides.update(overrides)
+        self.current = compile_config({**self.current.raw, **self.overrides})
+
+    def on_reload(self, callback: Callable[[BotConfig], None]):
+        self.listeners.append(callback)
+
+    def reload(self):
+        """Load settings.yaml again, keeping the old config if the new one is invalid."""
+        try:
+            new_config = compile_config(self._read())
+        except (OSError, yaml.YAMLError, ConfigError, TypeError) as e:
+            logger.error(f"Ignoring changes to {self.path}: {e}")
+            return False
+        self.current = new_config
+        logger.info(f"Reloaded settings from {self.path}")
+        for callback in self.listeners:
+            try:
+                callback(new_config)
+            except Exception as e:
+                logger.error(f"Error applying reloaded settings: {e}")
+        return True
+
+    def start_watching(self, interval=5):
+        """Check settings.yaml for changes in a separate thread."""
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    mtime = os.path.getmtime(self.path)
+                except OSError:
+                    continue
+                if mtime != self.mtime:
+                    self.mtime = mtime
+                    self.reload()
+
+        watch_thread = threading.Thread(target=watch, daemon=True)
+        watch_thread.start()
@@ -0,0 +1,66 @@
+import time
+import logging
+import threading
+
+import requests
+
+from modules.api_governor import nws_get
+
+logger = logging.getLogger(__name__)
+
+PROBE_URL = "https://api.weather.gov/"
+
+
+class Connectivity:
+    """
+    Whether api.weather.gov can be reached. After `failures` requests in a row
+    fail to connect or time out, the NWS counts as offline: other requests fail
+    at once instead of each waiting out its timeout, forecasts are answered from
+    the cached snapshots, and a light probe runs every probe_interval seconds
+    until one gets through.
+    """
+    def __init__(self, governor=None, user_agent="", probe_interval=20, failures=2):
+        self.governor = governor
+        self.headers = {"User-Agent": user_agent}
+        self.probe_interval = probe_interval
+        self.failures_needed = failures
+        self.failures = 0
+        self.offline_since = None
+        self.lock = threading.Lock()
+
+    @property
+    def offline(self):
+        return self.offline_since is not None
+
+    def report(self, ok):
+        """Record the outcome of a request that reached (or failed to reach) the NWS."""
+        with self.lock:
+            if ok:
+                self.failures = 0
+                if self.offline_since is not None:
+                    logger.info(f"NWS reachable again after {int(time.time() - self.offline_since)}s offline")
+                    self.offline_since = None
+                return
+            self.failures += 1
+            if self.offline_since is None and self.failures >= self.failures_needed:
+                self.offline_since = time.time()
+                logger.warning("NWS unreachable, serving cached forecasts until it is back")
+
+    def probe(self):
+        """Try the NWS once. Returns True if it answered."""
+        try:
+            nws_get(self.governor, "probe", PROBE_URL, headers=self.headers, timeout=10)
+            return True
+        except requests.RequestException:
+            return False
+
+    def start(self):
+        """Probe in a separate thread whenever the NWS is offline."""
+        def loop():
+            while True:
+                time.sleep(self.probe_interval)
+                if self.offline:
+                    self.probe()
+
+        probe_thread = threading.Thread(target=loop, daemon=True)
+        probe_thread.start()
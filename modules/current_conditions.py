@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+from datetime import datetime, timezone
+
+from modules.api_governor import nws_get
+
+logger = logging.getLogger(__name__)
+
+COMPASS = ("N", "NE", "E", "SE", "S", "SW", "W", "NW")
+# Observations older than this are skipped in favour of the next nearest station
+MAX_OBSERVATION_AGE = 2 * 3600
+
+
+def _value(properties, key):
+    return (properties.get(key) or {}).get('value')
+
+
+def _fahrenheit(celsius):
+    return round(celsius * 9 / 5 + 32)
+
+
+def _mph(kmh):
+    return round(kmh * 0.621371)
+
+
+class StationIndex:
+    """
+    The nearest observation stations of each grid cell, looked up once with
+    /gridpoints/{office}/{x},{y}/stations and kept in a JSON file on disk, since
+    stations almost never change.
+    """
+    def __init__(self, path, user_agent, governor=None, keep=3):
+        self.path = path
+        self.headers = {"User-Agent": user_agent}
+        self.governor = governor
+        self.keep = keep
+        self.stations = {}  # "office/x,y" -> [station id, ...] nearest first
+        self.grid_locks = {}
+        self.lock = threading.Lock()
+        # Saves one at a time, so an older copy can't replace a newer one
+        self.save_lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as file:
+                self.stations = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable station cache {self.path}: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self.save_lock:
+            with self.lock:
+                stations = dict(self.stations)
+            try:
+                with tempfile.NamedTemporaryFile("w", dir=directory, prefix=".stations-", delete=False) as file:
+                    json.dump(stations, file)
+                os.replace(file.name, self.path)
+            except OSError as e:
+                logger.error(f"Failed to save station cache to {self.path}: {e}")
+
+    def _grid_lock(self, grid):
+        with self.lock:
+            return self.grid_locks.setdefault(grid, threading.Lock())
+
+    def nearest(self, grid):
+        """Station ids for a grid ("office/x,y"), nearest first. Raises requests exceptions on lookup failure."""
+        stations = self.stations.get(grid)
+        if stations:
+            return stations
+        # Only lookups for the same grid wait on each other
+        with self._grid_lock(grid):
+            stations = self.stations.get(grid)
+            if stations:
+                return stations
+            response = nws_get(self.governor, "observations", f"https://api.weather.gov/gridpoints/{grid}/stations",
+                               headers=self.headers, timeout=10)
+            response.raise_for_status()
+            stations = [feature['properties']['stationIdentifier']
+                        for feature in response.json().get('features', [])[:self.keep]]
+            if stations:
+                with self.lock:
+                    self.stations[grid] = stations
+                self._save()
+                logger.info(f"Observation stations for {grid}: {', '.join(stations)}")
+            return stations
+
+
+class CurrentConditions:
+    """
+    Latest observations for the now command. Each station's observation is kept
+    for ttl seconds, and only one request per station is in flight at a time;
+    anyone else asking meanwhile waits for it and shares the answer.
+    """
+    def __init__(self, stations, user_agent, governor=None, ttl=300):
+        self.stations = stations
+        self.headers = {"User-Agent": user_agent}
+        self.governor = governor
+        self.ttl = ttl
+        self.latest = {}  # station id -> (observation properties, fetched at)
+        self.station_locks = {}
+        self.lock = threading.Lock()
+
+    def _station_lock(self, station):
+        with self.lock:
+            return self.station_locks.setdefault(station, threading.Lock())
+
+    def observation(self, station):
+        """The latest observation properties for a station, or None."""
+        cached = self.latest.get(station)
+        if cached and time.time() - cached[1] < self.ttl:
+            return cached[0]
+        with self._station_lock(station):
+            # Someone else may have fetched it while we waited
+            cached = self.latest.get(station)
+            if cached and time.time() - cached[1] < self.ttl:
+                return cached[0]
+            response = nws_get(self.governor, "observations",
+                               f"https://api.weather.gov/stations/{station}/observations/latest",
+                               headers=self.headers, timeout=10)
+            response.raise_for_status()
+            properties = response.json().get('properties', {})
+            self.latest[station] = (properties, time.time())
+            return properties
+
+    def _usable(self, properties):
+        if _value(properties, 'temperature') is None:
+            return False
+        try:
+            observed = datetime.fromisoformat(properties['timestamp'].replace('Z', '+00:00'))
+        except (KeyError, AttributeError, ValueError):
+            return False
+        return (datetime.now(timezone.utc) - observed).total_seconds() < MAX_OBSERVATION_AGE
+
+    def report(self, grid):
+        """One-message current conditions for a grid, from its nearest station with a recent observation."""
+        try:
+            stations = self.stations.nearest(grid)
+        except Exception as e:
+            logger.error(f"Error finding observation stations for {grid}: {e}")
+            return "Error: Unable to find a weather station for this area"
+        for station in stations:
+            try:
+                properties = self.observation(station)
+            except Exception as e:
+                logger.error(f"Error fetching observation from {station}: {e}")
+                continue
+            if self._usable(properties):
+                return self.format(station, properties)
+        return "Error: No recent observation from nearby stations"
+
+    def format(self, station, properties):
+        observed = datetime.fromisoformat(properties['timestamp'].replace('Z', '+00:00'))
+        minutes = int((datetime.now(timezone.utc) - observed).total_seconds() // 60)
+        temp = _fahrenheit(_value(properties, 'temperature'))
+        parts = [f"Now {station} ({minutes}m ago): {temp}°F {properties.get('textDescription') or ''}".rstrip()]
+
+        feels = _value(properties, 'heatIndex')
+        if feels is None:
+            feels = _value(properties, 'windChill')
+        if feels is not None and abs(_fahrenheit(feels) - temp) >= 3:
+            parts.append(f"Feels {_fahrenheit(feels)}°F")
+
+        speed = _value(properties, 'windSpeed')
+        if speed is not None:
+            direction = _value(properties, 'windDirection')
+            compass = COMPASS[int((direction + 22.5) // 45) % 8] + " " if direction is not None and speed else ""
+            wind = f"Wind {compass}{_mph(speed)}mph"
+            gust = _value(properties, 'windGust')
+            if gust:
+                wind += f" g{_mph(gust)}"
+            parts.append(wind)
+
+        humidity = _value(properties, 'relativeHumidity')
+        if humidity is not None:
+            parts.append(f"RH {round(humidity)}%")
+        return ". ".join(parts)
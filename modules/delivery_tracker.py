@@ -0,0 +1,145 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def packet_id_of(packet):
+    """The id of a packet returned by sendText, which may be a MeshPacket or a dict."""
+    if isinstance(packet, dict):
+        return packet.get("id")
+    return getattr(packet, "id", None)
+
+
+class DeliveryTracker:
+    """
+    Follows every direct message sent with wantAck until the destination
+    acknowledges it. A page that is refused or not acknowledged within
+    ack_timeout seconds is queued again on the same radio after a backoff of
+    retry_backoff * 2 ** attempt seconds, up to max_retries times. Only the
+    missing pages are resent, never the whole reply.
+
+    Every resend is charged to the link's duty-cycle count like a new reply,
+    and can_retry(link) is asked both when a retry is scheduled and when it is
+    due, so lost acks can't put more on the air than the budget allows.
+
+    Acknowledgements arrive as ROUTING_APP packets on meshtastic.receive.routing
+    whose requestId is the id sendText returned for the page.
+    """
+    def __init__(self, max_retries=2, ack_timeout=90, retry_backoff=30, can_retry=None):
+        self.max_retries = max_retries
+        self.ack_timeout = ack_timeout
+        self.retry_backoff = retry_backoff
+        self.can_retry = can_retry
+        self.lock = threading.Lock()
+        self.pending = {}  # (interface id, packet id) -> delivery
+        self.retries = []  # (due time, delivery) waiting to be queued again
+        self.pages_sent = 0
+        self.delivered = 0
+        self.failed = 0
+        self.retransmissions = 0
+
+    def track(self, link, packet, text, kwargs, attempt):
+        """Called by a RadioLink after a page with wantAck has gone to the radio."""
+        packet_id = packet_id_of(packet)
+        if packet_id is None:
+            return
+        with self.lock:
+            if attempt == 0:
+                self.pages_sent += 1
+            self.pending[(id(link.interface), packet_id)] = {
+                "link": link, "text": text, "kwargs": kwargs, "attempt": attempt, "sent_at": time.time(),
+            }
+
+    def on_routing(self, packet, interface):
+        """Handle an ack or nak for one of our pages."""
+        decoded = packet.get("decoded", {})
+        request_id = decoded.get("requestId")
+        if not request_id:
+            return
+        error = decoded.get("routing", {}).get("errorReason", "NONE")
+        with self.lock:
+            delivery = self.pending.get((id(interface), request_id))
+            if delivery is None:
+                return
+            # A relay repeating our packet comes back as an ack from our own node; wait for the real one
+            if error == "NONE" and str(packet.get("from")) == str(delivery["link"].my_node):
+                return
+            del self.pending[(id(interface), request_id)]
+            if error == "NONE":
+                self.delivered += 1
+                return
+        logger.info(f"Page to {delivery['kwargs'].get('destinationId')} was not delivered: {error}")
+        self._schedule_retry(delivery)
+
+    def _schedule_retry(self, delivery):
+        attempt = delivery["attempt"]
+        if attempt >= self.max_retries or (self.can_retry and not self.can_retry(delivery["link"])):
+            with self.lock:
+                self.failed += 1
+            logger.warning(f"Giving up on page to {delivery['kwargs'].get('destinationId')} "
+                           f"after {attempt + 1} attempts")
+            return
+        with self.lock:
+            self.retries.append((time.time() + self.retry_backoff * 2 ** attempt, delivery))
+
+    def check(self):
+        """Time out unacknowledged pages and queue any retries that are due."""
+        now = time.time()
+        with self.lock:
+            expired = [key for key, delivery in self.pending.items() if now - delivery["sent_at"] > self.ack_timeout]
+            timed_out = [self.pending.pop(key) for key in expired]
+        for delivery in timed_out:
+            self._schedule_retry(delivery)
+
+        with self.lock:
+            due = [delivery for due_at, delivery in self.retries if due_at <= now]
+            self.retries = [(due_at, delivery) for due_at, delivery in self.retries if due_at > now]
+        for delivery in due:
+            link = delivery["link"]
+            if self.can_retry and not self.can_retry(link):
+                with self.lock:
+                    self.failed += 1
+                logger.warning(f"Duty cycle limit reached on {link.name}, not resending page to "
+                               f"{delivery['kwargs'].get('destinationId')}")
+                continue
+            with self.lock:
+                self.retransmissions += 1
+            link.transmission_count += 1
+            logger.info(f"Resending page to {delivery['kwargs'].get('destinationId')}, "
+                        f"attempt {delivery['attempt'] + 2}")
+            link.resend(delivery["text"], delivery["kwargs"], delivery["attempt"] + 1)
+
+    def forget(self, link, destination):
+        """Stop following pages to a node on a link, once its reply has been replaced by a newer one."""
+        def superseded(delivery):
+            return delivery["link"] is link and delivery["kwargs"].get("destinationId") == destination
+
+        with self.lock:
+            for key in [key for key, delivery in self.pending.items() if superseded(delivery)]:
+                del self.pending[key]
+            self.retries = [(due_at, delivery) for due_at, delivery in self.retries if not superseded(delivery)]
+
+    def get_status(self):
+        with self.lock:
+            settled = self.delivered + self.failed
+            rate = f"{100 * self.delivered / settled:.0f}%" if settled else "n/a"
+            in_flight = len(self.pending) + len(self.retries)
+            return (f"Delivery: {rate} acked of {self.pages_sent} pages, "
+                    f"{self.retransmissions} resent, {self.failed} failed, {in_flight} pending")
+
+    def start(self, interval=5):
+        """Check for timed out pages in a separate thread."""
+
+        def loop():
+            while True:
+                try:
+                    self.check()
+                except Exception as e:
+                    logger.error(f"Error in delivery tracker: {str(e)}")
+                finally:
+                    time.sleep(interval)
+
+        tracker_thread = threading.Thread(target=loop, daemon=True)
+        tracker_thread.start()
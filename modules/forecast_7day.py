@@ -1,30 +1,10 @@
+from modules.weather_glyphs import default_glyphs
+
+
 class Forecast7DayFetcher:  # Changed from Forecast10DayFetcher
-    def __init__(self, weather_manager):
+    def __init__(self, weather_manager, glyphs=None):
         self.weather_manager = weather_manager
-        self.weather_emojis = {
-            "clear": "🌙",
-            "sunny": "☀️",
-            "partly sunny": "🌤️",
-            "mostly sunny": "🌤️",
-            "partly cloudy": "⛅",
-            "mostly cloudy": "🌥️",
-            "cloudy": "☁️",
-            "rain": "🌧️",
-            "showers": "🌧️",
-            "thunderstorm": "⛈️",
-            "snow": "🌨️",
-            "fog": "🌫️"
-        }
-        self.rain_emoji = "💧"
-
-    def _get_emoji(self, forecast):
-        forecast = forecast.lower()
-        if "thunderstorm" in forecast:
-            return self.weather_emojis["thunderstorm"]
-        for key, emoji in self.weather_emojis.items():
-            if key in forecast:
-                return emoji
-        return "🌡️"
+        self.glyphs = glyphs or default_glyphs
 
     def _get_rain_chance(self, properties):
         prob = properties.get('probabilityOfPrecipitation', {}).get('value', 0)
@@ -65,10 +45,10 @@ class Forecast7DayFetcher:  # Changed from Forecast10DayFetcher
                 night_period = periods[0]
                 day_name = self._format_day_name(night_period['name'], True)
                 low_temp = night_period['temperature']
-                night_emoji = self._get_emoji(night_period['shortForecast'])
+                night_emoji = self.glyphs.for_period(night_period)
                 night_rain = self._get_rain_chance(night_period)
 
-                line = f"{day_name} {self.rain_emoji}{night_rain}% ❌ {night_emoji} ❌ ↓{low_temp}°"
+                line = f"{day_name} {self.glyphs.rain}{night_rain}% ❌ {night_emoji} ❌ ↓{low_temp}°"
                 result.append(line)
 
                 # Process remaining days
@@ -85,13 +65,13 @@ class Forecast7DayFetcher:  # Changed from Forecast10DayFetcher
                     night_rain = self._get_rain_chance(night_period)
                     max_rain = max(day_rain, night_rain)
 
-                    day_emoji = self._get_emoji(day_period['shortForecast'])
-                    night_emoji = self._get_emoji(night_period['shortForecast'])
+                    day_emoji = self.glyphs.for_period(day_period)
+                    night_emoji = self.glyphs.for_period(night_period)
 
                     high_temp = day_period['temperature']
                     low_temp = night_period['temperature']
 
-                    line = f"{day_name} {self.rain_emoji}{max_rain}% {day_emoji} {night_emoji} ↑{high_temp}° ↓{low_temp}°"
+                    line = f"{day_name} {self.glyphs.rain}{max_rain}% {day_emoji} {night_emoji} ↑{high_temp}° ↓{low_temp}°"
                     result.append(line)
             else:
                 # Process all days normally, with special handling for first day
@@ -111,13 +91,13 @@ class Forecast7DayFetcher:  # Changed from Forecast10DayFetcher
                     night_rain = self._get_rain_chance(night_period)
                     max_rain = max(day_rain, night_rain)
 
-                    day_emoji = self._get_emoji(day_period['shortForecast'])
-                    night_emoji = self._get_emoji(night_period['shortForecast'])
+                    day_emoji = self.glyphs.for_period(day_period)
+                    night_emoji = self.glyphs.for_period(night_period)
 
                     high_temp = day_period['temperature']
                     low_temp = night_period['temperature']
 
-                    line = f"{day_name} {self.rain_emoji}{max_rain}% {day_emoji} {night_emoji} ↑{high_temp}° ↓{low_temp}°"
+                    line = f"{day_name} {self.glyphs.rain}{max_rain}% {day_emoji} {night_emoji} ↑{high_temp}° ↓{low_temp}°"
                     result.append(line)
 
             # Change the return to limit to 7 days
@@ -0,0 +1,145 @@
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+
+class ForecastHistory:
+    """
+    Append-only record of every forecast the bot downloads, one row per period,
+    indexed by (grid, product, issued, valid). Rows older than retention_days are
+    pruned. Used to show how a forecast has changed between NWS updates without
+    calling the api again.
+    """
+    def __init__(self, path, retention_days=14):
+        self.path = path
+        self.retention = timedelta(days=retention_days)
+        self.lock = threading.Lock()
+        self.last_prune = 0
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS forecasts (
+                grid TEXT NOT NULL,
+                product TEXT NOT NULL,
+                issued TEXT NOT NULL,
+                valid TEXT NOT NULL,
+                is_daytime INTEGER,
+                temperature INTEGER,
+                pop INTEGER,
+                short_forecast TEXT,
+                recorded_at REAL NOT NULL,
+                PRIMARY KEY (grid, product, issued, valid)
+            );
+            CREATE INDEX IF NOT EXISTS forecasts_recorded ON forecasts (recorded_at);
+        """)
+
+    def record(self, grid, product, data):
+        """Store the periods of a downloaded forecast. Re-recording the same issue is a no-op."""
+        properties = data.get('properties', {})
+        issued = properties.get('updateTime') or datetime.now().astimezone().isoformat()
+        now = time.time()
+        rows = [
+            (
+                grid, product, issued, period['startTime'],
+                period.get('isDaytime'),
+                period.get('temperature'),
+                (period.get('probabilityOfPrecipitation') or {}).get('value'),
+                period.get('shortForecast'),
+                now,
+            )
+            for period in properties.get('periods', []) if period.get('startTime')
+        ]
+        with self.lock:
+            self.connection.execute("BEGIN")
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO forecasts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self.connection.execute("COMMIT")
+            if now - self.last_prune > 3600:
+                self.prune(now)
+
+    def prune(self, now=None):
+        """Delete rows recorded before the retention period."""
+        cutoff = (now or time.time()) - self.retention.total_seconds()
+        self.last_prune = now or time.time()
+        deleted = self.connection.execute("DELETE FROM forecasts WHERE recorded_at < ?", (cutoff,)).rowcount
+        if deleted:
+            logger.info(f"Pruned {deleted} forecast history rows")
+
+    def period_history(self, grid, start, end, is_daytime, since):
+        """
+        Every issued forecast for the daily period (day or night) starting in
+        [start, end), oldest first, limited to issues recorded after `since`
+        (epoch seconds). Returns a list of (issued, temperature, pop).
+        """
+        # Narrow down by date in SQL, then compare the actual times, which may carry any utc offset
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT issued, valid, temperature, pop FROM forecasts "
+                "WHERE grid = ? AND product = 'daily' AND valid >= ? AND valid < ? AND is_daytime = ? "
+                "AND recorded_at >= ? ORDER BY issued",
+                (grid, (start - timedelta(days=1)).date().isoformat(), (end + timedelta(days=2)).date().isoformat(),
+                 int(is_daytime), since)
+            ).fetchall()
+        return [(issued, temperature, pop) for issued, valid, temperature, pop in rows
+                if start <= datetime.fromisoformat(valid) < end]
+
+    def upcoming_periods(self, grid, now=None):
+        """
+        (start, end) of tonight's period and tomorrow's daytime period in the latest
+        recorded daily forecast, or None for either. Tonight is the night not yet over,
+        so after midnight it is still the night in progress, and tomorrow is the first
+        daytime period that hasn't started yet.
+        """
+        now = now or datetime.now().astimezone()
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT valid, is_daytime FROM forecasts WHERE grid = ? AND product = 'daily' AND issued = "
+                "(SELECT MAX(issued) FROM forecasts WHERE grid = ? AND product = 'daily') ORDER BY valid",
+                (grid, grid)
+            ).fetchall()
+        starts = [(datetime.fromisoformat(valid), is_daytime) for valid, is_daytime in rows]
+        tonight = tomorrow = None
+        for i, (start, is_daytime) in enumerate(starts):
+            end = starts[i + 1][0] if i + 1 < len(starts) else start + timedelta(hours=12)
+            # The first period of an issue can start part way through; earlier issues
+            # started it at the usual time, 12 hours before its end
+            period = (min(start, end - timedelta(hours=12)), end)
+            if not is_daytime and tonight is None and end > now:
+                tonight = period
+            elif is_daytime and tomorrow is None and start > now:
+                tomorrow = period
+        return tonight, tomorrow
+
+    def get_trend(self, grid, hours=24):
+        """Summarise how tonight's low and tomorrow's high and rain chance have changed."""
+        since = time.time() - hours * 3600
+        tonight, tomorrow = self.upcoming_periods(grid)
+        high = self.period_history(grid, *tomorrow, True, since) if tomorrow else []
+        low = self.period_history(grid, *tonight, False, since) if tonight else []
+        if not high and not low:
+            return "No forecast history yet. Trends show after the forecast has been downloaded a few times."
+
+        lines = [f"Forecast trend, last {hours}h"]
+
+        def change(label, rows, index, unit):
+            values = [row[index] for row in rows if row[index] is not None]
+            if not values:
+                return
+            first, last = values[0], values[-1]
+            if first == last:
+                lines.append(f"{label}: {last}{unit}, steady")
+            else:
+                lines.append(f"{label}: {first}{unit}→{last}{unit} ({last - first:+d})")
+
+        day = f"{tomorrow[0]:%a}" if tomorrow else "Tomorrow"
+        change(f"{day} high", high, 1, "°")
+        change("Tonight low", low, 1, "°")
+        change(f"{day} rain", high, 2, "%")
+        issues = len({row[0] for row in high + low})
+        lines.append(f"{issues} NWS update{'s' if issues != 1 else ''}")
+        return "\n".join(lines)
@@ -0,0 +1,187 @@
+import math
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# NWS gridded forecasts use a Lambert conformal projection tangent at 25N on a
+# sphere, with 2.5 km cells
+EARTH_RADIUS = 6371200.0
+STANDARD_PARALLEL = math.radians(25.0)
+CENTRAL_MERIDIAN = math.radians(-95.0)
+CELL_SIZE = 2539.703
+
+_N = math.sin(STANDARD_PARALLEL)
+_F = math.cos(STANDARD_PARALLEL) * math.tan(math.pi / 4 + STANDARD_PARALLEL / 2) ** _N / _N
+_RHO0 = EARTH_RADIUS * _F / math.tan(math.pi / 4 + STANDARD_PARALLEL / 2) ** _N
+
+
+def project(lat, lon):
+    """Return the projected (x, y) in meters of a point."""
+    rho = EARTH_RADIUS * _F / math.tan(math.pi / 4 + math.radians(float(lat)) / 2) ** _N
+    theta = _N * (math.radians(float(lon)) - CENTRAL_MERIDIAN)
+    return rho * math.sin(theta), _RHO0 - rho * math.cos(theta)
+
+
+def _start_fits(value, index):
+    # The office's grid origin along one axis, as the interval (lo, hi] that puts
+    # the sample in its cell. Both axis directions are tried until samples rule one out.
+    return [[sign, sign * value - (index + 1) * CELL_SIZE, sign * value - index * CELL_SIZE] for sign in (1, -1)]
+
+
+def _fold(fits, value, index):
+    folded = []
+    for sign, lo, hi in fits:
+        lo = max(lo, sign * value - (index + 1) * CELL_SIZE)
+        hi = min(hi, sign * value - index * CELL_SIZE)
+        if lo < hi:
+            folded.append([sign, lo, hi])
+    return folded
+
+
+def _predict(fits, value, margin):
+    """The cell index along one axis, or None if the origin fit leaves it uncertain."""
+    indexes = set()
+    for sign, lo, hi in fits:
+        low = (sign * value - hi) / CELL_SIZE
+        high = (sign * value - lo) / CELL_SIZE
+        index = math.floor(low)
+        # Every origin in the interval must put the point in the same cell, with
+        # room to spare for rounding on NWS's side
+        if low - index < margin or high > index + 1 - margin:
+            return None
+        indexes.add(index)
+    return indexes.pop() if len(indexes) == 1 else None
+
+
+def _in_rings(lon, lat, rings):
+    inside = False
+    for ring in rings:
+        j = len(ring) - 1
+        for i in range(len(ring)):
+            xi, yi = ring[i][0], ring[i][1]
+            xj, yj = ring[j][0], ring[j][1]
+            if (yi > lat) != (yj > lat) and lon < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+                inside = not inside
+            j = i
+    return inside
+
+
+class GridProjection:
+    """
+    Works out NWS grid cells locally instead of asking the /points api.
+
+    Each /points answer is a sample of an office's grid. The samples narrow down
+    where the office's grid origin sits in the projection, and the office is used
+    locally once its fit has predicted `validation_samples` further answers
+    correctly. Which office covers a point comes from the polygons of the forecast
+    zones seen in /points answers. Points near a zone edge or a cell edge, or in
+    zones or offices not seen yet, return None so the caller asks /points.
+    """
+    def __init__(self, validation_samples=3, cell_margin=0.05, zone_margin=0.01):
+        self.validation_samples = validation_samples
+        self.cell_margin = cell_margin
+        self.zone_margin = zone_margin
+        self.offices = {}  # office -> {"x": fits, "y": fits, "samples", "validated"}
+        self.zones = {}  # zone id -> {"office", "bbox", "polygons"}
+        self.lock = threading.Lock()
+        self.local_hits = 0
+
+    def learn(self, lat, lon, office, grid_x, grid_y):
+        """Fold a /points answer into the office's fit. Returns False if the fit had predicted another cell."""
+        x, y = project(lat, lon)
+        grid_x, grid_y = int(grid_x), int(grid_y)
+        with self.lock:
+            entry = self.offices.get(office)
+            if entry is None:
+                self.offices[office] = self._new_entry(x, y, grid_x, grid_y)
+                return True
+            predicted = self._predict_entry(entry, x, y)
+            if predicted is not None and predicted != (grid_x, grid_y):
+                logger.warning(f"Grid projection for {office} predicted {predicted} but /points "
+                               f"answered {(grid_x, grid_y)} at {lat},{lon}; starting its fit again")
+                self.offices[office] = self._new_entry(x, y, grid_x, grid_y)
+                return False
+            fits_x = _fold(entry["x"], x, grid_x)
+            fits_y = _fold(entry["y"], y, grid_y)
+            if not fits_x or not fits_y:
+                logger.warning(f"Grid projection samples for {office} disagree; starting its fit again")
+                self.offices[office] = self._new_entry(x, y, grid_x, grid_y)
+                return False
+            entry["x"], entry["y"] = fits_x, fits_y
+            entry["samples"] += 1
+            if predicted is not None:
+                entry["validated"] += 1
+            return True
+
+    def _new_entry(self, x, y, grid_x, grid_y):
+        return {"x": _start_fits(x, grid_x), "y": _start_fits(y, grid_y), "samples": 1, "validated": 0}
+
+    def _predict_entry(self, entry, x, y):
+        grid_x = _predict(entry["x"], x, self.cell_margin)
+        grid_y = _predict(entry["y"], y, self.cell_margin)
+        if grid_x is None or grid_y is None:
+            return None
+        return grid_x, grid_y
+
+    def has_zone(self, zone_id):
+        with self.lock:
+            return zone_id in self.zones
+
+    def add_zone(self, zone_id, office, geometry):
+        """Keep a forecast zone's polygon (GeoJSON Polygon or MultiPolygon) as covered by an office."""
+        if not geometry or geometry.get("type") not in ("Polygon", "MultiPolygon"):
+            return
+        polygons = geometry["coordinates"]
+        if geometry["type"] == "Polygon":
+            polygons = [polygons]
+        points = [point for polygon in polygons for ring in polygon for point in ring]
+        bbox = [min(p[0] for p in points), min(p[1] for p in points),
+                max(p[0] for p in points), max(p[1] for p in points)]
+        with self.lock:
+            existing = self.zones.get(zone_id)
+            if existing is not None and existing["office"] != office:
+                # A zone shared between offices can't decide the office on its own
+                office = None
+            self.zones[zone_id] = {"office": office, "bbox": bbox, "polygons": polygons}
+
+    def _zone_office(self, lat, lon):
+        # The office whose zone holds the point and everything within zone_margin degrees of it
+        margin = self.zone_margin
+        probes = [(lon, lat), (lon - margin, lat), (lon + margin, lat), (lon, lat - margin), (lon, lat + margin)]
+        found = None
+        for zone in self.zones.values():
+            west, south, east, north = zone["bbox"]
+            if not (west - margin <= lon <= east + margin and south - margin <= lat <= north + margin):
+                continue
+            hits = [any(_in_rings(x, y, polygon) for polygon in zone["polygons"]) for x, y in probes]
+            if all(hits):
+                found = zone
+                break
+            if any(hits):
+                return None
+        return found["office"] if found else None
+
+    def locate(self, lat, lon):
+        """Return (office, grid_x, grid_y) worked out locally, or None to fall back to /points."""
+        lat, lon = float(lat), float(lon)
+        x, y = project(lat, lon)
+        with self.lock:
+            office = self._zone_office(lat, lon)
+            entry = self.offices.get(office)
+            if entry is None or entry["validated"] < self.validation_samples:
+                return None
+            predicted = self._predict_entry(entry, x, y)
+            if predicted is None:
+                return None
+            self.local_hits += 1
+        return office, str(predicted[0]), str(predicted[1])
+
+    def get_state(self):
+        with self.lock:
+            return {"offices": dict(self.offices), "zones": dict(self.zones)}
+
+    def restore_state(self, state):
+        with self.lock:
+            self.offices.update(state.get("offices", {}))
+            self.zones.update(state.get("zones", {}))
@@ -0,0 +1,96 @@
+import logging
+import threading
+from collections import OrderedDict
+
+import requests
+
+from modules.api_governor import nws_get
+
+logger = logging.getLogger(__name__)
+
+
+class GridResolver:
+    """
+    Turns coordinates into an NWS grid cell (office, grid_x, grid_y) with the
+    /points api. Answers are cached by coordinates rounded to 4 decimal places,
+    since a point never moves to another grid cell.
+
+    With a GridProjection, points in offices it has learned are worked out
+    locally, and every /points answer (plus the polygon of each new forecast
+    zone) is fed back to it.
+    """
+    def __init__(self, user_agent, max_entries=512, projection=None, governor=None):
+        self.headers = {"User-Agent": user_agent}
+        self.governor = governor
+        self.max_entries = max_entries
+        self.projection = projection
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.lookups = 0
+
+    def _key(self, lat, lon):
+        return round(float(lat), 4), round(float(lon), 4)
+
+    def cached(self, lat, lon):
+        """Return the cached grid for a point, or None."""
+        key = self._key(lat, lon)
+        with self.lock:
+            grid = self.cache.get(key)
+            if grid is not None:
+                self.cache.move_to_end(key)
+            return grid
+
+    def _remember(self, key, grid):
+        with self.lock:
+            self.cache[key] = grid
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+
+    def resolve(self, lat, lon):
+        """
+        Return (office, grid_x, grid_y) for a point. Raises requests exceptions,
+        KeyError or ValueError when the point is outside NWS coverage.
+        """
+        grid = self.cached(lat, lon)
+        if grid is not None:
+            return grid
+        key = self._key(lat, lon)
+        if self.projection is not None:
+            grid = self.projection.locate(*key)
+            if grid is not None:
+                self._remember(key, grid)
+                return grid
+        self.lookups += 1
+        response = nws_get(self.governor, "points", f"https://api.weather.gov/points/{key[0]},{key[1]}",
+                           headers=self.headers, timeout=10)
+        response.raise_for_status()
+        properties = response.json()['properties']
+        grid = (properties['cwa'], str(properties['gridX']), str(properties['gridY']))
+        self._remember(key, grid)
+        if self.projection is not None:
+            self._teach(key, grid, properties)
+        return grid
+
+    def _teach(self, key, grid, properties):
+        self.projection.learn(key[0], key[1], *grid)
+        zone_url = properties.get('forecastZone')
+        if not zone_url:
+            return
+        zone_id = zone_url.rstrip('/').rsplit('/', 1)[-1]
+        if self.projection.has_zone(zone_id):
+            return
+        try:
+            response = nws_get(self.governor, "points", zone_url, headers=self.headers, timeout=10)
+            response.raise_for_status()
+            self.projection.add_zone(zone_id, grid[0], response.json().get('geometry'))
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            logger.info(f"Could not fetch forecast zone {zone_id}: {e}")
+
+    def get_state(self):
+        with self.lock:
+            return [[lat, lon, list(grid)] for (lat, lon), grid in self.cache.items()]
+
+    def restore_state(self, state):
+        for lat, lon, grid in state:
+            self._remember(self._key(lat, lon), tuple(grid))
@@ -0,0 +1,274 @@
+import re
+from datetime import datetime, timedelta, timezone
+
+
+DURATION_PATTERN = re.compile(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?)?$")
+
+COMPASS_POINTS = [
+    'N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE',
+    'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW'
+]
+
+WEATHER_NAMES = {
+    'thunderstorms': 'Thunderstorms',
+    'rain_showers': 'Rain Showers',
+    'snow_showers': 'Snow Showers',
+    'freezing_rain': 'Freezing Rain',
+    'freezing_drizzle': 'Freezing Drizzle',
+    'blowing_snow': 'Blowing Snow',
+    'blowing_dust': 'Blowing Dust',
+}
+
+COVERAGE_NAMES = {
+    'slight_chance': 'Slight Chance',
+    'chance': 'Chance',
+    'isolated': 'Isolated',
+    'scattered': 'Scattered',
+    'numerous': 'Numerous',
+    'areas': 'Areas Of',
+    'patchy': 'Patchy',
+    'widespread': 'Widespread',
+    'occasional': 'Occasional',
+    'periods': 'Periods Of',
+    'frequent': 'Frequent',
+    'brief': 'Brief',
+}
+
+# Gridpoint layers decoded from the raw document, mapped to the series name used below.
+# Units are converted by _convert from each layer's uom.
+SERIES_FIELDS = {
+    'temperature': 'temperature',
+    'probabilityOfPrecipitation': 'pop',
+    'windSpeed': 'wind_speed',
+    'windGust': 'wind_gust',
+    'windDirection': 'wind_direction',
+    'skyCover': 'sky_cover',
+    'weather': 'weather',
+}
+
+DAY_START_HOUR = 6
+NIGHT_START_HOUR = 18
+
+
+def parse_valid_time(valid_time):
+    """
+    Split an ISO-8601 interval such as '2024-04-10T12:00:00+00:00/PT3H'
+    into its start time and length in whole hours.
+    """
+    start_str, duration_str = valid_time.split('/')
+    start = datetime.fromisoformat(start_str.replace('Z', '+00:00'))
+    match = DURATION_PATTERN.match(duration_str)
+    if not match:
+        raise ValueError(f"Unsupported duration: {duration_str}")
+    days, hours, minutes = (int(part or 0) for part in match.groups())
+    total_hours = days * 24 + hours + (1 if minutes else 0)
+    return start, max(total_hours, 1)
+
+
+def _convert(value, uom):
+    """Convert a gridpoint value to the units the forecast endpoints use."""
+    if value is None:
+        return None
+    if uom == 'wmoUnit:degC':
+        return value * 9 / 5 + 32
+    if uom == 'wmoUnit:km_h-1':
+        return value / 1.609344
+    return value
+
+
+def decode_series(properties, start, hours):
+    """
+    Expand every interval-encoded series into an array with one slot per hour,
+    starting at `start`. Hours without data are left as None.
+    """
+    columns = {}
+    for field, column in SERIES_FIELDS.items():
+        layer = properties.get(field) or {}
+        uom = layer.get('uom')
+        values = [None] * hours
+        for entry in layer.get('values', []):
+            try:
+                entry_start, length = parse_valid_time(entry['validTime'])
+            except (KeyError, ValueError):
+                continue
+            offset = int((entry_start - start).total_seconds() // 3600)
+            value = entry['value'] if field == 'weather' else _convert(entry['value'], uom)
+            for i in range(max(offset, 0), min(offset + length, hours)):
+                values[i] = value
+        columns[column] = values
+    return columns
+
+
+def degrees_to_compass(degrees):
+    if degrees is None:
+        return ''
+    return COMPASS_POINTS[int((degrees % 360) / 22.5 + 0.5) % 16]
+
+
+def _weather_phrase(conditions):
+    """Build a shortForecast-style phrase from a gridpoint weather value."""
+    phrases = []
+    for condition in conditions or []:
+        weather = condition.get('weather')
+        if not weather:
+            continue
+        name = WEATHER_NAMES.get(weather, weather.replace('_', ' ').title())
+        coverage = condition.get('coverage')
+        if coverage == 'likely':
+            phrase = f"{name} Likely"
+        elif coverage in COVERAGE_NAMES:
+            phrase = f"{COVERAGE_NAMES[coverage]} {name}"
+        else:
+            phrase = name
+        if phrase not in phrases:
+            phrases.append(phrase)
+    return ' And '.join(phrases)
+
+
+def _sky_phrase(sky_cover, is_daytime):
+    if sky_cover is None:
+        return ''
+    if sky_cover <= 5:
+        return 'Sunny' if is_daytime else 'Clear'
+    if sky_cover <= 25:
+        return 'Mostly Sunny' if is_daytime else 'Mostly Clear'
+    if sky_cover <= 50:
+        return 'Partly Sunny' if is_daytime else 'Partly Cloudy'
+    if sky_cover <= 87:
+        return 'Mostly Cloudy'
+    return 'Cloudy'
+
+
+def _short_forecast(weather, sky_cover, is_daytime):
+    return _weather_phrase(weather) or _sky_phrase(sky_cover, is_daytime)
+
+
+def _is_daytime(dt):
+    return DAY_START_HOUR <= dt.hour < NIGHT_START_HOUR
+
+
+def cell_center(data):
+    """(lat, lon) of the middle of a gridpoint document's cell, or None without a geometry."""
+    try:
+        ring = data['geometry']['coordinates'][0]
+    except (KeyError, IndexError, TypeError):
+        return None
+    # The ring repeats its first corner at the end
+    corners = ring[:-1] if len(ring) > 1 and ring[0] == ring[-1] else ring
+    if not corners:
+        return None
+    return (sum(corner[1] for corner in corners) / len(corners),
+            sum(corner[0] for corner in corners) / len(corners))
+
+
+class GridpointForecast:
+    """
+    Hourly arrays decoded from a single /gridpoints/{office}/{x},{y} document,
+    with builders for the hourly and day/night period views the fetchers use.
+
+    The grid's times are all UTC. time_zone (a tzinfo, normally from the
+    timeZone of /points) sets the local hours and the 6am/6pm day and night
+    bounds, as the forecast endpoints do; without it the host's zone is used.
+    """
+    def __init__(self, data, time_zone=None):
+        properties = data['properties']
+        self.time_zone = time_zone
+        self.update_time = properties.get('updateTime')
+
+        start, hours = parse_valid_time(properties['validTimes'])
+        self.start = start.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        self.hours = hours
+        self.columns = decode_series(properties, self.start, hours)
+
+    def hour_time(self, index):
+        """Local start time of the hour at the given array index."""
+        return (self.start + timedelta(hours=index)).astimezone(self.time_zone)
+
+    def _document(self, periods):
+        return {'properties': {'updateTime': self.update_time, 'periods': periods}}
+
+    def hourly_periods(self):
+        """Build the same document shape as /forecast/hourly."""
+        columns = self.columns
+        periods = []
+        for i in range(self.hours):
+            temperature = columns['temperature'][i]
+            if temperature is None:
+                continue
+            start = self.hour_time(i)
+            is_daytime = _is_daytime(start)
+            wind_speed = columns['wind_speed'][i] or 0
+            wind_gust = columns['wind_gust'][i]
+            pop = columns['pop'][i]
+            periods.append({
+                'number': len(periods) + 1,
+                'startTime': start.isoformat(),
+                'endTime': (start + timedelta(hours=1)).isoformat(),
+                'isDaytime': is_daytime,
+                'temperature': round(temperature),
+                'temperatureUnit': 'F',
+                'probabilityOfPrecipitation': {'value': None if pop is None else round(pop)},
+                'windSpeed': f"{round(wind_speed)} mph",
+                'windGust': None if wind_gust is None else f"{round(wind_gust)} mph",
+                'windDirection': degrees_to_compass(columns['wind_direction'][i]),
+                'shortForecast': _short_forecast(columns['weather'][i], columns['sky_cover'][i], is_daytime),
+            })
+        return self._document(periods)
+
+    def _period_bounds(self, now):
+        """Yield (start, end, is_daytime) for the day/night periods from now on."""
+        if _is_daytime(now):
+            start = now.replace(hour=DAY_START_HOUR, minute=0, second=0, microsecond=0)
+            is_daytime = True
+        else:
+            start = now.replace(hour=NIGHT_START_HOUR, minute=0, second=0, microsecond=0)
+            if now.hour < DAY_START_HOUR:
+                start -= timedelta(days=1)
+            is_daytime = False
+        while True:
+            end = start + timedelta(hours=12)
+            yield start, end, is_daytime
+            start, is_daytime = end, not is_daytime
+
+    def daily_periods(self, now=None):
+        """Build the same day/night document shape as /forecast."""
+        now = (now or datetime.now(timezone.utc)).astimezone(self.time_zone)
+        columns = self.columns
+        periods = []
+        for start, end, is_daytime in self._period_bounds(now):
+            first = max(int((start - self.start).total_seconds() // 3600), 0)
+            last = min(int((end - self.start).total_seconds() // 3600), self.hours)
+            if first >= self.hours:
+                break
+            temps = [t for t in columns['temperature'][first:last] if t is not None]
+            if not temps:
+                continue
+
+            pops = [p for p in columns['pop'][first:last] if p is not None]
+            phrases = [_weather_phrase(w) for w in columns['weather'][first:last]]
+            phrases = [p for p in phrases if p]
+            if phrases:
+                short_forecast = max(set(phrases), key=phrases.count)
+            else:
+                skies = [s for s in columns['sky_cover'][first:last] if s is not None]
+                short_forecast = _sky_phrase(sum(skies) / len(skies) if skies else None, is_daytime)
+
+            if not periods:
+                name = 'Today' if is_daytime else 'Tonight'
+            elif len(periods) == 1 and not is_daytime:
+                name = 'Tonight'
+            else:
+                name = start.strftime('%A') if is_daytime else f"{start.strftime('%A')} Night"
+
+            periods.append({
+                'number': len(periods) + 1,
+                'name': name,
+                'startTime': start.isoformat(),
+                'endTime': end.isoformat(),
+                'isDaytime': is_daytime,
+                'temperature': round(max(temps) if is_daytime else min(temps)),
+                'temperatureUnit': 'F',
+                'probabilityOfPrecipitation': {'value': round(max(pops)) if pops else None},
+                'shortForecast': short_forecast,
+            })
+        return self._document(periods)
@@ -0,0 +1,172 @@
+import time
+import logging
+from array import array
+from datetime import datetime, timedelta
+from itertools import accumulate
+from operator import sub
+
+logger = logging.getLogger(__name__)
+
+RAIN_THRESHOLD = 40.0  # Rain chance (%) counted as "rain expected"
+FREEZING = 32.0
+DRY_WINDOW_HOURS = 3
+HORIZON_HOURS = 24
+
+
+def _format_hour(dt):
+    hour = dt.strftime("%I").lstrip('0')
+    return f"{hour}{dt.strftime('%p').lower()}"
+
+
+def _parse_speed(value):
+    try:
+        return float(str(value).split()[0])
+    except (ValueError, IndexError):
+        return 0.0
+
+
+class HourlySnapshot:
+    """
+    The next 24 hours of the hourly forecast parsed once into typed array
+    columns, so each summary below is a single pass over a column or two rather
+    than re-reading the forecast periods. The passes are still ordinary Python
+    iteration; at 24 values per column that costs well under a millisecond.
+    """
+    def __init__(self, data, now=None):
+        now = now or datetime.now().astimezone()
+        self.times = []
+        self.temps = array('f')
+        self.pop = array('f')
+        self.wind = array('f')
+        self.gust = array('f')
+        self.directions = []
+        self.has_gusts = False
+
+        for period in data['properties']['periods']:
+            dt = datetime.fromisoformat(period['startTime'].replace('Z', '+00:00'))
+            if dt + timedelta(hours=1) <= now:
+                continue
+            if len(self.times) >= HORIZON_HOURS:
+                break
+            prob = (period.get('probabilityOfPrecipitation') or {}).get('value')
+            wind = _parse_speed(period.get('windSpeed'))
+            self.times.append(dt)
+            self.temps.append(float(period['temperature']))
+            self.pop.append(float(prob or 0))
+            self.wind.append(wind)
+            self.gust.append(_parse_speed(period['windGust']) if period.get('windGust') else wind)
+            self.directions.append(period.get('windDirection', ''))
+            self.has_gusts = self.has_gusts or bool(period.get('windGust'))
+
+    def __len__(self):
+        return len(self.times)
+
+    def rain_timing(self):
+        if not self.times:
+            return "Error: No hourly data available"
+        wet = bytes(map(RAIN_THRESHOLD.__le__, self.pop))
+        peak = max(self.pop)
+        peak_at = _format_hour(self.times[self.pop.index(peak)])
+        start = wet.find(1)
+        if start == -1:
+            return f"No rain ≥{RAIN_THRESHOLD:.0f}% next {len(self)}h. Peak {peak:.0f}% at {peak_at}"
+        stop = wet.find(0, start)
+        start_text = "now" if start == 0 else _format_hour(self.times[start])
+        if stop == -1:
+            return f"Rain ≥{RAIN_THRESHOLD:.0f}% from {start_text} through next {len(self)}h. Peak {peak:.0f}% at {peak_at}"
+        return (f"Rain ≥{RAIN_THRESHOLD:.0f}% from {start_text} until {_format_hour(self.times[stop])}. "
+                f"Peak {peak:.0f}% at {peak_at}")
+
+    def peak_wind(self):
+        if not self.times:
+            return "Error: No hourly data available"
+        peak_wind = max(self.wind)
+        wind_index = self.wind.index(peak_wind)
+        wind_text = (f"Max wind {peak_wind:.0f}mph {self.directions[wind_index]} "
+                     f"at {_format_hour(self.times[wind_index])}")
+        if not self.has_gusts:
+            return f"{wind_text}. No gust data in this forecast"
+        peak_gust = max(self.gust)
+        gust_index = self.gust.index(peak_gust)
+        return (f"Peak gust {peak_gust:.0f}mph {self.directions[gust_index]} "
+                f"at {_format_hour(self.times[gust_index])}. {wind_text}")
+
+    def freezing_hours(self):
+        if not self.times:
+            return "Error: No hourly data available"
+        low = min(self.temps)
+        low_at = _format_hour(self.times[self.temps.index(low)])
+        frozen = bytes(map(FREEZING.__gt__, self.temps))
+        count = frozen.count(1)
+        if not count:
+            return f"No hours below freezing next {len(self)}h. Low {low:.0f}° at {low_at}"
+        start = frozen.find(1)
+        stop = frozen.find(0, start)
+        until = f"through next {len(self)}h" if stop == -1 else f"until {_format_hour(self.times[stop])}"
+        return (f"{count} of next {len(self)}h below freezing, first from "
+                f"{_format_hour(self.times[start])} {until}. Low {low:.0f}° at {low_at}")
+
+    def best_dry_window(self):
+        if len(self) < DRY_WINDOW_HOURS:
+            return "Error: No hourly data available"
+        totals = list(accumulate(self.pop, initial=0.0))
+        window_sums = array('f', map(sub, totals[DRY_WINDOW_HOURS:], totals[:-DRY_WINDOW_HOURS]))
+        best = min(window_sums)
+        start = window_sums.index(best)
+        end = self.times[start] + timedelta(hours=DRY_WINDOW_HOURS)
+        return (f"Best {DRY_WINDOW_HOURS}h dry window: {_format_hour(self.times[start])}-{_format_hour(end)}, "
+                f"avg rain chance {best / DRY_WINDOW_HOURS:.0f}%")
+
+
+class HourlyAnalytics:
+    """
+    Derived single-message answers over the hourly forecast. The column snapshot
+    and every summary are rebuilt once each time the weather manager refreshes.
+    """
+    def __init__(self, weather_manager):
+        self.weather_manager = weather_manager
+        self._source = None
+        self._summaries = {}
+        self.last_compute_ms = None
+
+    def _refresh(self):
+        data = self.weather_manager.get_hourly_data()
+        if not data:
+            return False
+        if data is self._source:
+            return True
+
+        started = time.perf_counter()
+        snapshot = HourlySnapshot(data)
+        self._summaries = {
+            'rain': snapshot.rain_timing(),
+            'wind': snapshot.peak_wind(),
+            'freeze': snapshot.freezing_hours(),
+            'dry': snapshot.best_dry_window(),
+        }
+        self.last_compute_ms = (time.perf_counter() - started) * 1000
+        self._source = data
+        logger.info(f"Hourly analytics rebuilt for {len(snapshot)} hours in {self.last_compute_ms:.2f}ms")
+        return True
+
+    def _summary(self, name):
+        try:
+            if not self._refresh():
+                return "Error: Unable to fetch weather data"
+            return self._summaries[name]
+        except Exception as e:
+            error_msg = f"Error: {str(e)}"
+            logging.error(error_msg)
+            return error_msg
+
+    def get_rain_timing(self):
+        return self._summary('rain')
+
+    def get_peak_wind(self):
+        return self._summary('wind')
+
+    def get_freezing_hours(self):
+        return self._summary('freeze')
+
+    def get_dry_window(self):
+        return self._summary('dry')
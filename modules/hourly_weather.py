@@ -1,38 +1,13 @@
 import logging
 from datetime import datetime
 
+from modules.weather_glyphs import default_glyphs
+
 
 class EmojiWeatherFetcher:
-    def __init__(self, weather_manager):
+    def __init__(self, weather_manager, glyphs=None):
         self.weather_manager = weather_manager
-        self.weather_emojis = {
-            "clear": "🌙",  # Changed from ☀️ to 🌙
-            "sunny": "☀️",
-            "partly sunny": "🌤️",
-            "mostly sunny": "🌤️",
-            "partly cloudy": "⛅",
-            "mostly cloudy": "🌥️",
-            "cloudy": "☁️",
-            "rain": "🌧️",
-            "showers": "🌧️",
-            "thunderstorm": "⛈️",
-            "snow": "🌨️",
-            "fog": "🌫️",
-            "haze": "🌫️"
-
-        }
-        self.rain_emoji = "💧"
-
-    def _get_emoji(self, forecast):
-        forecast = forecast.lower()
-        # First check for thunderstorm specifically
-        if "thunderstorm" in forecast:
-            return self.weather_emojis["thunderstorm"]
-        # Then check for other conditions
-        for key, emoji in self.weather_emojis.items():
-            if key in forecast:
-                return emoji
-        return "🌡️"  # Default emoji if no match found
+        self.glyphs = glyphs or default_glyphs
 
     def _get_rain_chance(self, properties):
         prob = properties.get('probabilityOfPrecipitation', {}).get('value', 0)
@@ -79,11 +54,11 @@ class EmojiWeatherFetcher:
                     break
 
                 time_format = self._format_time(dt)
-                emoji = self._get_emoji(period['shortForecast'])
+                emoji = self.glyphs.for_period(period)
                 temp = str(round(period['temperature']))
                 rain_chance = self._get_rain_chance(period)
 
-                line = f"{time_format}{emoji}{temp}°{self.rain_emoji}{rain_chance}%"
+                line = f"{time_format}{emoji}{temp}°{self.glyphs.rain}{rain_chance}%"
                 result.append(line)
                 count += 1
 
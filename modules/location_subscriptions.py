@@ -0,0 +1,147 @@
+import time
+import logging
+import threading
+
+from modules.watchdog import busy
+
+logger = logging.getLogger(__name__)
+
+
+class GridCell:
+    """One NWS grid cell with the forecast manager and alert monitor its subscribers share."""
+    def __init__(self, grid, lat, lon, manager):
+        self.grid = grid
+        self.lat = lat
+        self.lon = lon
+        self.manager = manager
+        self.alerts = None
+        self.nodes = set()
+
+    @property
+    def label(self):
+        office, grid_x, grid_y = self.grid
+        return f"{office} {grid_x},{grid_y}"
+
+
+class _SubscriberNotifier:
+    """Stands in for an interface so a WeatherAlerts monitor DMs a cell's subscribers."""
+    def __init__(self, subscriptions, cell):
+        self.subscriptions = subscriptions
+        self.cell = cell
+
+    def sendText(self, text, **kwargs):
+        for node in list(self.cell.nodes):
+            link = self.subscriptions.radios.get(self.subscriptions.subscribers.get(node, {}).get("radio"))
+            if link is not None:
+                link.sendText(text, wantAck=True, destinationId=int(node))
+
+
+class LocationSubscriptions:
+    """
+    Home locations registered by nodes with the home command. Subscribers are
+    grouped by NWS grid cell, so each cell has one WeatherDataManager and one
+    alert monitor however many nodes live in it.
+
+    make_manager(office, grid_x, grid_y) builds the forecast manager for a cell and
+    make_alerts(lat, lon, interface) its alert monitor; make_alerts may be None
+    when per-location alerts are turned off.
+    """
+    def __init__(self, resolver, radios, make_manager, make_alerts=None, watchdog=None):
+        self.resolver = resolver
+        self.radios = radios
+        self.make_manager = make_manager
+        self.make_alerts = make_alerts
+        self.subscribers = {}  # node id -> {"lat", "lon", "grid", "radio"}
+        self.cells = {}  # (office, grid_x, grid_y) -> GridCell
+        self.lock = threading.RLock()
+        self.watchdog = watchdog
+        self.alerts_generation = 0
+
+    def _cell(self, grid, lat, lon):
+        cell = self.cells.get(grid)
+        if cell is None:
+            cell = GridCell(grid, lat, lon, self.make_manager(*grid))
+            if self.make_alerts:
+                cell.alerts = self.make_alerts(lat, lon, _SubscriberNotifier(self, cell))
+            self.cells[grid] = cell
+            logger.info(f"Now serving grid {cell.label}")
+        return cell
+
+    def subscribe(self, node, lat, lon, radio):
+        """Set a node's home location. Returns its GridCell."""
+        grid = self.resolver.resolve(lat, lon)
+        with self.lock:
+            self.unsubscribe(node)
+            self.subscribers[str(node)] = {"lat": lat, "lon": lon, "grid": list(grid), "radio": radio}
+            cell = self._cell(grid, lat, lon)
+            cell.nodes.add(str(node))
+            return cell
+
+    def unsubscribe(self, node):
+        """Remove a node's home location. Returns False if it had none."""
+        with self.lock:
+            subscription = self.subscribers.pop(str(node), None)
+            if subscription is None:
+                return False
+            grid = tuple(subscription["grid"])
+            cell = self.cells.get(grid)
+            if cell is not None:
+                cell.nodes.discard(str(node))
+                if not cell.nodes:
+                    del self.cells[grid]
+                    logger.info(f"No subscribers left in grid {cell.label}")
+            return True
+
+    def cell_for(self, node):
+        """The GridCell for a node's home location, or None."""
+        with self.lock:
+            subscription = self.subscribers.get(str(node))
+            if subscription is None:
+                return None
+            return self.cells.get(tuple(subscription["grid"]))
+
+    def get_state(self):
+        with self.lock:
+            return {
+                "subscribers": dict(self.subscribers),
+                "alerts": {
+                    ",".join(grid): cell.alerts.get_state()
+                    for grid, cell in self.cells.items() if cell.alerts
+                },
+            }
+
+    def restore_state(self, state):
+        with self.lock:
+            for node, subscription in state.get("subscribers", {}).items():
+                grid = tuple(subscription["grid"])
+                self.subscribers[node] = subscription
+                self._cell(grid, subscription["lat"], subscription["lon"]).nodes.add(node)
+            for grid, alert_state in state.get("alerts", {}).items():
+                cell = self.cells.get(tuple(grid.split(",")))
+                if cell and cell.alerts:
+                    cell.alerts.restore_state(alert_state)
+
+    def start_alerts(self, interval=300):
+        """
+        Check alerts for every subscribed cell in a separate thread, one cell after
+        another. Calling it again replaces the thread after its current round.
+        """
+        if not self.make_alerts:
+            return
+        self.alerts_generation += 1
+        generation = self.alerts_generation
+
+        def loop():
+            while generation == self.alerts_generation:
+                with self.lock:
+                    cells = list(self.cells.values())
+                with busy(self.watchdog, "home-alerts"):
+                    for cell in cells:
+                        try:
+                            cell.alerts.check_alerts()
+                        except Exception as e:
+                            logger.error(f"Error checking alerts for grid {cell.label}: {str(e)}")
+                time.sleep(interval)
+
+        alerts_thread = threading.Thread(target=loop, daemon=True)
+        alerts_thread.start()
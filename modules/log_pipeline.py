@@ -0,0 +1,134 @@
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+import contextvars
+from contextlib import contextmanager
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s%(request_tag)s"
+
+# Id of the request being handled on this thread, added to every record logged for it
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+
+@contextmanager
+def request_context(request_id):
+    """Tag everything logged inside the block with a correlation id."""
+    token = _request_id.set(request_id)
+    try:
+        yield
+    finally:
+        _request_id.reset(token)
+
+
+class RequestIdFilter(logging.Filter):
+    """Copies the current correlation id onto records in the thread that logged them."""
+    def filter(self, record):
+        request_id = _request_id.get()
+        record.request_id = request_id
+        record.request_tag = f" [{request_id}]" if request_id else ""
+        return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers and jq."""
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RotatingLogFile(logging.handlers.RotatingFileHandler):
+    """A log file rolled over when it reaches max_bytes or every rotate_seconds, whichever comes first."""
+    def __init__(self, path, max_bytes=0, backup_count=5, rotate_seconds=0):
+        super().__init__(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        self.rotate_seconds = rotate_seconds
+        self.rotate_at = time.time() + rotate_seconds if rotate_seconds else None
+
+    def shouldRollover(self, record):
+        if self.rotate_at is not None and time.time() >= self.rotate_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        if self.rotate_seconds:
+            self.rotate_at = time.time() + self.rotate_seconds
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    # Never waits on a full queue; the record is counted and dropped instead
+    def __init__(self, log_queue, pipeline):
+        super().__init__(log_queue)
+        self.pipeline = pipeline
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.pipeline.dropped += 1
+
+
+class LogPipeline:
+    """
+    Routes every log record through a bounded in-memory queue to a background
+    writer thread, so code that logs never waits on the console or a slow SD
+    card. When the queue is full new records are dropped and counted.
+    """
+    def __init__(self, handlers, queue_size=10000):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.handler = _DroppingQueueHandler(self.queue, self)
+        self.handler.addFilter(RequestIdFilter())
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+
+    def start(self, level=logging.INFO):
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(level)
+        self.listener.start()
+        # Write out whatever is still queued when the program exits
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Write out the queued records and stop the writer thread."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+
+def start_logging(settings):
+    """Build and start the log pipeline described by the LOG_* settings."""
+    json_lines = str(settings.get("LOG_FORMAT", "text")).lower() == "json"
+    formatter = JsonLinesFormatter() if json_lines else logging.Formatter(TEXT_FORMAT)
+
+    console = logging.StreamHandler(sys.stderr)
+    console.setFormatter(formatter)
+    handlers = [console]
+
+    log_file = settings.get("LOG_FILE", "")
+    if log_file:
+        file_handler = RotatingLogFile(
+            log_file,
+            max_bytes=int(settings.get("LOG_MAX_MB", 5) * 1024 * 1024),
+            backup_count=int(settings.get("LOG_BACKUP_COUNT", 5)),
+            rotate_seconds=settings.get("LOG_ROTATE_HOURS", 24) * 3600,
+        )
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    pipeline = LogPipeline(handlers, settings.get("LOG_QUEUE_SIZE", 10000))
+    pipeline.start()
+    return pipeline
@@ -0,0 +1,92 @@
+import re
+
+# Command keywords in the order they are matched against a message. The first
+# keyword found anywhere in the message decides the command.
+COMMAND_KEYWORDS = (
+    ("test", "test"),
+    ("?", "menu"),
+    ("menu", "menu"),
+    ("home", "home"),
+    ("loc", "loc"),
+    ("rainwhen", "rainwhen"),
+    ("gusts", "gusts"),
+    ("freeze", "freeze"),
+    ("dry", "dry"),
+    ("trend", "trend"),
+    ("temp", "temp"),
+    ("2day", "2day"),
+    ("hourly", "hourly"),
+    ("rain", "rain"),
+    ("5day", "5day"),
+    ("4day", "4day"),
+    ("wind", "wind"),
+    ("advertise", "advertise"),
+    ("7day", "7day"),
+    ("alert-status", "alert-status"),
+    ("cache-status", "cache-status"),
+    ("delivery-status", "delivery-status"),
+    ("health-status", "health-status"),
+    ("api-status", "api-status"),
+    ("alert", "alert"),
+    ("now", "now"),
+    # Last, so "here temp" is the temp command answered for the sender's position
+    ("here", "here"),
+)
+
+
+# Commands that must be the whole message, checked before the keywords above
+EXACT_COMMANDS = {
+    "more": "more",
+    "n": "more",
+    "stop": "stop",
+}
+
+# Keywords that are common inside other words ("snow", "know") and only count on their own.
+# home must also start the message, so chatter like "heading home" isn't taken for it.
+WHOLE_WORD_KEYWORDS = {
+    "home": re.compile(r"^\s*home\b"),
+    "now": re.compile(r"\bnow\b"),
+    "here": re.compile(r"\bhere\b"),
+}
+
+
+def has_keyword(message, keyword):
+    """True if a lowercased message contains a command keyword."""
+    pattern = WHOLE_WORD_KEYWORDS.get(keyword)
+    if pattern is not None:
+        return pattern.search(message) is not None
+    return keyword in message
+
+
+def match_command(message):
+    """Return the command a lowercased message asks for, or None."""
+    command = EXACT_COMMANDS.get(message.strip())
+    if command:
+        return command
+    for keyword, command in COMMAND_KEYWORDS:
+        if has_keyword(message, keyword):
+            return command
+    return None
+
+
+def split_message(message, max_length=200, message_type="Hourly", start_index=1, total_count=None):
+    lines = message.split('\n')
+    messages = []
+    current_message = []
+    current_length = 0
+    for line in lines:
+        line_length = len(line.encode('utf-8')) + (1 if current_message else 0)
+        if current_length + line_length > max_length:
+            messages.append('\n'.join(current_message))
+            current_message = []
+            current_length = 0
+        current_message.append(line)
+        current_length += line_length
+    if current_message:
+        messages.append('\n'.join(current_message))
+    # If total_count is provided, use it for page count
+    if total_count is None:
+        total_count = len(messages)
+    for i in range(len(messages)):
+        messages[i] = f"--({start_index + i}/{total_count}) {message_type}\n" + messages[i]
+    return messages
@@ -0,0 +1,90 @@
+import re
+import json
+import codecs
+
+# Fields the fetchers read from each forecast period
+HOURLY_FIELDS = (
+    'startTime', 'isDaytime', 'temperature', 'probabilityOfPrecipitation',
+    'windSpeed', 'windGust', 'windDirection', 'shortForecast', 'icon',
+)
+DAILY_FIELDS = (
+    'name', 'startTime', 'isDaytime', 'temperature', 'probabilityOfPrecipitation', 'shortForecast', 'icon',
+)
+
+PERIODS_PATTERN = re.compile(r'"periods"\s*:\s*\[')
+UPDATE_TIME_PATTERN = re.compile(r'"updateTime"\s*:\s*"([^"]+)"')
+WHITESPACE = ' \t\r\n,'
+
+
+class StreamParseError(ValueError):
+    pass
+
+
+def parse_forecast_stream(chunks, fields, horizon=None):
+    """
+    Incrementally parse a /forecast or /forecast/hourly body from an iterable of
+    byte chunks, decoding one period object at a time.
+
+    Only the requested fields of each period are kept, and reading stops once
+    `horizon` periods have been collected, so the rest of the body is never
+    downloaded or decoded. Returns a document shaped like response.json() with
+    just properties.updateTime and properties.periods.
+
+    Args:
+        chunks: Iterable of bytes, e.g. response.iter_content(8192)
+        fields: Period keys to keep
+        horizon (int, optional): Maximum number of periods to read
+
+    Returns:
+        dict: {'properties': {'updateTime': ..., 'periods': [...]}}
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buffer = ''
+    update_time = None
+    periods = []
+
+    def read_more():
+        nonlocal buffer
+        for chunk in chunks:
+            if chunk:
+                buffer += text_decoder.decode(chunk)
+                return True
+        return False
+
+    # Skip the header (geometry, units, ...) until the periods array opens
+    while True:
+        match = PERIODS_PATTERN.search(buffer)
+        if match:
+            header = UPDATE_TIME_PATTERN.search(buffer, 0, match.start())
+            if header:
+                update_time = header.group(1)
+            buffer = buffer[match.end():]
+            break
+        if not read_more():
+            raise StreamParseError("No forecast periods found in response")
+
+    pos = 0
+    while horizon is None or len(periods) < horizon:
+        while pos < len(buffer) and buffer[pos] in WHITESPACE:
+            pos += 1
+        if pos >= len(buffer):
+            buffer, pos = '', 0
+            if not read_more():
+                raise StreamParseError("Response ended inside the periods array")
+            continue
+        if buffer[pos] == ']':
+            break
+        try:
+            period, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # The object is split across chunks; drop what has been consumed and read on
+            buffer, pos = buffer[pos:], 0
+            if not read_more():
+                raise StreamParseError("Response ended inside a forecast period")
+            continue
+        periods.append({key: period[key] for key in fields if key in period})
+        pos = end
+
+    return {'properties': {'updateTime': update_time, 'periods': periods}}
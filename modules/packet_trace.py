@@ -0,0 +1,222 @@
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import itertools
+import threading
+
+from pubsub import pub
+
+logger = logging.getLogger(__name__)
+
+
+def _jsonable(value):
+    """Copy the JSON-friendly parts of a packet, dropping bytes and protobuf objects."""
+    if isinstance(value, dict):
+        copied = {}
+        for key, item in value.items():
+            item = _jsonable(item)
+            if key != "raw" and item is not None:
+                copied[key] = item
+        return copied
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return None
+
+
+class PacketTraceRecorder:
+    """
+    Appends every received packet to a JSON-lines trace file for later replay.
+    Packets are handed to a background writer through a bounded queue, so the
+    radio callback thread never waits on the disk; when the queue is full, or
+    the file can't be written, packets are dropped and counted rather than
+    getting in the way of the bot's own listener.
+    """
+    def __init__(self, path, radios, queue_size=10000):
+        self.path = path
+        self.radios = radios
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.write_failing = False
+        writer = threading.Thread(target=self._write_loop, daemon=True)
+        writer.start()
+        # Write out whatever is still queued when the program exits
+        atexit.register(self.queue.join)
+
+    def record(self, packet, interface):
+        try:
+            link = self.radios.link_for(interface)
+            line = json.dumps({
+                "t": time.time(),
+                "radio": link.name,
+                "node": str(link.my_node),
+                "packet": _jsonable(packet),
+            }, separators=(",", ":"))
+            self.queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+        except Exception as e:
+            self.dropped += 1
+            logger.error(f"Failed to trace packet: {e}")
+
+    def _write_loop(self):
+        while True:
+            lines = [self.queue.get()]
+            # Write everything already waiting in one go
+            while True:
+                try:
+                    lines.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.path, "a") as file:
+                    file.write("\n".join(lines) + "\n")
+                if self.write_failing:
+                    logger.info(f"Writing packet trace to {self.path} again")
+                    self.write_failing = False
+            except Exception as e:
+                self.dropped += len(lines)
+                # Log once per failure streak, not for every packet
+                if not self.write_failing:
+                    logger.error(f"Failed to write packet trace to {self.path}: {e}")
+                    self.write_failing = True
+            finally:
+                for _ in lines:
+                    self.queue.task_done()
+
+
+def load_trace(path):
+    """Read a trace file, returning its entries in time order."""
+    entries = []
+    with open(path, "r") as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+    entries.sort(key=lambda entry: entry["t"])
+    return entries
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class SimulatedRadio:
+    """
+    Stands in for a Meshtastic interface during replay. Each sendText blocks for
+    `send_latency` seconds like a serial write plus airtime, and acknowledgements
+    are published on meshtastic.receive.routing unless lost with probability `ack_loss`.
+    """
+    def __init__(self, name, node_id, send_latency=0.5, ack_loss=0.0, seed=None):
+        self.name = name
+        self.node_id = int(node_id) if str(node_id).isdigit() else 0
+        self.send_latency = send_latency
+        self.ack_loss = ack_loss
+        self.random = random.Random(seed)
+        self.packet_ids = itertools.count(1)
+        self.nodes = {}
+        self.localNode = None
+        self.sent = []  # (time, destination, text)
+        self.acks_lost = 0
+        self.on_send = None
+
+    def sendText(self, text, wantAck=False, destinationId="^all", channelIndex=0, **kwargs):
+        time.sleep(self.send_latency)
+        packet_id = next(self.packet_ids)
+        now = time.time()
+        self.sent.append((now, destinationId, text))
+        if self.on_send:
+            self.on_send(now, destinationId, text)
+        if wantAck and destinationId != "^all":
+            if self.random.random() < self.ack_loss:
+                self.acks_lost += 1
+            else:
+                ack = {
+                    "from": destinationId,
+                    "to": self.node_id,
+                    "decoded": {"portnum": "ROUTING_APP", "requestId": packet_id,
+                                "routing": {"errorReason": "NONE"}},
+                }
+                threading.Timer(self.send_latency, pub.sendMessage, args=("meshtastic.receive.routing",),
+                                kwargs={"packet": ack, "interface": self}).start()
+        return {"id": packet_id, "to": destinationId}
+
+    def getMyNodeInfo(self):
+        return {"num": self.node_id, "user": {"longName": f"Simulated {self.name}"}}
+
+    def close(self):
+        pass
+
+
+class TraceReplayer:
+    """
+    Feeds recorded packets to a listener at their original spacing divided by
+    `speed`. Packets are dispatched one at a time from a single thread, the same
+    way the Meshtastic library delivers them, so a slow reply delays the next one.
+    """
+    def __init__(self, entries, listener, interfaces, speed=1.0):
+        self.entries = entries
+        self.listener = listener
+        self.interfaces = interfaces  # radio name -> interface
+        self.speed = speed
+        self.inbox = queue.Queue()
+        self.pending = {}  # sender -> list of arrival times awaiting a reply
+        self.latencies = []
+        self.requests = 0
+        self.lock = threading.Lock()
+        for interface in interfaces.values():
+            interface.on_send = self._on_send
+
+    def _on_send(self, sent_at, destination, text):
+        with self.lock:
+            waiting = self.pending.get(str(destination))
+            if waiting:
+                self.latencies.append(sent_at - waiting.pop(0))
+
+    def _dispatch(self):
+        while True:
+            entry = self.inbox.get()
+            if entry is None:
+                return
+            try:
+                self.listener(entry["packet"], self.interfaces[entry["radio"]])
+            except Exception as e:
+                logger.error(f"Listener failed on replayed packet: {e}")
+
+    def run(self):
+        """Replay every packet and wait until the listener has handled them all."""
+        dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        dispatcher.start()
+        first = self.entries[0]["t"] if self.entries else 0
+        started = time.time()
+        for entry in self.entries:
+            delay = (entry["t"] - first) / self.speed - (time.time() - started)
+            if delay > 0:
+                time.sleep(delay)
+            packet = entry["packet"]
+            is_direct_message = str(packet.get("to")) == entry.get("node")
+            if is_direct_message and packet.get("decoded", {}).get("portnum") == "TEXT_MESSAGE_APP":
+                self.requests += 1
+                with self.lock:
+                    self.pending.setdefault(str(packet.get("from")), []).append(time.time())
+            self.inbox.put(entry)
+        self.inbox.put(None)
+        dispatcher.join()
+
+    def latency_summary(self):
+        values = self.latencies
+        return {
+            "replies": len(values),
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+            "max": max(values) if values else 0.0,
+        }
@@ -0,0 +1,44 @@
+import time
+import threading
+
+
+class PageBuffer:
+    """
+    Holds the unsent pages of each sender's last reply until they ask for the
+    next one or the pages expire. A new reply replaces anything still held.
+    """
+    def __init__(self):
+        self.held = {}  # sender -> (pages left, expiry time)
+        self.lock = threading.Lock()
+
+    def hold(self, sender, pages, ttl):
+        with self.lock:
+            self._prune()
+            if pages:
+                self.held[str(sender)] = (list(pages), time.time() + ttl)
+            else:
+                self.held.pop(str(sender), None)
+
+    def drop(self, sender):
+        """Forget the sender's held pages. Returns how many there were."""
+        with self.lock:
+            entry = self.held.pop(str(sender), None)
+            return len(entry[0]) if entry is not None and entry[1] >= time.time() else 0
+
+    def next_page(self, sender):
+        """Return the sender's next held page and how many remain after it, or (None, 0)."""
+        with self.lock:
+            entry = self.held.get(str(sender))
+            if entry is None or entry[1] < time.time():
+                self.held.pop(str(sender), None)
+                return None, 0
+            pages = entry[0]
+            page = pages.pop(0)
+            if not pages:
+                del self.held[str(sender)]
+            return page, len(pages)
+
+    def _prune(self):
+        now = time.time()
+        for sender in [sender for sender, (_, expiry) in self.held.items() if expiry < now]:
+            del self.held[sender]
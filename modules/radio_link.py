@@ -0,0 +1,196 @@
+import queue
+import logging
+import threading
+
+from modules.watchdog import busy
+
+logger = logging.getLogger(__name__)
+
+
+class _Reply:
+    # The pages of one multi-page reply to a node, dropped together if it is preempted
+    def __init__(self, destination, pages):
+        self.destination = destination
+        self.unsent = pages
+        self.cancelled = threading.Event()
+
+
+class RadioLink:
+    """
+    One attached Meshtastic radio with its own node id, duty-cycle counter and
+    send queue. Messages are written to the radio in order by a worker thread,
+    and anything not defined here (getMyNodeInfo, nodes, localNode...) is passed
+    through to the underlying interface.
+
+    Multi-page replies are paced out by the worker rather than the caller, so
+    the pages of a reply still waiting can be dropped when the node asks for
+    something else.
+    """
+    def __init__(self, interface, name, delivery=None, watchdog=None):
+        self.interface = interface
+        self.name = name
+        # Optional DeliveryTracker that resends direct messages that were not acknowledged
+        self.delivery = delivery
+        self.my_node = ""
+        self.transmission_count = 0
+        self.cooldown = False
+        self.duty_cycle_rejections = 0
+        self.send_queue = queue.Queue()
+        self.max_queue_depth = 0
+        self.replies = {}  # destination -> _Reply with pages still queued
+        self.resends = {}  # destination -> [_Reply] for resent pages still queued
+        self.preempted_pages = 0
+        self.lock = threading.Lock()
+        # Optional Watchdog that starts a new worker if one hangs writing to the radio
+        self.watchdog = watchdog
+        self.worker_generation = 0
+        self.start_worker()
+
+    def __getattr__(self, attr):
+        if attr == "interface":
+            raise AttributeError(attr)
+        return getattr(self.interface, attr)
+
+    def sendText(self, text, **kwargs):
+        """Queue a message for this radio."""
+        self.resend(text, kwargs, 0)
+
+    def resend(self, text, kwargs, attempt):
+        """Queue a message, noting how many times it has already been sent."""
+        reply = None
+        destination = kwargs.get("destinationId", "^all")
+        if attempt and destination != "^all":
+            # A resent page is dropped along with the node's reply when a newer command preempts it
+            reply = _Reply(destination, 1)
+            with self.lock:
+                self.resends.setdefault(destination, []).append(reply)
+        self.send_queue.put((text, kwargs, attempt, reply, 0))
+        self.max_queue_depth = max(self.max_queue_depth, self.send_queue.qsize())
+
+    def send_reply(self, pages, destination, first_delay=0, delay=0):
+        """
+        Queue the pages of a direct reply, sent first_delay seconds after the
+        worker reaches them and delay seconds apart. Replaces any earlier reply
+        to the same node that still has pages waiting.
+        """
+        self.cancel_reply(destination)
+        reply = _Reply(destination, len(pages))
+        with self.lock:
+            self.replies[destination] = reply
+        for i, page in enumerate(pages):
+            kwargs = {"wantAck": True, "destinationId": destination}
+            self.send_queue.put((page, kwargs, 0, reply, first_delay if i == 0 else delay))
+        self.max_queue_depth = max(self.max_queue_depth, self.send_queue.qsize())
+
+    def cancel_reply(self, destination):
+        """
+        Drop the pages of a node's last reply that haven't been sent yet and give
+        back the duty-cycle count it was charged. Pages to the node waiting to be
+        resent are dropped too. Returns how many pages of the reply were dropped.
+        """
+        with self.lock:
+            for resend in self.resends.pop(destination, []):
+                resend.cancelled.set()
+            reply = self.replies.pop(destination, None)
+            dropped = 0
+            if reply is not None and reply.unsent:
+                reply.cancelled.set()
+                dropped = reply.unsent
+                self.preempted_pages += dropped
+        if self.delivery:
+            self.delivery.forget(self, destination)
+        if not dropped:
+            return 0
+        self.transmission_count = max(0, self.transmission_count - 1)
+        logger.info(f"Dropped {dropped} unsent pages to {destination} on {self.name}")
+        return dropped
+
+    def _take_page(self, reply):
+        # True if the page should go out, False if its reply was cancelled
+        with self.lock:
+            if reply.cancelled.is_set():
+                return False
+            reply.unsent -= 1
+            if reply.unsent == 0 and self.replies.get(reply.destination) is reply:
+                del self.replies[reply.destination]
+            resends = self.resends.get(reply.destination)
+            if resends and reply in resends:
+                resends.remove(reply)
+                if not resends:
+                    del self.resends[reply.destination]
+            return True
+
+    def start_worker(self):
+        """Start a send worker, replacing the current one, which exits after the message it is sending."""
+        self.worker_generation += 1
+        worker = threading.Thread(target=self._send_worker, args=(self.worker_generation,), daemon=True)
+        worker.start()
+
+    def _send_worker(self, generation):
+        while generation == self.worker_generation:
+            text, kwargs, attempt, reply, delay = self.send_queue.get()
+            try:
+                if reply is not None:
+                    # Pause before the page, cut short if the reply is cancelled meanwhile
+                    if delay:
+                        reply.cancelled.wait(delay)
+                    if not self._take_page(reply):
+                        continue
+                with busy(self.watchdog, f"send:{self.name}"):
+                    packet = self.interface.sendText(text, **kwargs)
+                direct = kwargs.get("destinationId", "^all") != "^all"
+                if self.delivery and kwargs.get("wantAck") and direct:
+                    self.delivery.track(self, packet, text, kwargs, attempt)
+            except Exception as e:
+                logger.error(f"Failed to send message on {self.name}: {e}")
+            finally:
+                self.send_queue.task_done()
+
+    def queue_depth(self):
+        return self.send_queue.qsize()
+
+
+class RadioGroup:
+    """
+    All radios served by this process. Channel traffic such as alerts and
+    scheduled broadcasts is sent on every radio through sendText.
+    """
+    def __init__(self):
+        self.links = []
+        self.by_interface = {}
+        self.lock = threading.Lock()
+        self.delivery = None
+        self.watchdog = None
+
+    def add(self, interface, name):
+        with self.lock:
+            link = RadioLink(interface, name, self.delivery, self.watchdog)
+            if self.watchdog is not None:
+                self.watchdog.watch(f"send:{name}", restart=link.start_worker)
+            self.links.append(link)
+            self.by_interface[id(interface)] = link
+            return link
+
+    def get(self, name):
+        """Return the link with a given name, or the first link if there is none by that name."""
+        for link in self.links:
+            if link.name == name:
+                return link
+        return self.links[0] if self.links else None
+
+    def link_for(self, interface):
+        """Return the link for an interface, attaching it if it hasn't been seen yet."""
+        link = self.by_interface.get(id(interface))
+        if link is None:
+            link = self.add(interface, f"radio{len(self.links) + 1}")
+        return link
+
+    def sendText(self, text, **kwargs):
+        for link in self.links:
+            link.sendText(text, **kwargs)
+
+    def __iter__(self):
+        return iter(list(self.links))
+
+    def __len__(self):
+        return len(self.links)
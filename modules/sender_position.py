@@ -0,0 +1,61 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class SenderLocator:
+    """
+    Finds the NWS grid cell of a node from the position it last reported to the
+    mesh. The position is rounded to `precision` decimal places (about 100 m at
+    3), and the grid found for it is kept per node, so as long as a node hasn't
+    moved the lookup is a couple of dictionary reads.
+    """
+    def __init__(self, resolver, precision=3):
+        self.resolver = resolver
+        self.precision = precision
+        self.grids = {}  # node id -> (rounded position, grid)
+        self.lock = threading.Lock()
+
+    def position(self, interface, node_id):
+        """Return (lat, lon) from the interface's node database, or None if unknown."""
+        node = None
+        nodes_by_num = getattr(interface, "nodesByNum", None) or {}
+        try:
+            node = nodes_by_num.get(int(node_id))
+        except (TypeError, ValueError):
+            pass
+        if node is None:
+            node = next((n for n in (getattr(interface, "nodes", None) or {}).values()
+                         if str(n.get("num")) == str(node_id)), None)
+        if not node:
+            return None
+
+        position = node.get("position") or {}
+        lat = position.get("latitude")
+        lon = position.get("longitude")
+        if lat is None and position.get("latitudeI") is not None:
+            lat = position["latitudeI"] * 1e-7
+            lon = position.get("longitudeI", 0) * 1e-7
+        # Nodes without a fix report 0,0
+        if lat is None or lon is None or (lat == 0 and lon == 0):
+            return None
+        return round(lat, self.precision), round(lon, self.precision)
+
+    def grid_for(self, interface, node_id):
+        """
+        Return ((office, grid_x, grid_y), (lat, lon)) for a node, or (None, None)
+        if it has no position. Raises like GridResolver.resolve for points outside
+        NWS coverage.
+        """
+        position = self.position(interface, node_id)
+        if position is None:
+            return None, None
+        with self.lock:
+            cached = self.grids.get(str(node_id))
+        if cached and cached[0] == position:
+            return cached[1], position
+        grid = self.resolver.resolve(*position)
+        with self.lock:
+            self.grids[str(node_id)] = (position, grid)
+        return grid, position
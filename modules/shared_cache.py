@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class SharedCache:
+    """
+    Forecast and alert data shared by every bot instance on the same host through
+    a SQLite file in WAL mode. Before going to the network an instance takes a
+    refresh lease on (grid, product); only the lease holder fetches, and the
+    other instances, or other threads of the same instance, wait for and read
+    its result.
+    """
+    def __init__(self, path, lease_seconds=60, poll_interval=0.5):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.process = f"{socket.gethostname()}:{os.getpid()}"
+        self.local = threading.local()
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                grid TEXT NOT NULL,
+                product TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (grid, product)
+            );
+            CREATE TABLE IF NOT EXISTS leases (
+                grid TEXT NOT NULL,
+                product TEXT NOT NULL,
+                holder TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (grid, product)
+            );
+        """)
+
+    def _connect(self):
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    @property
+    def holder(self):
+        # Each thread holds its own leases, so two threads refreshing the same
+        # product don't both fetch it or release each other's lease
+        return f"{self.process}:{threading.get_ident()}"
+
+    def read(self, grid, product):
+        """Return (data, fetched_at) for a product, or (None, None)."""
+        row = self._connect().execute(
+            "SELECT payload, fetched_at FROM snapshots WHERE grid = ? AND product = ?",
+            (grid, product)
+        ).fetchone()
+        if row is None:
+            return None, None
+        return json.loads(row[0]), row[1]
+
+    def write(self, grid, product, data, fetched_at=None):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO snapshots (grid, product, fetched_at, payload) VALUES (?, ?, ?, ?)",
+            (grid, product, fetched_at or time.time(), json.dumps(data, separators=(",", ":")))
+        )
+
+    def try_acquire(self, grid, product):
+        """Take the refresh lease for a product. Returns False if another instance or thread holds it."""
+        connection = self._connect()
+        holder = self.holder
+        now = time.time()
+        try:
+            # IMMEDIATE takes the write lock up front so check-and-set is atomic between processes
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT holder, expires_at FROM leases WHERE grid = ? AND product = ?", (grid, product)
+            ).fetchone()
+            if row and row[0] != holder and row[1] > now:
+                connection.execute("COMMIT")
+                return False
+            connection.execute(
+                "INSERT OR REPLACE INTO leases (grid, product, holder, expires_at) VALUES (?, ?, ?, ?)",
+                (grid, product, holder, now + self.lease_seconds)
+            )
+            connection.execute("COMMIT")
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Failed to take shared cache lease for {grid} {product}: {e}")
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            return False
+
+    def release(self, grid, product):
+        self._connect().execute(
+            "DELETE FROM leases WHERE grid = ? AND product = ? AND holder = ?", (grid, product, self.holder)
+        )
+
+    def wait_for(self, grid, product, newer_than):
+        """
+        Wait for the lease holder to publish a product fetched after `newer_than`.
+        Returns (data, fetched_at), or (None, None) if the lease expired first.
+        """
+        deadline = time.time() + self.lease_seconds
+        while time.time() < deadline:
+            data, fetched_at = self.read(grid, product)
+            if data is not None and fetched_at > newer_than:
+                return data, fetched_at
+            time.sleep(self.poll_interval)
+        return None, None
@@ -0,0 +1,129 @@
+import sys
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from modules.nws_stream_parser import HOURLY_FIELDS, DAILY_FIELDS
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_FIELDS = {
+    'hourly': HOURLY_FIELDS,
+    'daily': DAILY_FIELDS,
+}
+
+
+def trim_forecast(data, fields):
+    """Drop everything from a forecast document except the period fields the fetchers read."""
+    properties = data.get('properties', {})
+    return {
+        'properties': {
+            'updateTime': properties.get('updateTime'),
+            'periods': [
+                {key: period[key] for key in fields if key in period}
+                for period in properties.get('periods', [])
+            ],
+        }
+    }
+
+
+def deep_sizeof(obj):
+    """Approximate the memory held by a snapshot of dicts, lists and scalars."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key) + deep_sizeof(value) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_sizeof(item) for item in obj)
+    return size
+
+
+class SnapshotStore:
+    """
+    Trimmed forecast snapshots keyed by (office, grid_x, grid_y, product),
+    shared by every WeatherDataManager. Entries older than max_age are dropped,
+    and the least recently used entries are evicted whenever the total size
+    exceeds budget_bytes (0 means no limit).
+    """
+    def __init__(self, budget_bytes=0, max_age=timedelta(hours=6)):
+        self.budget_bytes = budget_bytes
+        self.max_age = max_age
+        self.snapshots = OrderedDict()
+        self.used_bytes = 0
+        self.evictions = 0
+        # Bumped whenever the held snapshots change, so the checkpoint only
+        # rewrites them after a refresh or an eviction
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def put(self, key, data, fetched_at=None):
+        """Trim and store a snapshot, returning the stored document."""
+        fields = PRODUCT_FIELDS.get(key[-1])
+        snapshot = trim_forecast(data, fields) if fields else data
+        size = deep_sizeof(snapshot)
+        with self.lock:
+            self._remove(key)
+            self.snapshots[key] = (snapshot, fetched_at or datetime.now(), size)
+            self.used_bytes += size
+            self.version += 1
+            self._enforce_budget()
+        return snapshot
+
+    def get(self, key):
+        """Return (data, fetched_at) for a key, or (None, None) if not held or older than max_age."""
+        with self.lock:
+            entry = self.snapshots.get(key)
+            if entry is None or datetime.now() - entry[1] > self.max_age:
+                return None, None
+            self.snapshots.move_to_end(key)
+            return entry[0], entry[1]
+
+    def _remove(self, key):
+        entry = self.snapshots.pop(key, None)
+        if entry is not None:
+            self.used_bytes -= entry[2]
+            self.version += 1
+
+    def _enforce_budget(self):
+        now = datetime.now()
+        for key in [key for key, entry in self.snapshots.items() if now - entry[1] > self.max_age]:
+            self._remove(key)
+            self.evictions += 1
+        while self.budget_bytes and self.used_bytes > self.budget_bytes and len(self.snapshots) > 1:
+            key = next(iter(self.snapshots))
+            self._remove(key)
+            self.evictions += 1
+            logger.info(f"Evicted forecast snapshot {key} to stay within memory budget")
+
+    def usage(self):
+        """Current snapshot count, bytes held and budget."""
+        with self.lock:
+            self._enforce_budget()
+            return {
+                'entries': len(self.snapshots),
+                'used_bytes': self.used_bytes,
+                'budget_bytes': self.budget_bytes,
+                'evictions': self.evictions,
+            }
+
+    def get_state(self):
+        """Snapshots in a JSON-serialisable form for the state checkpoint."""
+        with self.lock:
+            return [
+                {'key': list(key), 'data': entry[0], 'fetched_at': entry[1].isoformat()}
+                for key, entry in self.snapshots.items()
+            ]
+
+    def restore_state(self, state):
+        for entry in state:
+            self.put(tuple(entry['key']), entry['data'], datetime.fromisoformat(entry['fetched_at']))
+
+    def get_status(self):
+        usage = self.usage()
+        used_kb = usage['used_bytes'] / 1024
+        if usage['budget_bytes']:
+            budget_kb = usage['budget_bytes'] / 1024
+            held = f"{used_kb:.1f}KB of {budget_kb:.0f}KB ({100 * usage['used_bytes'] / usage['budget_bytes']:.0f}%)"
+        else:
+            held = f"{used_kb:.1f}KB, no limit"
+        return f"Cache: {usage['entries']} snapshots, {held}, {usage['evictions']} evicted"
@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class StateCheckpoint:
+    """
+    Periodically saves runtime state (alert ids, cached forecasts, counters) to a
+    local JSON file and hands it back on the next start, so a restart does not
+    re-send alerts or re-download data it already had.
+
+    Each part of the bot registers a save callable returning JSON-serialisable
+    state and an optional restore callable that receives what was saved last time.
+    """
+    def __init__(self, path, interval=60):
+        self.path = path
+        self.interval = interval
+        self.providers = {}
+        self.versions = {}
+        self.own_files = set()
+        self.collected = {}
+        self.written = {}
+        self.restored = {}
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Read the last checkpoint, if any. Returns the saved sections."""
+        self.restored = self._read(self.path) or {}
+        if self.restored:
+            logger.info(f"Loaded saved state from {self.path} ({', '.join(self.restored) or 'empty'})")
+        return self.restored
+
+    def _read(self, path):
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as file:
+                return json.load(file).get("sections", {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable state file {path}: {e}")
+            return None
+
+    def section_path(self, name):
+        """File holding a section registered with own_file."""
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.{name}{ext or '.json'}"
+
+    def register(self, name, save, restore=None, version=None, own_file=False):
+        """
+        Add a state section, restoring it immediately if it was saved before.
+
+        version is an optional callable returning a value that changes whenever
+        the section's state does; save is then only called after it changes.
+        Sections without one are collected every time and compared with what
+        was written last. own_file keeps a large section in a file of its own,
+        so changes elsewhere do not rewrite it.
+        """
+        self.providers[name] = save
+        on_disk = name in self.restored
+        if own_file and self.path:
+            self.own_files.add(name)
+            saved = self._read(self.section_path(name)) or {}
+            # Checkpoints from before the split keep the section in the main file
+            on_disk = name in saved
+            if on_disk:
+                self.restored[name] = saved[name]
+        if restore and name in self.restored:
+            try:
+                restore(self.restored[name])
+            except Exception as e:
+                logger.error(f"Failed to restore saved {name} state: {e}")
+        if on_disk:
+            self.written[name] = self.collected[name] = self.restored[name]
+        if version:
+            self.versions[name] = [version, version() if name in self.written else None]
+
+    def _collect(self, name, save):
+        if name in self.versions:
+            version, last = self.versions[name]
+            current = version()
+            if name in self.collected and current == last:
+                return
+            self.versions[name][1] = current
+        try:
+            self.collected[name] = save()
+        except Exception as e:
+            logger.error(f"Failed to collect {name} state: {e}")
+
+    def save(self):
+        """Write the sections that changed since the last save to the state files atomically."""
+        if not self.path:
+            return False
+        for name, save in list(self.providers.items()):
+            self._collect(name, save)
+
+        with self.lock:
+            saved = True
+            changed = {name: state for name, state in self.collected.items()
+                       if name not in self.written or self.written[name] != state}
+            for name in self.own_files & set(changed):
+                if self._write(self.section_path(name), {name: changed[name]}):
+                    self.written[name] = changed[name]
+                else:
+                    saved = False
+            shared = {name: state for name, state in self.collected.items() if name not in self.own_files}
+            if set(changed) - self.own_files:
+                if self._write(self.path, shared):
+                    self.written.update(shared)
+                else:
+                    saved = False
+            return saved
+
+    def _write(self, path, sections):
+        directory = os.path.dirname(os.path.abspath(path))
+        try:
+            # Write to a temp file in the same folder then rename over the old
+            # file, so a crash mid-write never leaves a truncated checkpoint
+            with tempfile.NamedTemporaryFile("w", dir=directory, prefix=".state-", delete=False) as file:
+                json.dump({"saved_at": time.time(), "sections": sections}, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(file.name, path)
+            return True
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Failed to save state to {path}: {e}")
+            try:
+                os.unlink(file.name)
+            except (OSError, NameError):
+                pass
+            return False
+
+    def start(self):
+        """Start saving state periodically in a separate thread."""
+        if not self.path:
+            return
+
+        def loop():
+            while True:
+                time.sleep(self.interval)
+                self.save()
+
+        checkpoint_thread = threading.Thread(target=loop, daemon=True)
+        checkpoint_thread.start()
+        logger.info(f"Saving state to {self.path} every {self.interval} seconds")
@@ -0,0 +1,145 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+
+class Watchdog:
+    """
+    Notices workers that have hung. Workers wrap each unit of work in busy(name);
+    a job running longer than stall_after seconds is a stall, and a watched loop
+    that hasn't finished a job for max_silence seconds is too. Stalled workers
+    with a restart callable get a fresh thread, since a thread stuck in a blocking
+    call can't be stopped; the stuck one is expected to exit once it returns.
+
+    Job durations are also averaged per worker, and a job taking spike_factor
+    times the average (and at least min_spike seconds) is logged as a latency spike.
+    """
+    def __init__(self, stall_after=300, spike_factor=4.0, min_spike=5.0):
+        self.stall_after = stall_after
+        self.spike_factor = spike_factor
+        self.min_spike = min_spike
+        self.workers = {}
+        self.lock = threading.Lock()
+        self._tokens = 0
+
+    def _worker(self, name):
+        worker = self.workers.get(name)
+        if worker is None:
+            worker = self.workers[name] = {
+                "stall_after": self.stall_after, "max_silence": None, "restart": None,
+                "last_beat": time.time(), "jobs": {}, "average": None, "count": 0,
+                "stalled": False, "stalls": 0, "restarts": 0, "spikes": 0,
+            }
+        return worker
+
+    def watch(self, name, restart=None, max_silence=None, stall_after=None):
+        """Register a worker, optionally a loop expected to finish a job every max_silence seconds."""
+        with self.lock:
+            worker = self._worker(name)
+            worker["restart"] = restart
+            worker["max_silence"] = max_silence
+            worker["last_beat"] = time.time()
+            if stall_after is not None:
+                worker["stall_after"] = stall_after
+
+    @contextmanager
+    def busy(self, name):
+        """Mark a unit of work for a worker, which counts as a heartbeat when it finishes."""
+        with self.lock:
+            self._tokens += 1
+            token = self._tokens
+            self._worker(name)["jobs"][token] = time.time()
+        try:
+            yield
+        finally:
+            self._finish(name, token)
+
+    def _finish(self, name, token):
+        now = time.time()
+        with self.lock:
+            worker = self._worker(name)
+            started = worker["jobs"].pop(token, None)
+            if started is None:
+                # Abandoned when the worker was restarted
+                return
+            worker["last_beat"] = now
+            worker["stalled"] = False
+            duration = now - started
+            average = worker["average"]
+            if (average is not None and worker["count"] >= 5 and duration >= self.min_spike
+                    and duration > average * self.spike_factor):
+                worker["spikes"] += 1
+                logger.warning(f"Latency spike in {name}: {duration:.1f}s against an average of {average:.1f}s")
+            worker["average"] = duration if average is None else average * 0.8 + duration * 0.2
+            worker["count"] += 1
+
+    def check(self):
+        """Look for stalled workers and restart the ones that can be. Returns the names of stalled workers."""
+        now = time.time()
+        restarts = []
+        stalled = []
+        with self.lock:
+            for name, worker in self.workers.items():
+                busy_for = max((now - started for started in worker["jobs"].values()), default=0)
+                silent_for = now - worker["last_beat"]
+                stuck = busy_for > worker["stall_after"] or (
+                    worker["max_silence"] is not None and silent_for > worker["max_silence"])
+                if not stuck:
+                    continue
+                stalled.append(name)
+                if not worker["stalled"]:
+                    worker["stalled"] = True
+                    worker["stalls"] += 1
+                    logger.error(f"{name} has stalled: busy for {busy_for:.0f}s, "
+                                 f"last finished a job {silent_for:.0f}s ago")
+                if worker["restart"] is not None:
+                    # Give the new thread a full period before judging it
+                    worker["jobs"].clear()
+                    worker["last_beat"] = now
+                    worker["restarts"] += 1
+                    restarts.append((name, worker["restart"]))
+        for name, restart in restarts:
+            logger.warning(f"Restarting {name}")
+            try:
+                restart()
+            except Exception as e:
+                logger.error(f"Failed to restart {name}: {e}")
+        return stalled
+
+    def is_stalled(self, name):
+        with self.lock:
+            worker = self.workers.get(name)
+            return bool(worker and worker["stalled"])
+
+    def get_status(self):
+        """Short per-worker report for the health-status command."""
+        now = time.time()
+        lines = []
+        with self.lock:
+            for name, worker in sorted(self.workers.items()):
+                state = "STALLED" if worker["stalled"] else "ok"
+                average = f"{worker['average']:.1f}s" if worker["average"] is not None else "-"
+                lines.append(f"{name}: {state}, last {int(now - worker['last_beat'])}s ago, avg {average}, "
+                             f"stalls {worker['stalls']}, restarts {worker['restarts']}, spikes {worker['spikes']}")
+        return "\n".join(lines) if lines else "No workers watched."
+
+    def start(self, interval=10):
+        """Check for stalls periodically in a separate thread."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.check()
+                except Exception as e:
+                    logger.error(f"Error in watchdog: {str(e)}")
+
+        watchdog_thread = threading.Thread(target=loop, daemon=True)
+        watchdog_thread.start()
+
+
+def busy(watchdog, name):
+    """watchdog.busy(name), or a no-op when no watchdog is in use."""
+    return watchdog.busy(name) if watchdog is not None else nullcontext()
@@ -4,11 +4,18 @@ import requests
 import logging
 from datetime import datetime
 
+from modules.watchdog import busy
+from modules.api_governor import nws_get
+
 logger = logging.getLogger(__name__)
 
+# Seconds to wait for the NWS to connect or send more data before giving up on a poll
+REQUEST_TIMEOUT = 15
+
 
 class WeatherAlerts:
-    def __init__(self, lat, lon, interface, user_agent_app, user_agent_email, check_interval=300, message_delay=7, settings=None):
+    def __init__(self, lat, lon, interface, user_agent_app, user_agent_email, check_interval=300, message_delay=7, settings=None,
+                 shared_cache=None, watchdog=None, governor=None):
         self.base_url = f"https://api.weather.gov/alerts/active"
         self.params = {"point": f"{lat},{lon}"}
         self.headers = {"User-Agent": f"({user_agent_app}, {user_agent_email})"}
@@ -17,19 +24,54 @@ class WeatherAlerts:
         self.message_delay = message_delay
         self.settings = settings or {}
         self.channel_index = self.settings.get('ALERT_CHANNEL_INDEX', 0)
+        # Optional SharedCache so instances watching the same point make one request between them
+        self.shared_cache = shared_cache
+        self.cache_key = f"point:{lat},{lon}"
+        # Optional Watchdog that restarts the monitor thread if a poll hangs
+        self.watchdog = watchdog
+        # Optional ApiGovernor shared by every NWS request in the process
+        self.governor = governor
+        self.monitor_generation = 0
         
         # Add storage for current alert data
         self.current_alert = None
         self.last_alert_id = None
+        self.last_check = None  # Time of the last successful poll, in epoch seconds
         
+    def _request_alerts(self):
+        response = nws_get(self.governor, "alerts", self.base_url, params=self.params, headers=self.headers,
+                           timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_alert_data(self):
+        """Return the active alerts document, from the shared cache when another instance polled recently."""
+        if self.shared_cache is None:
+            return self._request_alerts()
+
+        data, fetched_at = self.shared_cache.read(self.cache_key, "alerts")
+        if data is not None and time.time() - fetched_at < self.check_interval:
+            return data
+        if not self.shared_cache.try_acquire(self.cache_key, "alerts"):
+            data, _ = self.shared_cache.wait_for(self.cache_key, "alerts", time.time() - self.check_interval)
+            return data
+        try:
+            data = self._request_alerts()
+            self.shared_cache.write(self.cache_key, "alerts", data)
+            return data
+        finally:
+            self.shared_cache.release(self.cache_key, "alerts")
+
     def check_alerts(self):
         """Check for new weather alerts and send notifications if needed."""
         try:
             logger.info("Updated weather alerts")
-            response = requests.get(self.base_url, params=self.params, headers=self.headers)
-            response.raise_for_status()
+            data = self.fetch_alert_data()
+            if data is None:
+                logger.warning("No alert data from the instance holding the shared cache lease")
+                return
+            self.last_check = time.time()
 
-            data = response.json()
             if not data.get('features'):
                 self.current_alert = None  # Clear current alert if no active alerts
                 return
@@ -78,15 +120,15 @@ class WeatherAlerts:
         except Exception as e:
             logger.error(f"Error checking weather alerts: {str(e)}")
 
-    def broadcast_full_alert(self, destination_id):
-        """Broadcast the full alert information including description."""
+    def full_alert_messages(self):
+        """Pages of the full current alert, or None if there is none or the command is disabled."""
         # Check if full-alert command is enabled
         if not self.settings.get('ENABLE_ALERT_COMMAND', True):
-            return False  # Do nothing if full-alert command is disabled
+            return None  # Do nothing if full-alert command is disabled
 
         # Check if there's a current alert
         if not self.current_alert:
-            return False  # Do nothing if no active alerts
+            return None  # Do nothing if no active alerts
 
         # Get alert properties
         alert_props = self.current_alert['properties']
@@ -94,12 +136,24 @@ class WeatherAlerts:
             f"{alert_props['headline']}\n"
             f"Description: {alert_props['description']}"
         )
-
-        # Split and send messages
         messages = self.split_message(full_message)
-        for i, msg in enumerate(messages, 1):
-            formatted_msg = f"--({i}/{len(messages)}) Alert--\n{msg}"
-            self.interface.sendText(
+        return [f"--({i}/{len(messages)}) Alert--\n{msg}" for i, msg in enumerate(messages, 1)]
+
+    def broadcast_full_alert(self, destination_id, interface=None):
+        """Broadcast the full alert information including description.
+
+        Args:
+            destination_id: Node that asked for the alert
+            interface (optional): Radio to reply on. Defaults to the monitor's interface.
+        """
+        messages = self.full_alert_messages()
+        if not messages:
+            return False
+
+        # Send messages
+        interface = interface or self.interface
+        for i, formatted_msg in enumerate(messages, 1):
+            interface.sendText(
                 formatted_msg,
                 wantAck=True,
                 destinationId=destination_id,
@@ -157,13 +211,39 @@ class WeatherAlerts:
 
         return messages
 
+    def get_state(self):
+        """Alert state to carry across a restart."""
+        return {
+            'last_alert_id': self.last_alert_id,
+            'current_alert': self.current_alert,
+            'last_check': self.last_check,
+        }
+
+    def restore_state(self, state):
+        """Restore saved alert state so the current alert is not re-broadcast."""
+        self.last_alert_id = state.get('last_alert_id')
+        self.current_alert = state.get('current_alert')
+        self.last_check = state.get('last_check')
+
     def start_monitoring(self):
-        """Start continuous monitoring of weather alerts in a separate thread."""
+        """
+        Start continuous monitoring of weather alerts in a separate thread. Calling
+        it again replaces the thread; the old one exits after its current poll.
+        """
+        self.monitor_generation += 1
+        generation = self.monitor_generation
 
         def monitor():
-            while True:
+            # After a restart, wait out the rest of the interval of the last saved poll
+            if self.last_check:
+                remaining = self.check_interval - (time.time() - self.last_check)
+                if remaining > 0:
+                    logger.info(f"Resuming alert checks in {int(remaining)} seconds")
+                    time.sleep(remaining)
+            while generation == self.monitor_generation:
                 try:
-                    self.check_alerts()
+                    with busy(self.watchdog, "alerts"):
+                        self.check_alerts()
                 except Exception as e:
                     logger.error(f"Error in monitor thread: {str(e)}")
                 finally:
@@ -1,29 +1,134 @@
+import time
 import requests
 import logging
+import threading
+import contextvars
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from modules.gridpoint_forecast import GridpointForecast, cell_center
+from modules.nws_stream_parser import parse_forecast_stream, HOURLY_FIELDS, DAILY_FIELDS
+from modules.snapshot_store import SnapshotStore
+from modules.watchdog import busy
+from modules.api_governor import nws_get
+
+# Seconds to wait for the NWS to connect or send more data before giving up on a download
+REQUEST_TIMEOUT = 15
+
+# Fetch times of the forecasts served while handling the current request
+_served = contextvars.ContextVar("served_fetch_times", default=None)
+
+# Time zone of each grid ("office/x,y"), looked up once per process for gridpoints mode
+_grid_time_zones = {}
+_grid_time_zones_lock = threading.Lock()
+
+
+@contextmanager
+def track_data_age():
+    """Collect the fetch time of every forecast served inside the block."""
+    served = []
+    token = _served.set(served)
+    try:
+        yield served
+    finally:
+        _served.reset(token)
+
+
+def served_fetch_times():
+    """Fetch times collected by the enclosing track_data_age block, or an empty list."""
+    return _served.get() or []
+
+
+def drop_past_periods(data, now=None):
+    """Return the forecast without the leading periods that have already ended."""
+    try:
+        periods = data['properties']['periods']
+        now = now or datetime.now().astimezone()
+        start = 0
+        # A period has ended once the next one has started
+        while start + 1 < len(periods) and \
+                datetime.fromisoformat(periods[start + 1]['startTime'].replace('Z', '+00:00')) <= now:
+            start += 1
+    except (KeyError, TypeError, ValueError):
+        return data
+    if start == 0:
+        return data
+    return {**data, 'properties': {**data['properties'], 'periods': periods[start:]}}
 
 class WeatherDataManager:
-    def __init__(self, office="HNX", grid_x="67", grid_y="80", user_agent="(myweatherapp, contact@example.com)"):
+    def __init__(self, office="HNX", grid_x="67", grid_y="80", user_agent="(myweatherapp, contact@example.com)",
+                 data_mode="forecast", stream_parse=False, stream_horizon=48, store=None, shared_cache=None,
+                 history=None, watchdog=None, governor=None, api_caller="forecast"):
         self.hourly_url = f"https://api.weather.gov/gridpoints/{office}/{grid_x},{grid_y}/forecast/hourly"
         self.daily_url = f"https://api.weather.gov/gridpoints/{office}/{grid_x},{grid_y}/forecast"
+        self.gridpoint_url = f"https://api.weather.gov/gridpoints/{office}/{grid_x},{grid_y}"
         self.headers = {"User-Agent": user_agent}
-        
-        self.hourly_data = None
-        self.daily_data = None
-        self.last_hourly_update = None
-        self.last_daily_update = None
+        # "forecast" downloads /forecast and /forecast/hourly separately,
+        # "gridpoints" downloads the raw grid once and builds both views locally
+        self.data_mode = data_mode
+        # Streaming parse keeps only the fields the fetchers read and stops
+        # reading the hourly forecast after stream_horizon periods
+        self.stream_parse = stream_parse
+        self.stream_horizon = stream_horizon
+
+        # Trimmed snapshots live in a store shared by every manager, so managers
+        # created per request reuse data already fetched for the same grid
+        self.store = store if store is not None else SnapshotStore()
+        self.hourly_key = (office, str(grid_x), str(grid_y), 'hourly')
+        self.daily_key = (office, str(grid_x), str(grid_y), 'daily')
+        # Optional SharedCache used by other bot instances on the same host,
+        # so only one of them downloads each product for this grid
+        self.shared_cache = shared_cache
+        self.grid = f"{office}/{grid_x},{grid_y}"
+        # Optional ForecastHistory that keeps every downloaded forecast
+        self.history = history
+        # Optional Watchdog that flags downloads running far longer than usual
+        self.watchdog = watchdog
+        # Optional ApiGovernor; when it holds a download back the cached data is used as is
+        self.governor = governor
+        self.api_caller = api_caller
         self.update_interval = timedelta(hours=1)  # Update every hour
-        
+        # Last view served per product, so callers keep getting the same object until an hour passes
+        self._views = {}
+
+    @property
+    def hourly_data(self):
+        return self.store.get(self.hourly_key)[0]
+
+    @property
+    def daily_data(self):
+        return self.store.get(self.daily_key)[0]
+
+    @property
+    def last_hourly_update(self):
+        return self.store.get(self.hourly_key)[1]
+
+    @property
+    def last_daily_update(self):
+        return self.store.get(self.daily_key)[1]
+
+    def _get_json(self, url, fields, horizon=None):
+        """Fetch a forecast document, returning (status_code, data)"""
+        if not self.stream_parse:
+            response = nws_get(self.governor, self.api_caller, url, headers=self.headers, timeout=REQUEST_TIMEOUT)
+            return response.status_code, response.json() if response.status_code == 200 else None
+
+        with nws_get(self.governor, self.api_caller, url, headers=self.headers, stream=True,
+                     timeout=REQUEST_TIMEOUT) as response:
+            if response.status_code != 200:
+                return response.status_code, None
+            return response.status_code, parse_forecast_stream(response.iter_content(8192), fields, horizon)
+
     def _fetch_hourly_data(self):
         try:
-            response = requests.get(self.hourly_url, headers=self.headers)
-            if response.status_code == 200:
-                self.hourly_data = response.json()
-                self.last_hourly_update = datetime.now()
+            status_code, data = self._get_json(self.hourly_url, HOURLY_FIELDS, self.stream_horizon)
+            if status_code == 200:
+                self._publish('hourly', self.store.put(self.hourly_key, data))
                 logging.info("Updated hourly weather data")
                 return True
             else:
-                logging.error(f"Failed to fetch hourly data: {response.status_code}")
+                logging.error(f"Failed to fetch hourly data: {status_code}")
                 return False
         except Exception as e:
             logging.error(f"Error fetching hourly weather data: {str(e)}")
@@ -31,34 +136,161 @@ class WeatherDataManager:
 
     def _fetch_daily_data(self):
         try:
-            response = requests.get(self.daily_url, headers=self.headers)
-            if response.status_code == 200:
-                self.daily_data = response.json()
-                self.last_daily_update = datetime.now()
+            status_code, data = self._get_json(self.daily_url, DAILY_FIELDS)
+            if status_code == 200:
+                self._publish('daily', self.store.put(self.daily_key, data))
                 logging.info("Updated daily weather data")
                 return True
             else:
-                logging.error(f"Failed to fetch daily data: {response.status_code}")
+                logging.error(f"Failed to fetch daily data: {status_code}")
                 return False
         except Exception as e:
             logging.error(f"Error fetching daily weather data: {str(e)}")
             return False
 
+    def _fetch_gridpoint_data(self):
+        """Fetch the raw gridpoint document once and derive hourly and daily views from it"""
+        try:
+            response = nws_get(self.governor, self.api_caller, self.gridpoint_url, headers=self.headers,
+                               timeout=REQUEST_TIMEOUT)
+            if response.status_code == 200:
+                data = response.json()
+                forecast = GridpointForecast(data, self._grid_time_zone(data))
+                fetched_at = datetime.now()
+                self._publish('hourly', self.store.put(self.hourly_key, forecast.hourly_periods(), fetched_at), fetched_at)
+                self._publish('daily', self.store.put(self.daily_key, forecast.daily_periods(), fetched_at), fetched_at)
+                logging.info("Updated gridpoint weather data")
+                return True
+            else:
+                logging.error(f"Failed to fetch gridpoint data: {response.status_code}")
+                return False
+        except Exception as e:
+            logging.error(f"Error fetching gridpoint weather data: {str(e)}")
+            return False
+
+    def _grid_time_zone(self, data):
+        """
+        The grid's time zone from the timeZone /points gives for the middle of the
+        cell, or None (the host's zone) if it can't be looked up; it is tried again
+        on the next refresh.
+        """
+        with _grid_time_zones_lock:
+            if self.grid in _grid_time_zones:
+                return _grid_time_zones[self.grid]
+        center = cell_center(data)
+        if center is None:
+            return None
+        try:
+            response = nws_get(self.governor, "points", f"https://api.weather.gov/points/{center[0]:.4f},{center[1]:.4f}",
+                               headers=self.headers, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            time_zone = ZoneInfo(response.json()['properties']['timeZone'])
+        except (requests.RequestException, KeyError, TypeError, ValueError, ZoneInfoNotFoundError) as e:
+            logging.warning(f"Using the host time zone for {self.grid}, time zone lookup failed: {e}")
+            return None
+        with _grid_time_zones_lock:
+            _grid_time_zones[self.grid] = time_zone
+        return time_zone
+
+    def _publish(self, product, data, fetched_at=None):
+        """Record a freshly downloaded product and make it available to other instances"""
+        if self.history is not None:
+            try:
+                self.history.record(self.grid, product, data)
+            except Exception as e:
+                logging.error(f"Error recording {product} forecast history: {str(e)}")
+        if self.shared_cache is None:
+            return
+        try:
+            self.shared_cache.write(self.grid, product, data, (fetched_at or datetime.now()).timestamp())
+        except Exception as e:
+            logging.error(f"Error writing {product} data to shared cache: {str(e)}")
+
+    def _load_shared(self, product):
+        """Copy a product from the shared cache if another instance fetched it recently"""
+        try:
+            data, fetched_at = self.shared_cache.read(self.grid, product)
+        except Exception as e:
+            logging.error(f"Error reading {product} data from shared cache: {str(e)}")
+            return False
+        if data is None:
+            return False
+        fetched_at = datetime.fromtimestamp(fetched_at)
+        if self.needs_update(fetched_at):
+            return False
+        key = self.hourly_key if product == 'hourly' else self.daily_key
+        self.store.put(key, data, fetched_at)
+        return True
+
+    def _refresh(self, product):
+        """Bring a product up to date, downloading it only if no other instance is already doing so"""
+        with busy(self.watchdog, "refresh"):
+            return self._refresh_product(product)
+
+    def _refresh_product(self, product):
+        if self.data_mode == "gridpoints":
+            lease, fetch = "gridpoints", self._fetch_gridpoint_data
+        elif product == 'hourly':
+            lease, fetch = "hourly", self._fetch_hourly_data
+        else:
+            lease, fetch = "daily", self._fetch_daily_data
+
+        if self.shared_cache is None:
+            return fetch()
+        if self._load_shared(product):
+            return True
+        if not self.shared_cache.try_acquire(self.grid, lease):
+            logging.info(f"Waiting for another instance to refresh {lease} data for {self.grid}")
+            self.shared_cache.wait_for(self.grid, product, time.time() - self.update_interval.total_seconds())
+            return self._load_shared(product)
+        try:
+            # Another instance may have finished between the read above and taking the lease
+            if self._load_shared(product):
+                return True
+            return fetch()
+        finally:
+            self.shared_cache.release(self.grid, lease)
+
     def needs_update(self, last_update):
         if last_update is None:
             return True
         return datetime.now() - last_update > self.update_interval
 
+    def _serve(self, product, data, last_update):
+        """
+        The stored forecast with past periods skipped. If it couldn't be refreshed
+        it is still served until the store's max_age, and its fetch time is noted
+        so the reply can say how old it is.
+        """
+        if data is None:
+            return None
+        served = _served.get()
+        if served is not None and last_update is not None:
+            served.append(last_update)
+        view = drop_past_periods(data)
+        source, cached = self._views.get(product, (None, None))
+        if source is data and cached is not None and \
+                len(cached['properties']['periods']) == len(view['properties']['periods']):
+            return cached
+        self._views[product] = (data, view)
+        return view
+
     def get_hourly_data(self):
-        if self.needs_update(self.last_hourly_update):
-            self._fetch_hourly_data()
-        return self.hourly_data
+        data, last_update = self.store.get(self.hourly_key)
+        if self.needs_update(last_update):
+            self._refresh('hourly')
+            data, last_update = self.store.get(self.hourly_key)
+        return self._serve('hourly', data, last_update)
 
     def get_daily_data(self):
-        if self.needs_update(self.last_daily_update):
-            self._fetch_daily_data()
-        return self.daily_data
+        data, last_update = self.store.get(self.daily_key)
+        if self.needs_update(last_update):
+            self._refresh('daily')
+            data, last_update = self.store.get(self.daily_key)
+        return self._serve('daily', data, last_update)
 
     def force_update(self):
         """Force an immediate update of both hourly and daily data"""
-        return self._fetch_hourly_data() and self._fetch_daily_data()
\ No newline at end of file
+        if self.data_mode == "gridpoints":
+            return self._fetch_gridpoint_data()
+        return self._fetch_hourly_data() and self._fetch_daily_data()
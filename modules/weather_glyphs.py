@@ -0,0 +1,118 @@
+import re
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Condition categories in priority order. A forecast such as "Mostly Sunny then
+# Chance Showers" takes the first category that matches anywhere in the text,
+# so the more specific phrases come before the words they contain.
+CATEGORY_PATTERNS = tuple(
+    (category, re.compile(pattern))
+    for category, pattern in (
+        ("thunderstorm", r"thunderstorm|t-storm"),
+        ("clear", r"clear"),
+        ("partly_sunny", r"partly sunny|mostly sunny"),
+        ("sunny", r"sunny"),
+        ("partly_cloudy", r"partly cloudy"),
+        ("mostly_cloudy", r"mostly cloudy"),
+        ("cloudy", r"cloudy|overcast"),
+        ("rain", r"rain|showers|drizzle"),
+        ("snow", r"snow|flurries|sleet|ice pellets"),
+        ("fog", r"fog|haze|smoke"),
+    )
+)
+
+# Icon codes from NWS icon urls, e.g. https://api.weather.gov/icons/land/night/tsra,40
+ICON_CATEGORIES = {
+    "skc": "clear", "few": "clear", "sct": "partly_cloudy", "bkn": "mostly_cloudy", "ovc": "cloudy",
+    "wind_skc": "clear", "wind_few": "clear", "wind_sct": "partly_cloudy", "wind_bkn": "mostly_cloudy",
+    "wind_ovc": "cloudy", "rain": "rain", "rain_showers": "rain", "rain_showers_hi": "rain",
+    "rain_snow": "snow", "rain_sleet": "snow", "rain_fzra": "rain", "fzra": "rain", "snow": "snow",
+    "snow_sleet": "snow", "snow_fzra": "snow", "sleet": "snow", "blizzard": "snow", "tsra": "thunderstorm",
+    "tsra_sct": "thunderstorm", "tsra_hi": "thunderstorm", "fog": "fog", "haze": "fog", "smoke": "fog",
+    "dust": "fog",
+}
+ICON_PATTERN = re.compile(r"/(day|night)/([a-z_]+)")
+
+# Each category maps to a glyph, or a (day, night) pair
+GLYPH_SETS = {
+    "emoji": {
+        "thunderstorm": "⛈️",
+        "clear": ("☀️", "🌙"),
+        "partly_sunny": "🌤️",
+        "sunny": ("☀️", "🌙"),
+        "partly_cloudy": "⛅",
+        "mostly_cloudy": "🌥️",
+        "cloudy": "☁️",
+        "rain": "🌧️",
+        "snow": "🌨️",
+        "fog": "🌫️",
+        "unknown": "🌡️",
+        "rain_chance": "💧",
+    },
+}
+# Same glyphs without the emoji presentation selector, 3 bytes shorter each on air
+GLYPH_SETS["compact"] = {
+    category: tuple(g.replace("\ufe0f", "") for g in glyph) if isinstance(glyph, tuple) else glyph.replace("\ufe0f", "")
+    for category, glyph in GLYPH_SETS["emoji"].items()
+}
+
+
+@lru_cache(maxsize=512)
+def classify(short_forecast):
+    """Return the condition category for an NWS shortForecast."""
+    text = short_forecast.lower()
+    for category, pattern in CATEGORY_PATTERNS:
+        if pattern.search(text):
+            return category
+    return "unknown"
+
+
+@lru_cache(maxsize=256)
+def classify_icon(icon_url):
+    """Return (category, is_daytime) for an NWS icon url."""
+    match = ICON_PATTERN.search(icon_url or "")
+    if not match:
+        return "unknown", True
+    return ICON_CATEGORIES.get(match.group(2), "unknown"), match.group(1) == "day"
+
+
+class WeatherGlyphs:
+    """
+    Shared lookup from forecast text to the glyph shown for it. The glyph set is
+    chosen with GLYPH_SET and single categories can be replaced with GLYPH_OVERRIDES.
+    """
+    def __init__(self, glyph_set="emoji", overrides=None):
+        self.configure(glyph_set, overrides)
+
+    def configure(self, glyph_set="emoji", overrides=None):
+        if glyph_set not in GLYPH_SETS:
+            logger.warning(f"Unknown glyph set '{glyph_set}', using emoji")
+            glyph_set = "emoji"
+        glyphs = dict(GLYPH_SETS[glyph_set])
+        glyphs.update(overrides or {})
+        # Resolve day/night pairs up front so each lookup is a single dict access
+        table = {}
+        for category, glyph in glyphs.items():
+            day, night = glyph if isinstance(glyph, (tuple, list)) else (glyph, glyph)
+            table[(category, True)] = day
+            table[(category, False)] = night
+        self.table = table
+        self.unknown = table[("unknown", True)]
+        self.rain = table[("rain_chance", True)]
+
+    def glyph(self, short_forecast, is_daytime=True):
+        return self.table.get((classify(short_forecast), bool(is_daytime)), self.unknown)
+
+    def for_period(self, period):
+        """Glyph for an NWS forecast period, using its icon when the text doesn't match."""
+        category = classify(period.get('shortForecast') or "")
+        is_daytime = period.get('isDaytime', True)
+        if category == "unknown" and period.get('icon'):
+            category, is_daytime = classify_icon(period['icon'])
+        return self.table.get((category, bool(is_daytime)), self.unknown)
+
+
+# Used by fetchers that aren't given their own instance
+default_glyphs = WeatherGlyphs()
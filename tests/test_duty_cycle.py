@@ -0,0 +1,55 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# meshbot reads settings.yaml from the working directory when imported
+os.chdir(ROOT)
+
+import meshbot
+
+
+class FakeInterface:
+    nodes = {}
+
+    def sendText(self, text, **kwargs):
+        return {"id": 1}
+
+
+class DutyCycleReloadTest(unittest.TestCase):
+    def setUp(self):
+        self.link = meshbot.radios.link_for(FakeInterface())
+        # The decay timers reschedule themselves; keep them from starting real threads
+        patcher = mock.patch.object(meshbot.threading, "Timer")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(meshbot.config.overrides.pop, "DUTYCYCLE", None)
+
+    def reload(self, duty_cycle):
+        meshbot.config.overrides["DUTYCYCLE"] = duty_cycle
+        self.assertTrue(meshbot.config.reload())
+
+    def test_turning_duty_cycle_on_unlocks_a_high_count(self):
+        self.reload(False)
+        self.link.transmission_count = 40
+        meshbot.reset_transmission_count()
+        self.assertEqual(self.link.transmission_count, 40)
+
+        self.reload(True)
+        self.assertEqual(self.link.transmission_count, 0)
+
+        self.link.transmission_count = 16
+        meshbot.reset_transmission_count()
+        self.assertEqual(self.link.transmission_count, 15)
+
+    def test_decay_keeps_running_while_duty_cycle_is_off(self):
+        self.reload(False)
+        meshbot.reset_transmission_count()
+        meshbot.reset_cooldown()
+        self.assertEqual(meshbot.threading.Timer.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()